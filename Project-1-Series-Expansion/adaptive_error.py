@@ -0,0 +1,126 @@
+#This file estimates the maximum absolute error of an approximation adaptively:
+#it starts from a coarse grid and only adds points around the worst intervals and near singularities
+import numpy
+import settings
+
+def refine_points(x, errors, num_worst):
+    """
+    Returns the new x values to evaluate in the next round:
+    - the midpoints on both sides of the num_worst largest local maxima of the error
+    - the midpoints of intervals where the error is finite at one end and not at the other (singularities)
+    - the parabola vertex through each of those maxima and its neighbours
+    """
+    num_points = len(x)
+    finite = numpy.isfinite(errors)
+    ranked = numpy.where(finite, errors, -numpy.inf)
+
+    #local maxima of the sampled error, best first
+    left = numpy.concatenate(([-numpy.inf], ranked[:-1]))
+    right = numpy.concatenate((ranked[1:], [-numpy.inf]))
+    maxima = numpy.flatnonzero(finite & (ranked >= left) & (ranked >= right))
+    maxima = maxima[numpy.argsort(ranked[maxima])[::-1][:num_worst]]
+
+    intervals = set()
+    for i in maxima:
+        if i > 0:
+            intervals.add(i - 1)
+        if i < num_points - 1:
+            intervals.add(i)
+
+    #intervals crossing into a region where the error is not finite
+    intervals.update(numpy.flatnonzero(finite[:-1] != finite[1:]).tolist())
+
+    intervals = numpy.array(sorted(intervals), dtype=int)
+    midpoints = 0.5 * (x[intervals] + x[intervals + 1]) if intervals.size else numpy.empty(0)
+
+    #vertex of the parabola through each interior maximum and its neighbours, usually very close to the true peak
+    interior = maxima[(maxima > 0) & (maxima < num_points - 1)]
+    interior = interior[finite[interior - 1] & finite[interior + 1]]
+    x0, x1, x2 = x[interior - 1], x[interior], x[interior + 1]
+    y0, y1, y2 = errors[interior - 1], errors[interior], errors[interior + 1]
+    with numpy.errstate(all="ignore"):
+        numerator = (x1 - x0)**2 * (y1 - y2) - (x1 - x2)**2 * (y1 - y0)
+        denominator = (x1 - x0) * (y1 - y2) - (x1 - x2) * (y1 - y0)
+        vertices = x1 - 0.5 * numerator / denominator
+    usable = numpy.isfinite(vertices) & (vertices > x0) & (vertices < x2) & (vertices != x1)
+    return numpy.concatenate((midpoints, vertices[usable]))
+
+def peak_confirmed(x, errors, rtol):
+    """
+    Checks whether the largest sampled error is a settled maximum rather than the flank of a singularity:
+    - it is at an end of the interval, or
+    - the parabola through it and its neighbours is concave with a peak within rtol of it, or
+    - its neighbours are too close together to refine any further
+    """
+    ranked = numpy.where(numpy.isfinite(errors), errors, -numpy.inf)
+    i = int(numpy.argmax(ranked))
+    if i == 0 or i == len(x) - 1:
+        return True
+    if x[i + 1] - x[i - 1] <= 1e-12 * (x[-1] - x[0]):
+        return True
+    if not (numpy.isfinite(errors[i - 1]) and numpy.isfinite(errors[i + 1])):
+        return False
+
+    #fit y = a*(x - x1)^2 + b*(x - x1) + y1 through the 3 points
+    h0, h2 = x[i - 1] - x[i], x[i + 1] - x[i]
+    d0, d2 = errors[i - 1] - errors[i], errors[i + 1] - errors[i]
+    with numpy.errstate(all="ignore"):
+        a = (d2 / h2 - d0 / h0) / (h2 - h0)
+        b = d0 / h0 - a * h0
+        peak = errors[i] - b * b / (4 * a)
+    return bool(a < 0 and peak <= errors[i] * (1 + rtol))
+
+def adaptive_max_absolute_error(error_function, x_min, x_max, rtol=None, initial_points=None, max_evaluations=None, num_worst=4):
+    """
+    Estimates the maximum of error_function on [x_min, x_max] with far fewer evaluations than a dense grid
+    - error_function takes a numpy array of x values and returns the absolute errors there
+    - starts with initial_points evenly spaced points, then each round bisects the intervals around the
+      num_worst largest local maxima and any interval next to a non-finite error (e.g. ln(1 + x) at -1)
+    - stops when 2 rounds in a row raise the estimate by no more than rtol (relative) and the top peak is settled
+      (see peak_confirmed), or after max_evaluations points
+    - an infinite error anywhere is returned as inf straight away
+    Defaults come from settings.adaptive_error_rtol, adaptive_error_initial_points and adaptive_error_max_evaluations
+    Returns (max_error, number of evaluations used)
+    """
+    if rtol is None: rtol = settings.adaptive_error_rtol
+    if initial_points is None: initial_points = settings.adaptive_error_initial_points
+    if max_evaluations is None: max_evaluations = settings.adaptive_error_max_evaluations
+
+    x = numpy.linspace(x_min, x_max, initial_points)
+    with numpy.errstate(all="ignore"):
+        errors = numpy.asarray(error_function(x), dtype=float)
+    evaluations = len(x)
+
+    def current_max():
+        if numpy.isposinf(errors).any():
+            return numpy.inf
+        finite = errors[numpy.isfinite(errors)]
+        return float(finite.max()) if finite.size else float("nan")
+
+    estimate = current_max()
+    quiet_rounds = 0
+    while evaluations < max_evaluations and numpy.isfinite(estimate):
+        new_x = refine_points(x, errors, num_worst)
+        new_x = new_x[:max_evaluations - evaluations]
+        if new_x.size == 0:
+            break
+        with numpy.errstate(all="ignore"):
+            new_errors = numpy.asarray(error_function(new_x), dtype=float)
+        evaluations += len(new_x)
+
+        #merge the new points in, keeping x sorted
+        x = numpy.concatenate((x, new_x))
+        errors = numpy.concatenate((errors, new_errors))
+        order = numpy.argsort(x, kind="stable")
+        x, errors = x[order], errors[order]
+
+        #stop after 2 rounds in a row that hardly raised the estimate, once the top peak looks settled
+        previous_estimate = estimate
+        estimate = current_max()
+        if estimate - previous_estimate <= rtol * abs(estimate):
+            quiet_rounds += 1
+            if quiet_rounds >= 2 and peak_confirmed(x, errors, rtol):
+                break
+        else:
+            quiet_rounds = 0
+    return estimate, evaluations
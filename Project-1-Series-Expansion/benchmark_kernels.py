@@ -0,0 +1,50 @@
+import sys
+import time
+import numpy
+from sympy import lambdify
+from parser_function import x, parser_to_sympy
+from numeric_kernel import compile_kernel
+
+#composite functions that repeat subexpressions, evaluated on a grid big enough for memory traffic to dominate
+benchmark_functions = ["sin(x)^2 + sin(x)*exp(sin(x))", "exp(sin(x))*cos(x)^2", "sqrt(1 + x^2)/(1 + sqrt(1 + x^2))", "ln(1 + x^2) - x^2*exp(-x^2)", "sin(x)"]
+benchmark_grid_size = 10 ** 7
+
+def best_time(function, argument, repeats):
+    """Calls function(argument) repeats times and returns (fastest wall-clock time in seconds, last result)"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run_kernel_benchmark(functions=None, num_x_points=benchmark_grid_size, repeats=3):
+    """
+    Times plain lambdify against the compiled kernels (float64 and float32) on a grid of num_x_points,
+    and prints each time with the speedup over lambdify and the largest difference from lambdify's values
+    Returns a list of (function, lambdify seconds, kernel seconds, float32 kernel seconds) tuples
+    """
+    if functions is None:
+        functions = benchmark_functions
+    x_grid = numpy.linspace(-1.0, 1.0, num_x_points)
+    x_grid32 = x_grid.astype(numpy.float32)
+
+    results = []
+    print(f"{num_x_points} points, best of {repeats}")
+    print(f"{'function':>36} {'lambdify':>9} {'kernel':>9} {'speedup':>8} {'float32':>9} {'speedup':>8} {'max diff':>9} {'f32 diff':>9}")
+    for function_string in functions:
+        expression = parser_to_sympy(function_string)
+        kernel = compile_kernel(expression)
+        with numpy.errstate(all="ignore"):
+            lambdify_seconds, y_lambdify = best_time(lambdify(x, expression, "numpy"), x_grid, repeats)
+            kernel_seconds, y_kernel = best_time(kernel, x_grid, repeats)
+            float32_seconds, y_float32 = best_time(kernel, x_grid32, repeats)
+            difference = numpy.nanmax(numpy.abs(y_kernel - y_lambdify))
+            float32_difference = numpy.nanmax(numpy.abs(y_float32 - y_lambdify))
+        results.append((function_string, lambdify_seconds, kernel_seconds, float32_seconds))
+        print(f"{function_string:>36} {lambdify_seconds:>9.3f} {kernel_seconds:>9.3f} {lambdify_seconds / kernel_seconds:>7.2f}x"
+              f" {float32_seconds:>9.3f} {lambdify_seconds / float32_seconds:>7.2f}x {difference:>9.1e} {float32_difference:>9.1e}")
+    return results
+
+if __name__ == "__main__":
+    run_kernel_benchmark(num_x_points=int(sys.argv[1]) if len(sys.argv) > 1 else benchmark_grid_size)
@@ -0,0 +1,74 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sympy.core.cache import clear_cache
+import settings
+import run_experiment
+from expression_cache import clear_caches
+
+#a sweep large enough for the process start-up cost to be small next to the work
+benchmark_functions = ["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)", "tan(x)", "sqrt(1 + x)", "exp(-x^2)", "1/(2 - x)"]
+benchmark_centres = [0.0, 0.25, 0.5, 0.75, 1.0]
+benchmark_num_terms_list = [1, 2, 3, 5, 10, 15]
+
+def time_sweep(workers):
+    """
+    Runs every (function, centre) unit of the benchmark sweep through run_experiment.run_work_unit from cold caches,
+    in this process when workers is 1 and spread over a pool of workers processes otherwise
+    - every worker count does the same per-unit work, so the times only differ by how it is spread
+      (run_experiment itself shares work between the units of a serial sweep, which would skew the comparison)
+    Returns the wall-clock time in seconds
+    """
+    units = [(function_string, centre) for function_string in benchmark_functions for centre in benchmark_centres]
+    unit_arguments = [
+        [function_string for function_string, _ in units],
+        [centre for _, centre in units],
+        [benchmark_num_terms_list] * len(units),
+        [settings.min_x] * len(units),
+        [settings.max_x] * len(units),
+        [settings.num_x_points] * len(units)
+    ]
+
+    #worker processes fork from this one, so clearing here makes them start cold too
+    clear_caches()
+    clear_cache()       #sympy's own internal cache would otherwise speed up later runs
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=run_experiment.apply_settings, initargs=(run_experiment.current_settings(),)) as pool:
+            list(pool.map(run_experiment.run_work_unit, *unit_arguments))
+    else:
+        list(map(run_experiment.run_work_unit, *unit_arguments))
+    return time.perf_counter() - start
+
+def run_scaling_benchmark(worker_counts=None):
+    """
+    Times the benchmark sweep for each number of workers and prints the scaling curve
+    - the disk coefficient store is turned off so every run really expands the series
+      (the worker processes are given the changed settings explicitly)
+    - only the work units are timed, nothing is written to the data or plots folders
+    Returns a list of (workers, seconds, speedup) tuples
+    """
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [count for count in (1, 2, 4, 8, 16, 32) if count <= cpu_count]
+
+    saved = settings.coefficient_disk_cache
+    results = []
+    serial_seconds = None
+    settings.coefficient_disk_cache = False
+    try:
+        for workers in worker_counts:
+            seconds = time_sweep(workers)
+            if serial_seconds is None:
+                serial_seconds = seconds
+            results.append((workers, seconds, serial_seconds / seconds))
+    finally:
+        settings.coefficient_disk_cache = saved
+
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    for workers, seconds, speedup in results:
+        print(f"{workers:>8} {seconds:>10.2f} {speedup:>7.2f}x")
+    return results
+
+if __name__ == "__main__":
+    run_scaling_benchmark()
@@ -0,0 +1,209 @@
+#This file times each stage of the series expansion pipeline separately over a catalogue of functions, orders and grid sizes,
+#writes the timings to JSON and compares them with a stored baseline to catch performance regressions
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy
+import sympy
+from sympy.core.cache import clear_cache
+import settings
+import parser_function
+from expression_parser import compile_function
+from numeric_kernel import compile_kernel, UnsupportedExpression
+import series
+import run_experiment
+from plot_helper import plot_series_graphs
+from metrics import error_metrics_rows, as_float_array
+
+#the cases timed by default: every function at every order on every grid size
+benchmark_functions = ["sin(x)", "exp(x)", "ln(1 + x)", "1/(2 - x)", "sin(x)*exp(x)"]
+benchmark_orders = [5, 10]
+benchmark_grid_sizes = [500, 100000]
+
+#stages in pipeline order, as parser_function.compile_input_function and the experiment run them
+benchmark_stages = ("expression_parse", "kernel_compile", "series", "grid_evaluation", "error_reduction", "plotting", "csv_write")
+
+#where the committed baseline lives, and how much slower a stage may get before it counts as a regression
+baseline_path = os.path.join(settings.data_directory, "benchmark_baseline.json")
+default_threshold = 0.5      #run-to-run noise on a shared machine is around 25%
+#stage totals faster than this (seconds) are too noisy to compare
+noise_floor_seconds = 1e-3
+
+def best_time(function, repeats, before=None):
+    """
+    Calls function repeats times and returns the fastest wall-clock time in seconds
+    - before is called ahead of each run outside the timing, e.g. to clear a cache
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def time_case(function_string, num_terms, num_x_points, repeats, output_directory):
+    """
+    Times every stage of the pipeline for one function, order and grid size, with every cache bypassed
+    - the input goes through the same steps as parser_function.compile_input_function: the restricted parser on the
+      text as typed, then a numeric kernel (kernel_compile is only timed for expressions a kernel can evaluate)
+    - grid_evaluation uses the numpy function compile_input_function returns, as the experiment does
+    Returns a dictionary of stage -> best time in seconds
+    """
+    timings = {}
+    expression, _ = compile_function(function_string)
+    _, numpy_function = parser_function.compile_input_function(function_string)
+    x_grid = numpy.linspace(settings.min_x, settings.max_x, num_x_points)
+
+    timings["expression_parse"] = best_time(lambda: compile_function(function_string), repeats, before=clear_cache)
+    try:
+        compile_kernel(expression)
+    except UnsupportedExpression:
+        pass
+    else:
+        timings["kernel_compile"] = best_time(lambda: compile_kernel(expression), repeats, before=clear_cache)
+    timings["series"] = best_time(lambda: series.expand_coefficients(expression, 0.0, num_terms), repeats, before=clear_cache)
+
+    coefficients = series.compute_series_coefficients(expression, 0.0, num_terms, "sympy")
+    def evaluate_grid():
+        with numpy.errstate(all="ignore"):
+            y_true = as_float_array(numpy_function(x_grid))
+        return y_true, series.partial_sum_matrix(coefficients, 0.0, x_grid)
+    timings["grid_evaluation"] = best_time(evaluate_grid, repeats)
+
+    y_true, y_matrix = evaluate_grid()
+    timings["error_reduction"] = best_time(lambda: error_metrics_rows(y_true, y_matrix), repeats)
+
+    meta = {"function_string": function_string, "title": f"{function_string} (terms={num_terms})"}
+    plot_path = os.path.join(output_directory, "benchmark_plot.png")
+    timings["plotting"] = best_time(lambda: plot_series_graphs(x_grid, y_true, y_matrix[-1], y_matrix[-1], meta, plot_path, use_cache=False), repeats)
+
+    rows = [{"function": function_string, "approximation": "maclaurin", "centre": 0.0, "num_terms": k,
+             "max_absolute_error": 0.0, "mean_squared_error": 0.0} for k in range(len(y_matrix))]
+    csv_path = os.path.join(output_directory, "benchmark.csv")
+    timings["csv_write"] = best_time(lambda: run_experiment.write_data_to_csv(rows, csv_path), repeats)
+    return timings
+
+def case_name(function_string, num_terms, num_x_points):
+    """Returns the key of one case in the results JSON, e.g. "sin(x)|terms=5|points=500" """
+    return f"{function_string}|terms={num_terms}|points={num_x_points}"
+
+def run_benchmarks(functions=None, orders=None, grid_sizes=None, repeats=3):
+    """
+    Times every stage for every (function, order, grid size) case
+    Returns a dictionary with the environment under "meta" and case name -> stage timings under "cases"
+    """
+    if functions is None: functions = benchmark_functions
+    if orders is None: orders = benchmark_orders
+    if grid_sizes is None: grid_sizes = benchmark_grid_sizes
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "sympy": sympy.__version__,
+            "machine": platform.machine(),
+            "repeats": repeats
+        },
+        "cases": {}
+    }
+    with tempfile.TemporaryDirectory() as output_directory:
+        for function_string in functions:
+            for num_terms in orders:
+                for num_x_points in grid_sizes:
+                    name = case_name(function_string, num_terms, num_x_points)
+                    results["cases"][name] = time_case(function_string, num_terms, num_x_points, repeats, output_directory)
+                    print(f"  timed {name}")
+    return results
+
+def stage_totals(results, case_names):
+    """Returns stage -> time summed over the given cases, counting only cases that timed the stage"""
+    totals = {}
+    for name in case_names:
+        for stage, seconds in results["cases"].get(name, {}).items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+def compare_with_baseline(results, baseline, threshold=default_threshold):
+    """
+    Compares the time of each stage, summed over the cases both runs share, with the baseline
+    - summing over cases smooths out the noise of single short timings
+    - a stage regresses when it is more than threshold (relative) slower and its total is above the noise floor
+    Returns the list of (stage, baseline seconds, seconds) regressions
+    """
+    shared = [name for name in results["cases"] if name in baseline.get("cases", {})]
+    totals = stage_totals(results, shared)
+    baseline_totals = stage_totals(baseline, shared)
+    regressions = []
+    for stage in benchmark_stages:
+        seconds, baseline_seconds = totals.get(stage), baseline_totals.get(stage)
+        if seconds is None or baseline_seconds is None or seconds < noise_floor_seconds:
+            continue
+        if seconds > baseline_seconds * (1 + threshold):
+            regressions.append((stage, baseline_seconds, seconds))
+    return regressions
+
+def print_summary(results, baseline=None):
+    """
+    Prints the time of each stage summed over all cases, next to the baseline if there is one
+    """
+    totals = stage_totals(results, results["cases"])
+    baseline_totals = stage_totals(baseline, results["cases"]) if baseline is not None else {}
+    print(f"{'stage':>16} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for stage in benchmark_stages:
+        line = f"{stage:>16} {totals.get(stage, 0.0):>10.4f}"
+        if baseline_totals.get(stage):
+            line += f" {baseline_totals[stage]:>10.4f} {totals.get(stage, 0.0) / baseline_totals[stage]:>6.2f}x"
+        print(line)
+
+def main(argv=None):
+    """
+    Command line entry point, returns the exit code:
+    - 0 when nothing regressed (or there was no baseline to compare with), 1 when a stage regressed
+    """
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the series expansion pipeline")
+    parser.add_argument("--output", default=os.path.join(settings.data_directory, "benchmark_results.json"), help="where to write the timings JSON")
+    parser.add_argument("--baseline", default=baseline_path, help="baseline JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="allowed relative slowdown per stage, e.g. 0.5")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per stage, the fastest is kept")
+    parser.add_argument("--update-baseline", action="store_true", help="store these timings as the new baseline")
+    arguments = parser.parse_args(argv)
+
+    results = run_benchmarks(repeats=arguments.repeats)
+    os.makedirs(os.path.dirname(arguments.output) or ".", exist_ok=True)
+    with open(arguments.output, "w") as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+    print(f"Benchmark results saved to: {arguments.output}")
+
+    if arguments.update_baseline:
+        with open(arguments.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline updated: {arguments.baseline}")
+        print_summary(results)
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        print(f"No baseline at {arguments.baseline}, run with --update-baseline to create one")
+        print_summary(results)
+        return 0
+
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    print_summary(results, baseline)
+    regressions = compare_with_baseline(results, baseline, arguments.threshold)
+    for stage, baseline_seconds, seconds in regressions:
+        print(f"REGRESSION {stage}: {baseline_seconds * 1000:.2f} ms -> {seconds * 1000:.2f} ms")
+    if regressions:
+        print(f"{len(regressions)} stage timings regressed by more than {arguments.threshold:.0%}")
+        return 1
+    print(f"No stage regressed by more than {arguments.threshold:.0%}")
+    return 0
+
+#to run this script directly
+if __name__ == "__main__":
+    sys.exit(main())
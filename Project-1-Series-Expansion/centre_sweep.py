@@ -0,0 +1,100 @@
+#This file scans many expansion centres at once: the taylor coefficients at every centre come from
+#one batched taylor arithmetic pass, so a 1000-centre scan costs about as much as a single expansion
+import warnings
+import numpy
+import settings
+from parser_function import parse_function_to_numpy_callable
+from taylor_arithmetic import taylor_coefficients
+from metrics import as_float_array
+
+def centre_coefficient_matrix(expression, centres, num_terms):
+    """
+    Returns a (len(centres), num_terms + 1) array whose row i holds the coefficients of (x - centres[i])^k
+    - every centre is propagated through the expression tree together
+    """
+    centres = numpy.asarray(centres, dtype=float)
+    return taylor_coefficients(expression, centres, num_terms).T
+
+def centre_series_matrix(coefficient_matrix, centres, x_grid):
+    """
+    Evaluates the expansion at every centre on the grid with Horner's scheme
+    Returns a (len(centres), len(x_grid)) array where row i is the series about centres[i]
+    """
+    offsets = numpy.asarray(x_grid, dtype=float)[numpy.newaxis, :] - numpy.asarray(centres, dtype=float)[:, numpy.newaxis]
+    y_series = numpy.repeat(coefficient_matrix[:, -1:], offsets.shape[1], axis=1)
+    with numpy.errstate(all="ignore"):
+        for k in range(coefficient_matrix.shape[1] - 2, -1, -1):
+            y_series *= offsets
+            y_series += coefficient_matrix[:, k:k + 1]
+    return y_series
+
+def centre_error_matrix(function_string, centres, num_terms, x_min=None, x_max=None, num_x_points=None):
+    """
+    Builds the centre x x error matrix of the order-num_terms expansion
+    Returns (x_grid, error_matrix) where error_matrix[i, j] = |f(x_j) - series about centres[i] at x_j|
+    - the error is nan wherever f itself is not finite (e.g. ln(1 + x) at -1), since no centre can approximate it there
+    """
+    if x_min is None: x_min = settings.min_x
+    if x_max is None: x_max = settings.max_x
+    if num_x_points is None: num_x_points = settings.num_x_points
+
+    expression, numpy_function = parse_function_to_numpy_callable(function_string)
+    x_grid = numpy.linspace(x_min, x_max, num_x_points)
+    with numpy.errstate(all="ignore"):
+        y_true = as_float_array(numpy_function(x_grid))
+        coefficient_matrix = centre_coefficient_matrix(expression, centres, num_terms)
+        error_matrix = numpy.abs(centre_series_matrix(coefficient_matrix, centres, x_grid) - y_true)
+    error_matrix[:, ~numpy.isfinite(y_true)] = numpy.nan
+    return x_grid, error_matrix
+
+def centre_sweep(function_string, centres, num_terms, x_min=None, x_max=None, num_x_points=None, chunk_size=256):
+    """
+    Computes the maximum absolute error and mean squared error of the order-num_terms expansion at every centre
+    - centres are processed chunk_size at a time so the error matrix never gets too large
+    - centres where the expansion is undefined everywhere get nan
+    Returns (max_errors, mses) as numpy arrays with one value per centre
+    """
+    centres = numpy.asarray(centres, dtype=float)
+    max_errors = numpy.empty(len(centres))
+    mses = numpy.empty(len(centres))
+    for start in range(0, len(centres), chunk_size):
+        chunk = centres[start:start + chunk_size]
+        _, error_matrix = centre_error_matrix(function_string, chunk, num_terms, x_min, x_max, num_x_points)
+        with numpy.errstate(all="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)     #all-nan rows are expected for undefined centres
+            max_errors[start:start + len(chunk)] = numpy.nanmax(error_matrix, axis=1) if error_matrix.shape[1] else numpy.nan
+            mses[start:start + len(chunk)] = numpy.nanmean(error_matrix**2, axis=1) if error_matrix.shape[1] else numpy.nan
+    return max_errors, mses
+
+def optimal_centre(function_string, num_terms, x_min=None, x_max=None, num_x_points=None, num_centres=1001, refinements=2):
+    """
+    Finds the expansion centre in [x_min, x_max] that minimises the maximum absolute error of the order-num_terms expansion
+    - scans num_centres evenly spaced centres, then rescans num_centres centres around the best one refinements times
+      (a single centre is just x_min, with nothing to refine)
+    Returns (best_centre, best_max_error), best_centre is None if the expansion is undefined at every centre scanned
+    """
+    if x_min is None: x_min = settings.min_x
+    if x_max is None: x_max = settings.max_x
+
+    low, high = x_min, x_max
+    best_centre, best_error = None, numpy.inf
+    for _ in range(refinements + 1):
+        centres = numpy.linspace(low, high, num_centres)
+        max_errors, _ = centre_sweep(function_string, centres, num_terms, x_min, x_max, num_x_points)
+        ranked = numpy.where(numpy.isnan(max_errors), numpy.inf, max_errors)
+        i = int(numpy.argmin(ranked))
+        if ranked[i] <= best_error:
+            best_centre, best_error = float(centres[i]), float(ranked[i])
+
+        #zoom in on the neighbouring centres of the best one
+        if num_centres < 2 or best_centre is None:
+            break
+        spacing = (high - low) / (num_centres - 1)
+        low, high = max(x_min, best_centre - spacing), min(x_max, best_centre + spacing)
+    return best_centre, best_error
+
+#to test this script directly
+if __name__ == "__main__":
+    for function_string in ["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)"]:
+        centre, error = optimal_centre(function_string, settings.default_num_terms)
+        print(f"{function_string}: best centre {centre:.4f} with max error {error:.3e} ({settings.default_num_terms} terms)")
@@ -0,0 +1,142 @@
+#This file stores series coefficient vectors on disk so new runs of the experiment or GUI
+#can reuse expansions computed by earlier runs instead of calling sympy.series again
+import glob
+import hashlib
+import os
+import numpy
+from sympy import srepr
+import settings
+
+#running estimate of the size in bytes of each store folder, kept by this process so a save only has to scan the
+#store when the estimate goes over the limit (writes by other processes are picked up by that scan)
+store_bytes = {}
+
+#fraction of settings.coefficient_cache_max_bytes a full store is trimmed down to, so the next scan is many saves away
+eviction_target = 0.75
+
+def store_directory():
+    """
+    Returns the folder holding the cached coefficient files, inside settings.data_directory
+    """
+    return os.path.join(settings.data_directory, settings.coefficient_cache_directory)
+
+def coefficient_key(expression, centre, backend):
+    """
+    Returns a canonical hash for an expansion of the expression about the centre
+    - srepr gives the full structure of the sympy expression, so equal expressions hash the same
+    """
+    text = f"{srepr(expression)}|{float(centre)!r}|{backend}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def coefficient_filename(key, num_terms):
+    """
+    Returns the filename for a coefficient vector of the given order
+    - the version stamp comes first so entries written by another version are never read
+    """
+    return f"v{settings.coefficient_cache_version}_{key}_{num_terms}.npy"
+
+def stored_orders(key):
+    """
+    Returns a list of (num_terms, path) for every stored file of this key in the current version
+    """
+    pattern = os.path.join(store_directory(), coefficient_filename(key, "*"))
+    orders = []
+    for path in glob.glob(pattern):
+        order_text = os.path.basename(path)[:-len(".npy")].rsplit("_", 1)[-1]
+        if order_text.isdigit():
+            orders.append((int(order_text), path))
+    return sorted(orders)
+
+def load_coefficients(expression, centre, num_terms, backend):
+    """
+    Returns the stored coefficients (c_0, ..., c_num_terms) as a float64 numpy array, or None if not stored
+    - any stored vector of at least this order is truncated to the requested order
+    """
+    key = coefficient_key(expression, centre, backend)
+    for order, path in stored_orders(key):
+        if order < num_terms:
+            continue
+        try:
+            coefficients = numpy.load(path)
+        except (OSError, ValueError):
+            continue    #removed by another process or only partly written
+        if coefficients.shape != (order + 1,):
+            continue
+        os.utime(path)  #mark as recently used for eviction
+        return coefficients[:num_terms + 1]
+    return None
+
+def save_coefficients(expression, centre, coefficients, backend):
+    """
+    Writes the coefficient vector to disk, replacing lower-order vectors of the same expansion
+    then evicts old entries if the store is over settings.coefficient_cache_max_bytes
+    - the size of the store is tracked as a running estimate, it is only rescanned by evict_coefficients
+      on the first save and whenever the estimate goes over the limit, which trims it to eviction_target of the limit
+    """
+    os.makedirs(store_directory(), exist_ok=True)
+    key = coefficient_key(expression, centre, backend)
+    num_terms = len(coefficients) - 1
+    path = os.path.join(store_directory(), coefficient_filename(key, num_terms))
+
+    #write to a temporary file first so readers never see a partial array
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        numpy.save(file, numpy.asarray(coefficients, dtype=float))
+    os.replace(temporary_path, path)
+    added_bytes = file_size(path)
+
+    for order, old_path in stored_orders(key):
+        if order < num_terms:
+            added_bytes -= file_size(old_path)
+            remove_file(old_path)
+
+    estimate = store_bytes.get(store_directory())
+    if estimate is None:
+        evict_coefficients()
+    elif estimate + added_bytes > settings.coefficient_cache_max_bytes:
+        evict_coefficients(int(settings.coefficient_cache_max_bytes * eviction_target))
+    else:
+        store_bytes[store_directory()] = estimate + added_bytes
+
+def evict_coefficients(max_bytes=None):
+    """
+    Deletes entries from other versions, then the least recently used entries until the store fits in max_bytes
+    - max_bytes defaults to settings.coefficient_cache_max_bytes
+    - scans every file in the store, and resets the running size estimate used by save_coefficients
+    """
+    if max_bytes is None:
+        max_bytes = settings.coefficient_cache_max_bytes
+    current_prefix = f"v{settings.coefficient_cache_version}_"
+
+    entries = []
+    for path in glob.glob(os.path.join(store_directory(), "*.npy")):
+        if not os.path.basename(path).startswith(current_prefix):
+            remove_file(path)   #stale version
+            continue
+        try:
+            status = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((status.st_mtime, status.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        remove_file(path)
+        total_bytes -= size
+    store_bytes[store_directory()] = total_bytes
+
+def file_size(path):
+    """Returns the size of a file in bytes, 0 if another process already removed it"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+def remove_file(path):
+    """Removes a file, ignoring it if another process already removed it"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,11 +1,17 @@
 import pygame
 import sys
 import os
+import threading
 import settings
-from series import evaluate_series_function
-from plot_helper import plot_series_graphs
+from job_worker import JobWorker
+import instrumentation  # per-stage timings of the last job when settings.instrumentation is on
 import numpy  # used in callbacks to compute stats
 
+# plots are drawn on the worker thread, so use the non-interactive backend whenever matplotlib gets imported
+os.environ["MPLBACKEND"] = "Agg"
+# sympy, matplotlib and the modules built on them (series, plot_helper, live_plot) are imported inside the jobs
+# that need them, so the window appears without waiting for them; warm_up_imports loads them in the background
+
 # initialise pygame
 pygame.init()
 
@@ -115,8 +121,10 @@ input_box = TextInput(16, 64, panel_width - 32, 36, "exp(x)")
 centre_input = TextInput(16, 320, panel_width - 32, 28, "0.0")
 num_terms_input = TextInput(16, 360, panel_width - 32, 28, "5")
 
-last_plot_surface = None    # will hold pygame Surface loaded from saved PNG
+last_plot_surface = None    # will hold pygame Surface sharing the pixels of the last rendered plot
+last_plot_canvas = None     # Agg canvas owning those pixels, kept alive while the surface is shown
 last_plot_path = None       # path to last saved PNG file
+live_plot = None            # LivePlot drawn natively in the preview area while live mode is on
 
 # experiment stats container for UI display (populated by run_experiment callback)
 experiment_stats = {
@@ -128,76 +136,21 @@ experiment_stats = {
     "num_terms_used": None
 }
 
-# --- callbacks with inline evaluation & plotting (keeps code simple) ---
-
-def start_maclaurin_plot():
-    """
-    Callback to compute series (Maclaurin centre=0), save plot PNG and load it into pygame.
-    This runs inline and will block the UI while computing/saving the plot.
-    """
-    global last_plot_surface, last_plot_path
-    fn = input_box.text.strip() or "exp(x)"
-
-    # evaluate the true function and both approximations using the series module
-    x, y_true, y_mac, y_tay, meta = evaluate_series_function(
-        fn,
-        centre=0.0,
-        maclaurin_num_terms=settings.default_num_terms,
-        taylor_num_terms=settings.default_num_terms,
-        x_min=settings.min_x,
-        x_max=settings.max_x,
-        num_x_points=settings.num_x_points
-    )
-
-    # save plot to PNG
-    safe_fn = fn.replace('/', '_div_').replace(' ', '')
-    out_fname = os.path.join(settings.plots_directory, f"{safe_fn}_plot.png")
-    plot_series_graphs(x, y_true, y_mac, y_tay, meta, out_filename=out_fname)
-
-    # load saved PNG and prepare preview surface
-    last_plot_path = out_fname
-    last_plot_surface = pygame.image.load(last_plot_path).convert()
-    last_plot_surface = pygame.transform.smoothscale(
-        last_plot_surface, (display_width - 40, screen_height - 80)
-    )
-
-def start_taylor_plot():
-    """
-    Callback to compute series centered at 0.5 (example), save plot PNG and load it into pygame.
-    """
-    global last_plot_surface, last_plot_path
-    fn = input_box.text.strip() or "exp(x)"
-
-    # evaluate with centre 0.5
-    x, y_true, y_mac, y_tay, meta = evaluate_series_function(
-        fn,
-        centre=0.5,
-        maclaurin_num_terms=settings.default_num_terms,
-        taylor_num_terms=settings.default_num_terms,
-        x_min=settings.min_x,
-        x_max=settings.max_x,
-        num_x_points=settings.num_x_points
-    )
+# background workers so expansion, plotting and PNG saving never block the event loop
+worker = JobWorker()
+save_worker = JobWorker()   # writes PNG copies of the previews to disk after they are shown
 
-    # save & load image
-    safe_fn = fn.replace('/', '_div_').replace(' ', '')
-    out_fname = os.path.join(settings.plots_directory, f"{safe_fn}_plot.png")
-    plot_series_graphs(x, y_true, y_mac, y_tay, meta, out_filename=out_fname)
-    last_plot_path = out_fname
-    last_plot_surface = pygame.image.load(last_plot_path).convert()
-    last_plot_surface = pygame.transform.smoothscale(
-        last_plot_surface, (display_width - 40, screen_height - 80)
-    )
+# size of the plot preview inside the right-side display rectangle
+preview_width = display_width - 40
+preview_height = screen_height - 80
+last_error = None           # message of the last job that failed, shown in the left panel
+last_job_timings = None     # (wall seconds, [(name, seconds, calls) per stage, slowest first]) of the last finished job
 
-def start_run_experiment():
+def read_experiment_inputs():
     """
-    Runs a single experiment instance using the user-specified centre and number of terms.
-    Populates experiment_stats with error values and updates the preview image.
+    Reads the centre and number of terms inputs, falling back to defaults for invalid values
+    Returns (centre, num_terms) with num_terms clamped to 1..settings.max_num_terms
     """
-    global last_plot_surface, last_plot_path, experiment_stats
-
-    # read inputs
-    fn = input_box.text.strip() or "exp(x)"
     # parse centre input safely
     centre_text = centre_input.text.strip()
     try:
@@ -214,51 +167,263 @@ def start_run_experiment():
             num_terms_val = settings.max_num_terms
     except Exception:
         num_terms_val = settings.default_num_terms
+    return centre_val, num_terms_val
 
-    # evaluate series with given parameters
-    x, y_true, y_mac, y_tay, meta = evaluate_series_function(
-        fn,
-        centre=centre_val,
-        maclaurin_num_terms=num_terms_val,
-        taylor_num_terms=num_terms_val,
-        x_min=settings.min_x,
-        x_max=settings.max_x,
-        num_x_points=settings.num_x_points
-    )
+def compute_plot_job(job, fn, centre, num_terms, with_stats):
+    """
+    Background job: records the stage timings of compute_plot if settings.instrumentation is on.
+    Returns the dictionary from compute_plot with the timings (or None) added.
+    """
+    with instrumentation.recording(job.name) as job_recording:
+        result = compute_plot(job, fn, centre, num_terms, with_stats)
+    result["timings"] = (job_recording.elapsed(), job_recording.summary()) if job_recording is not None else None
+    return result
 
-    # compute error stats using numpy, ignoring NaNs
-    with numpy.errstate(all="ignore"):
-        mac_diff = numpy.abs(y_true - y_mac)
-        mac_max_err = float(numpy.nanmax(mac_diff)) if mac_diff.size else float('nan')
-        mac_mse = float(numpy.nanmean((y_true - y_mac)**2)) if y_true.size else float('nan')
-
-        tay_diff = numpy.abs(y_true - y_tay)
-        tay_max_err = float(numpy.nanmax(tay_diff)) if tay_diff.size else float('nan')
-        tay_mse = float(numpy.nanmean((y_true - y_tay)**2)) if y_true.size else float('nan')
-
-    # store stats for UI display
-    experiment_stats["maclaurin_max_error"] = mac_max_err
-    experiment_stats["maclaurin_mse"] = mac_mse
-    experiment_stats["taylor_max_error"] = tay_max_err
-    experiment_stats["taylor_mse"] = tay_mse
-    experiment_stats["centre_used"] = centre_val
-    experiment_stats["num_terms_used"] = num_terms_val
-
-    # save the plot and load preview
-    safe_fn = fn.replace('/', '_div_').replace(' ', '')
-    out_fname = os.path.join(settings.plots_directory, f"{safe_fn}_plot.png")
-    plot_series_graphs(x, y_true, y_mac, y_tay, meta, out_filename=out_fname)
-    last_plot_path = out_fname
-    last_plot_surface = pygame.image.load(last_plot_path).convert()
-    last_plot_surface = pygame.transform.smoothscale(
-        last_plot_surface, (display_width - 40, screen_height - 80)
+def compute_plot(job, fn, centre, num_terms, with_stats):
+    """
+    Evaluates the series, optionally computes error stats and renders the plot in memory
+    at exactly the preview size. Saving the PNG (if settings.save_preview_plots) is handed to save_worker.
+    Runs on the worker thread, so it must not touch pygame surfaces.
+    Plots without stats evaluate the true function in float32 if settings.preview_float32 is on.
+    Returns a dictionary with the rendered canvas, the PNG path (or None) and the stats (or None).
+    """
+    from series import evaluate_series_function
+    from streaming_evaluation import evaluate_series_streaming
+    from metrics import error_metrics, MetricBuffers
+    from plot_helper import render_series_graphs
+    job.report("expanding series")
+    stats = None
+    if settings.num_x_points > settings.stream_threshold_points:
+        # very large grids are walked in chunks, only a downsampled copy comes back for plotting
+        x, y_true, y_mac, y_tay, meta, streamed_stats = evaluate_series_streaming(
+            fn,
+            centre=centre,
+            maclaurin_num_terms=num_terms,
+            taylor_num_terms=num_terms,
+            x_min=settings.min_x,
+            x_max=settings.max_x,
+            num_x_points=settings.num_x_points
+        )
+        if with_stats:
+            stats = streamed_stats
+    else:
+        x, y_true, y_mac, y_tay, meta = evaluate_series_function(
+            fn,
+            centre=centre,
+            maclaurin_num_terms=num_terms,
+            taylor_num_terms=num_terms,
+            x_min=settings.min_x,
+            x_max=settings.max_x,
+            num_x_points=settings.num_x_points,
+            dtype=numpy.float32 if settings.preview_float32 and not with_stats else None
+        )
+    job.check_cancelled()
+
+    if with_stats and stats is None:
+        # every error metric from one difference per series, ignoring NaNs, sharing the scratch buffers
+        buffers = MetricBuffers(y_mac.size)
+        mac_metrics = error_metrics(y_true, y_mac, buffers)
+        tay_metrics = error_metrics(y_true, y_tay, buffers)
+        stats = {
+            "maclaurin_max_error": mac_metrics["max_absolute_error"],
+            "maclaurin_mse": mac_metrics["mean_squared_error"],
+            "taylor_max_error": tay_metrics["max_absolute_error"],
+            "taylor_mse": tay_metrics["mean_squared_error"],
+            "centre_used": centre,
+            "num_terms_used": num_terms
+        }
+
+    # render the plot straight into memory at the preview size
+    job.report("plotting")
+    canvas = render_series_graphs(x, y_true, y_mac, y_tay, meta, preview_width, preview_height)
+    job.check_cancelled()
+
+    # save a PNG copy in the background without holding up the preview
+    out_fname = None
+    if settings.save_preview_plots:
+        safe_fn = fn.replace('/', '_div_').replace(' ', '')
+        out_fname = os.path.join(settings.plots_directory, f"{safe_fn}_plot.png")
+        save_worker.submit("Save plot", save_plot_job, x, y_true, y_mac, y_tay, meta, out_fname)
+    return {"canvas": canvas, "path": out_fname, "stats": stats}
+
+def save_plot_job(job, x, y_true, y_mac, y_tay, meta, out_fname):
+    """Background job: saves the plot PNG to disk with plot_series_graphs"""
+    from plot_helper import plot_series_graphs
+    job.report("saving")
+    return plot_series_graphs(x, y_true, y_mac, y_tay, meta, out_filename=out_fname)
+
+def start_maclaurin_plot():
+    """
+    Callback to compute series (Maclaurin centre=0), save plot PNG and load it into pygame.
+    The work runs on the background worker, poll_jobs picks up the result.
+    """
+    fn = input_box.text.strip() or "exp(x)"
+    worker.submit("Maclaurin plot", compute_plot_job, fn, 0.0, settings.default_num_terms, False)
+
+def start_taylor_plot():
+    """
+    Callback to compute series centered at 0.5 (example), save plot PNG and load it into pygame.
+    """
+    fn = input_box.text.strip() or "exp(x)"
+    worker.submit("Taylor plot", compute_plot_job, fn, 0.5, settings.default_num_terms, False)
+
+def start_run_experiment():
+    """
+    Runs a single experiment instance using the user-specified centre and number of terms.
+    Populates experiment_stats with error values and updates the preview image once the job finishes.
+    """
+    fn = input_box.text.strip() or "exp(x)"
+    centre_val, num_terms_val = read_experiment_inputs()
+    worker.submit("Experiment", compute_plot_job, fn, centre_val, num_terms_val, True)
+
+def poll_jobs():
+    """
+    Called once per frame by the main loop: applies the result of a finished background job.
+    Wrapping the rendered pixels in a surface happens here because pygame surfaces belong to the main thread.
+    """
+    global last_plot_surface, last_plot_canvas, last_plot_path, last_error, live_plot, last_job_timings
+    finished = worker.poll()
+    if finished is None:
+        return
+    job, result, error = finished
+    if error is not None:
+        last_error = f"{job.name} failed: {error}"[:48]
+        # a plot job that replaced a pending live centre job must not leave live mode waiting on it
+        if job.function is not compute_live_centre_job:
+            resume_live_expansion()
+        return
+
+    # a new live mode centre is added to the live plot here, so its cache is only ever changed on the main thread
+    # (an error from the job it resumed after is left on screen)
+    if "live_centre" in result:
+        live, centre, data = result["live_centre"]
+        if live is live_plot:
+            live_plot.add_series_data(centre, data)
+            experiment_stats.update(live_plot.stats())
+            resume_live_expansion()
+        return
+    last_error = None
+
+    # live mode results replace the static preview until it is switched off
+    if "live_plot" in result:
+        live_plot = result["live_plot"]
+        experiment_stats.update(live_plot.stats())
+        return
+    live_plot = None
+
+    # store stats and timings for UI display
+    last_job_timings = result["timings"]
+    if result["stats"] is not None:
+        experiment_stats.update(result["stats"])
+
+    # wrap the canvas' RGBA buffer in a surface without copying it, it is already the preview size
+    last_plot_canvas = result["canvas"]
+    last_plot_path = result["path"]
+    last_plot_surface = pygame.image.frombuffer(
+        last_plot_canvas.buffer_rgba(), last_plot_canvas.get_width_height(), "RGBA"
     )
 
+def compute_live_plot_job(job, fn, centre, num_terms):
+    """
+    Background job: precomputes every order up to settings.max_num_terms for live mode.
+    Returns a dictionary with the LivePlot.
+    """
+    from live_plot import LivePlot
+    job.report("precomputing all orders")
+    return {"live_plot": LivePlot(fn, centre=centre, num_terms=num_terms)}
+
+def compute_live_centre_job(job, live, centre):
+    """
+    Background job: expands the live plot's series about a new centre, so Left/Right never block the main loop.
+    Returns a dictionary with (live plot, centre, series data), poll_jobs adds the data to that live plot.
+    """
+    job.report(f"expanding at centre {centre:g}")
+    return {"live_centre": (live, centre, live.compute_series_data(centre))}
+
+def resume_live_expansion():
+    """
+    Resubmits the live plot's current centre if it is still waiting to be expanded and the worker is idle,
+    e.g. after a plot job cancelled the live centre job and then failed, so live mode never stays on "expanding"
+    """
+    if live_plot is not None and live_plot.needs_expansion() and worker.current_job() is None:
+        worker.submit("Live centre", compute_live_centre_job, live_plot, live_plot.centre)
+
+def toggle_live_mode():
+    """
+    Callback for the Live Mode button: switches the preview between the static plot and the live plot,
+    where Up/Down change the number of terms and Left/Right move the centre every frame.
+    """
+    global live_plot
+    if live_plot is not None:
+        live_plot = None
+        return
+    fn = input_box.text.strip() or "exp(x)"
+    centre_val, num_terms_val = read_experiment_inputs()
+    worker.submit("Live mode", compute_live_plot_job, fn, centre_val, num_terms_val)
+
+def handle_live_event(event):
+    """Passes arrow keys to the live plot while live mode is on and no text input has focus"""
+    if live_plot is None or event.type != pygame.KEYDOWN:
+        return
+    if input_box.active or centre_input.active or num_terms_input.active:
+        return
+    if live_plot.handle_key(event.key):
+        if live_plot.needs_expansion():
+            # newer presses replace this job, so holding an arrow key only expands where it stops
+            worker.submit("Live centre", compute_live_centre_job, live_plot, live_plot.centre)
+        experiment_stats.update(live_plot.stats())
+
+def draw_live_preview(surface, rect):
+    """Draws the live plot into the preview rectangle"""
+    from live_plot import draw_live_plot   # already imported by the job that built live_plot
+    draw_live_plot(surface, rect, live_plot, small_font, dark_grey)
+
+def warm_up_imports():
+    """
+    Imports the heavy modules (sympy, matplotlib and the series and plotting code) so the first click
+    does not wait for them, and parses the default function
+    """
+    import series
+    import plot_helper
+    import live_plot
+    from parser_function import parse_function_to_numpy_callable
+    parse_function_to_numpy_callable(input_box.text.strip() or "exp(x)")
+
+def start_warm_up():
+    """Runs warm_up_imports on a background thread, called by main.py once the window is shown"""
+    threading.Thread(target=warm_up_imports, name="warm-up", daemon=True).start()
+
+def job_timing_lines(max_stages=6, stages_per_line=3):
+    """
+    Returns the timing breakdown of the last job as at most two short text lines, slowest stages first,
+    sized for the strip under the preview plot
+    - stages can nest (e.g. parse contains expression_parse), so they do not add up to the total
+    """
+    if not last_job_timings:
+        return []
+    wall_seconds, stages = last_job_timings
+    parts = [f"{name}: {1000 * seconds:.1f} ms" + (f" x{calls}" if calls > 1 else "") for name, seconds, calls in stages[:max_stages]]
+    lines = [f"Last job: {1000 * wall_seconds:.0f} ms   " + "   ".join(parts[:stages_per_line])]
+    if parts[stages_per_line:]:
+        lines.append("   ".join(parts[stages_per_line:2 * stages_per_line]))
+    return lines
+
+def job_status_text():
+    """Returns the status line for the left panel: the running job, the last error or None"""
+    job = worker.current_job()
+    if job is not None:
+        return f"Computing... ({job.progress})"
+    return last_error
+
 # create button instances, passing the callbacks defined above
 btn_mac = Button(16, 120, panel_width - 32, 44, "Plot Maclaurin", start_maclaurin_plot)
 btn_tay = Button(16, 176, panel_width - 32, 44, "Plot Taylor (c=0.5)", start_taylor_plot)
 btn_exp = Button(16, 232, panel_width - 32, 44, "Run Experiment (single)", start_run_experiment)
 
+# button in the top-right corner of the preview area, drawn on top of the preview
+btn_live = Button(screen_width - 170, 16, 150, 32, "Live Mode", toggle_live_mode)
+
 # list of buttons for event handling and drawing
 buttons = [btn_mac, btn_tay, btn_exp]
+preview_buttons = [btn_live]
 
@@ -0,0 +1,244 @@
+#This file plans a sweep as a graph of distinct work items (parse, grid, true function evaluation, expansion per centre,
+#partial sums per centre, error metrics per centre) so each one runs exactly once, however many
+#(function, centre) units of the sweep need it, e.g. the maclaurin series is shared by every centre
+import numpy
+from series import series_coefficients, partial_sum_matrix
+from centre_sweep import centre_coefficient_matrix     #taylor_ad expansions at many centres in one pass
+from parser_function import parse_function_to_numpy_callable
+from adaptive_error import adaptive_max_absolute_error     #max error estimate with few evaluations
+from streaming_evaluation import streaming_series_errors, SeriesChunkEvaluator     #constant-memory errors for very large grids
+from metrics import error_metrics_rows, as_float_array     #fused single-pass error metrics
+import instrumentation      #optional per-stage timings
+import settings
+
+#kinds of work item in the order they run for one unit, and the instrumentation stage each one is timed as
+item_kinds = ("parse", "grid", "true_evaluation", "expansion", "partial_sums", "metrics")
+item_stages = {
+    "parse": "parse",
+    "grid": "grid",
+    "true_evaluation": "true_evaluation",
+    "expansion": "series_coefficients",
+    "partial_sums": "partial_sums",
+    "metrics": "error_reduction"
+}
+
+def adaptive_series_max_error(numpy_function, coefficients, centre, x_min, x_max):
+    """
+    Estimates the maximum absolute error of the series with these coefficients adaptively
+    Returns (max_error, number of evaluations used)
+    """
+    def error_function(x_values):
+        y_true = as_float_array(numpy_function(x_values))
+        y_series = partial_sum_matrix(coefficients, centre, x_values, [len(coefficients) - 1])[0]
+        return numpy.abs(y_true - y_series)
+    return adaptive_max_absolute_error(error_function, x_min, x_max)
+
+def grid_mean_squared_errors(y_true, coefficients, centre, x_grid, orders):
+    """
+    Returns the mean squared error on the grid of every partial sum in orders (ignoring nan points) as a numpy array
+    - used in adaptive mode, where the maximum comes from adaptive_series_max_error: no partial sum matrix is kept
+      and no grid maximum is reduced, the partial sums are built one order at a time in preallocated buffers
+    """
+    y_true = numpy.broadcast_to(y_true, x_grid.shape)
+    evaluator = SeriesChunkEvaluator(coefficients, centre, len(x_grid))
+    difference = numpy.empty(len(x_grid))
+    nan_mask = numpy.empty(len(x_grid), dtype=bool)
+    mses = {}
+    for order, partial_sum in evaluator.partial_sums(x_grid, orders):
+        with numpy.errstate(all="ignore"):
+            numpy.subtract(partial_sum, y_true, out=difference)
+            difference *= difference
+        numpy.isnan(difference, out=nan_mask)
+        numpy.copyto(difference, 0.0, where=nan_mask)
+        count = difference.size - int(numpy.count_nonzero(nan_mask))
+        mses[order] = float(difference.sum()) / count if count else float("nan")
+    return numpy.array([mses[order] for order in orders])
+
+class ExperimentPlan:
+    """
+    Dependency graph of the distinct work items of a sweep, run lazily and at most once each
+    - items are keyed by tuples: ("parse", function), ("grid",), ("true_evaluation", function),
+      ("expansion", function, centre), ("partial_sums", function, centre), ("metrics", function, centre)
+    - the maclaurin series of a function is the ("...", function, 0.0) items, shared with a taylor series at centre 0
+    - requested counts how often each kind would run if every (function, centre) unit computed
+      its own maclaurin and taylor series, ran counts how often it actually ran
+    - intermediate results (grids, y values, partial sums) are dropped as soon as nothing left needs them,
+      the metrics of every (function, centre) are kept for building rows
+    - with the taylor_ad backend, the expansions of a function with several series centres all come from one
+      centre_sweep.centre_coefficient_matrix pass, run by the first of its expansion items (the others take their row)
+    """
+    def __init__(self, functions, centres, num_terms_list, x_min=None, x_max=None, num_x_points=None, backend=None, adaptive_max_error=None):
+        if x_min is None: x_min = settings.min_x
+        if x_max is None: x_max = settings.max_x
+        if num_x_points is None: num_x_points = settings.num_x_points
+        if adaptive_max_error is None: adaptive_max_error = settings.adaptive_max_error
+        self.num_terms_list = list(num_terms_list)
+        self.x_min, self.x_max, self.num_x_points = x_min, x_max, num_x_points
+        self.backend = backend
+        self.adaptive_max_error = adaptive_max_error
+        #grids larger than this are walked in chunks, so there is no grid, y_true or partial sum matrix to share
+        self.streaming = num_x_points > settings.stream_threshold_points
+
+        self.results = {}
+        self.consumers = {}     #key -> number of planned items still waiting for its result
+        self.planned = set()
+        for function_string in functions:
+            for centre in centres:
+                for series_centre in (0.0, centre):
+                    self.plan(("metrics", function_string, float(series_centre)))
+
+        #what running every (function, centre) unit on its own would cost: one parse, grid and true evaluation per unit,
+        #and one expansion, partial sum and error reduction per series in each unit (every order comes from the same expansion)
+        units = len(functions) * len(centres)
+        per_unit = {"parse": 1, "grid": 1, "true_evaluation": 1, "expansion": 2, "partial_sums": 2, "metrics": 2}
+        self.requested = {kind: units * per_unit[kind] if any(key[0] == kind for key in self.planned) else 0 for kind in item_kinds}
+        self.ran = dict.fromkeys(item_kinds, 0)
+
+        #function -> series centres expanded together, and function -> {centre: coefficients} not yet taken by an item
+        self.batched_centres = {}
+        self.expansion_batches = {}
+        if (backend or settings.series_backend) == "taylor_ad":
+            for function_string in functions:
+                series_centres = sorted({key[2] for key in self.planned if key[:2] == ("expansion", function_string)})
+                if len(series_centres) > 1:
+                    self.batched_centres[function_string] = series_centres
+
+    def dependencies(self, key):
+        """Returns the keys of the items the item with this key is computed from"""
+        kind, arguments = key[0], key[1:]
+        if kind == "true_evaluation":
+            return [("parse", arguments[0]), ("grid",)]
+        if kind == "expansion":
+            return [("parse", arguments[0])]
+        if kind == "partial_sums":
+            return [("expansion", *arguments), ("grid",)]
+        if kind == "metrics":
+            if self.streaming:
+                return [("parse", arguments[0]), ("expansion", *arguments)]
+            if self.adaptive_max_error:
+                #the grid is only needed for the mean squared error, so no partial sum matrix is built
+                return [("true_evaluation", arguments[0]), ("grid",), ("parse", arguments[0]), ("expansion", *arguments)]
+            return [("true_evaluation", arguments[0]), ("partial_sums", *arguments)]
+        return []
+
+    def plan(self, key):
+        """Adds the item and everything it depends on to the graph, counting how many items consume each result"""
+        if key in self.planned:
+            return
+        self.planned.add(key)
+        for dependency in self.dependencies(key):
+            self.consumers[dependency] = self.consumers.get(dependency, 0) + 1
+            self.plan(dependency)
+
+    def result(self, key):
+        """
+        Returns the result of an item, running it (and whatever it depends on) the first time it is asked for
+        """
+        if key in self.results:
+            return self.results[key]
+        inputs = [self.result(dependency) for dependency in self.dependencies(key)]
+        with instrumentation.stage(item_stages[key[0]]):
+            value = self.run_item(key, inputs)
+        self.ran[key[0]] += 1
+        self.results[key] = value
+
+        #drop intermediate results nothing left in the plan needs
+        for dependency in self.dependencies(key):
+            self.consumers[dependency] -= 1
+            if self.consumers[dependency] == 0:
+                del self.results[dependency]
+        return value
+
+    def run_item(self, key, inputs):
+        """Computes one item from the results of its dependencies"""
+        kind, arguments = key[0], key[1:]
+        if kind == "parse":
+            return parse_function_to_numpy_callable(arguments[0])
+        if kind == "grid":
+            return numpy.linspace(self.x_min, self.x_max, self.num_x_points)
+        if kind == "true_evaluation":
+            (_, numpy_function), x_grid = inputs
+            with numpy.errstate(all="ignore"):
+                return as_float_array(numpy_function(x_grid))
+        if kind == "expansion":
+            (expression, _), = inputs
+            if arguments[0] in self.batched_centres:
+                return self.batched_expansion(expression, *arguments)
+            return series_coefficients(expression, arguments[1], max(self.num_terms_list), self.backend)
+        if kind == "partial_sums":
+            coefficients, x_grid = inputs
+            return partial_sum_matrix(coefficients, arguments[1], x_grid, self.num_terms_list)
+        return self.run_metrics(arguments[1], dict(zip((dependency[0] for dependency in self.dependencies(key)), inputs)))
+
+    def batched_expansion(self, expression, function_string, centre):
+        """
+        Returns the taylor_ad coefficients about the centre, expanding the function about all of its batched centres
+        in one pass the first time one of them is asked for
+        """
+        batch = self.expansion_batches.get(function_string)
+        if batch is None:
+            centres = self.batched_centres[function_string]
+            coefficient_matrix = centre_coefficient_matrix(expression, centres, max(self.num_terms_list))
+            batch = self.expansion_batches[function_string] = dict(zip(centres, coefficient_matrix))
+        coefficients = batch.pop(centre)
+        if not batch:
+            del self.expansion_batches[function_string]     #every centre has taken its row
+        return coefficients
+
+    def run_metrics(self, centre, inputs):
+        """
+        Returns (max_errors, mses, evaluations) of every order of one series from the results of its dependencies (by kind)
+        - evaluations is None unless adaptive_max_error is on, the grid then only gives the mean squared errors
+        """
+        if self.adaptive_max_error and not self.streaming:
+            mses = grid_mean_squared_errors(inputs["true_evaluation"], inputs["expansion"], centre, inputs["grid"], self.num_terms_list)
+            max_errors = numpy.empty(len(self.num_terms_list))
+        elif self.streaming:
+            _, numpy_function = inputs["parse"]
+            max_errors, mses = streaming_series_errors(numpy_function, inputs["expansion"], centre, self.num_terms_list, self.x_min, self.x_max, self.num_x_points)
+        else:
+            errors = error_metrics_rows(inputs["true_evaluation"], inputs["partial_sums"])
+            max_errors, mses = errors["max_absolute_error"], errors["mean_squared_error"]
+        if not self.adaptive_max_error:
+            return max_errors, mses, None
+
+        _, numpy_function = inputs["parse"]
+        evaluations = numpy.zeros(len(self.num_terms_list), dtype=int)
+        for i, num_terms in enumerate(self.num_terms_list):
+            max_errors[i], evaluations[i] = adaptive_series_max_error(numpy_function, inputs["expansion"][:num_terms + 1], centre, self.x_min, self.x_max)
+        return max_errors, mses, evaluations
+
+    def unit_rows(self, function_string, centre):
+        """
+        Returns the data rows of one (function, centre) unit, a maclaurin and a taylor row for each order,
+        in the same format as run_experiment.run_work_unit
+        """
+        rows = []
+        maclaurin = self.result(("metrics", function_string, 0.0))
+        taylor = self.result(("metrics", function_string, float(centre)))
+        for i, num_terms in enumerate(self.num_terms_list):
+            for approximation, (max_errors, mses, evaluations) in (("maclaurin", maclaurin), ("taylor", taylor)):
+                rows.append({
+                    "function": function_string,
+                    "approximation": approximation,
+                    "centre": centre,
+                    "num_terms": num_terms,
+                    "max_absolute_error": float(max_errors[i]),
+                    "mean_squared_error": float(mses[i])
+                })
+                if evaluations is not None:
+                    rows[-1]["max_error_evaluations"] = int(evaluations[i])
+        return rows
+
+    def reuse_summary(self):
+        """Returns (kind, requested, ran, reused) for every kind of item that was requested"""
+        return [(kind, self.requested[kind], self.ran[kind], self.requested[kind] - self.ran[kind]) for kind in item_kinds if self.requested[kind]]
+
+    def reuse_table(self):
+        """Returns the reuse summary as a printable table"""
+        lines = ["Work shared across the sweep:", f"{'item':>16} {'requested':>10} {'ran':>6} {'reused':>7}"]
+        for kind, requested, ran, reused in self.reuse_summary():
+            lines.append(f"{kind:>16} {requested:>10} {ran:>6} {reused:>7}")
+        requested, ran = sum(self.requested.values()), sum(self.ran.values())
+        lines.append(f"{'total':>16} {requested:>10} {ran:>6} {requested - ran:>7}")
+        return "\n".join(lines)
@@ -0,0 +1,82 @@
+#This file provides a bounded least-recently-used cache shared by the parsing and series modules
+#so the same function string is not parsed and compiled again on every call
+from collections import OrderedDict
+import threading
+
+#every cache created, by name, so their counters can be reported together
+caches = {}
+
+class LRUCache:
+    """
+    Thread-safe mapping that keeps at most max_size entries, dropping the least recently used first
+    - hits and misses count the lookups made through get and get_or_compute
+    - a max_size of 0 disables caching, every lookup is then a miss
+    """
+    def __init__(self, name, max_size):
+        self.name = name
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        caches[name] = self
+
+    def get(self, key, default=None):
+        """Returns the value stored for key (marking it as recently used) or default if there is none"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Stores value for key, evicting the least recently used entries beyond max_size"""
+        with self.lock:
+            if self.max_size <= 0:
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, or calls compute() and caches its result
+        - compute runs outside the lock so a slow computation does not block other threads
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns a dictionary with the hit/miss counters and current size"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
+
+def cache_statistics():
+    """
+    Returns the stats of every cache by name, e.g. {"parse": {"hits": 10, "misses": 2, ...}, ...}
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+def clear_caches():
+    """Empties every cache"""
+    for cache in caches.values():
+        cache.clear()
@@ -0,0 +1,243 @@
+#This file parses the function strings typed by the user with a small recursive descent parser for the supported
+#grammar, instead of sympify (which runs the text through Python's eval). It builds the sympy expression and,
+#at the same time, a numpy-evaluable closure, so no lambdify source has to be generated for the input
+import re
+import operator
+import numpy
+import sympy
+from sympy import Symbol, Integer, Float
+
+x = Symbol("x")
+
+#functions the parser accepts, with their sympy function and numpy ufunc
+supported_functions = {
+    "sin": (sympy.sin, numpy.sin),
+    "cos": (sympy.cos, numpy.cos),
+    "tan": (sympy.tan, numpy.tan),
+    "exp": (sympy.exp, numpy.exp),
+    "ln": (sympy.log, numpy.log),
+    "log": (sympy.log, numpy.log),
+    "sqrt": (sympy.sqrt, numpy.sqrt)
+}
+
+#named constants, with their sympy value and float value
+supported_constants = {
+    "pi": (sympy.pi, numpy.pi),
+    "E": (sympy.E, numpy.e)
+}
+
+#deepest nesting of parentheses, signs and powers accepted, well inside Python's recursion limit
+max_nesting = 100
+
+#one token per match: whitespace is skipped, anything not matched by a group is an error
+token_pattern = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<operator>\*\*|[-+*/^()])
+""", re.VERBOSE)
+
+class ExpressionSyntaxError(ValueError):
+    """
+    Raised for input outside the supported grammar
+    - position is the 0-based index in the input string where the problem was found
+    """
+    def __init__(self, message, text, position):
+        super().__init__(f"{message} at column {position + 1}")
+        self.text = text
+        self.position = position
+
+    def caret_line(self):
+        """Returns the input with a ^ under the offending position, e.g. for printing in a terminal"""
+        return f"{self.text}\n{' ' * self.position}^"
+
+def tokenize(text):
+    """
+    Splits the input into (kind, value, position) tokens, kind is "number", "name" or "operator"
+    - ** and ^ both become the "^" operator
+    - raises ExpressionSyntaxError at the first character that does not start a token
+    """
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = token_pattern.match(text, position)
+        if match is None:
+            raise ExpressionSyntaxError(f"unexpected character {text[position]!r}", text, position)
+        kind = match.lastgroup
+        if kind != "space":
+            value = "^" if match.group() == "**" else match.group()
+            tokens.append((kind, value, position))
+        position = match.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+def combine(operation, left, right):
+    """
+    Returns a closure applying a binary operation to the results of two closures
+    - closures are either callables of x or plain numpy floats for constant subexpressions, which are folded now
+    """
+    left_constant, right_constant = not callable(left), not callable(right)
+    if left_constant and right_constant:
+        with numpy.errstate(all="ignore"):
+            return operation(left, right)
+    if left_constant:
+        return lambda x_values: operation(left, right(x_values))
+    if right_constant:
+        return lambda x_values: operation(left(x_values), right)
+    return lambda x_values: operation(left(x_values), right(x_values))
+
+def apply(function, argument):
+    """Returns a closure applying a numpy function to the result of a closure, folded if the argument is constant"""
+    if not callable(argument):
+        with numpy.errstate(all="ignore"):
+            return function(argument)
+    return lambda x_values: function(argument(x_values))
+
+def identity(x_values):
+    """The closure of x itself"""
+    return x_values
+
+class Parser:
+    """
+    Recursive descent parser for the grammar
+        sum     := product (("+" | "-") product)*
+        product := unary (("*" | "/") unary)*
+        unary   := ("+" | "-") unary | power
+        power   := atom ("^" unary)?            (right associative, so -x^2 is -(x^2) and 2^-1 is allowed)
+        atom    := number | "x" | constant | function "(" sum ")" | "(" sum ")"
+    Every rule returns (sympy expression, closure), the sympy expressions are combined with the same operators
+    sympify's eval would use, so the trees are identical to sympify's
+    - every level of nesting goes through parse_unary, which rejects input nested deeper than max_nesting
+    """
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.depth = 0
+
+    def peek(self):
+        """Returns the next token without consuming it"""
+        return self.tokens[self.index]
+
+    def advance(self):
+        """Consumes and returns the next token"""
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def error(self, message, token=None):
+        """Returns an ExpressionSyntaxError pointing at the token (default the next one)"""
+        if token is None: token = self.peek()
+        return ExpressionSyntaxError(message, self.text, token[2])
+
+    def expect(self, value):
+        """Consumes the next token, which must be the operator value"""
+        token = self.advance()
+        if token[1] != value or token[0] == "name":
+            found = "end of input" if token[0] == "end" else repr(token[1])
+            raise self.error(f"expected {value!r} but found {found}", token)
+        return token
+
+    def parse(self):
+        """Parses the whole input, returns (sympy expression, closure)"""
+        if self.peek()[0] == "end":
+            raise self.error("empty function")
+        result = self.parse_sum()
+        token = self.peek()
+        if token[0] != "end":
+            raise self.error(f"unexpected {token[1]!r}", token)
+        return result
+
+    def parse_sum(self):
+        """sum := product (("+" | "-") product)*"""
+        expression, closure = self.parse_product()
+        while self.peek()[1] in ("+", "-") and self.peek()[0] == "operator":
+            sign = self.advance()[1]
+            right_expression, right_closure = self.parse_product()
+            if sign == "+":
+                expression, closure = expression + right_expression, combine(operator.add, closure, right_closure)
+            else:
+                expression, closure = expression - right_expression, combine(operator.sub, closure, right_closure)
+        return expression, closure
+
+    def parse_product(self):
+        """product := unary (("*" | "/") unary)*"""
+        expression, closure = self.parse_unary()
+        while self.peek()[1] in ("*", "/") and self.peek()[0] == "operator":
+            sign = self.advance()[1]
+            right_expression, right_closure = self.parse_unary()
+            if sign == "*":
+                expression, closure = expression * right_expression, combine(operator.mul, closure, right_closure)
+            else:
+                expression, closure = expression / right_expression, combine(operator.truediv, closure, right_closure)
+        return expression, closure
+
+    def parse_unary(self):
+        """unary := ("+" | "-") unary | power"""
+        token = self.peek()
+        if self.depth >= max_nesting:
+            raise self.error(f"expression nested more than {max_nesting} levels deep", token)
+        self.depth += 1
+        try:
+            if token[0] == "operator" and token[1] in ("+", "-"):
+                self.advance()
+                expression, closure = self.parse_unary()
+                if token[1] == "-":
+                    return -expression, apply(operator.neg, closure)
+                return expression, closure
+            return self.parse_power()
+        finally:
+            self.depth -= 1
+
+    def parse_power(self):
+        """power := atom ("^" unary)?"""
+        expression, closure = self.parse_atom()
+        if self.peek()[1] == "^" and self.peek()[0] == "operator":
+            self.advance()
+            exponent_expression, exponent_closure = self.parse_unary()
+            return expression ** exponent_expression, combine(operator.pow, closure, exponent_closure)
+        return expression, closure
+
+    def parse_atom(self):
+        """atom := number | x | constant | function ( sum ) | ( sum )"""
+        token = self.advance()
+        kind, value, _ = token
+        if kind == "number":
+            if any(character in value for character in ".eE"):
+                return Float(value), numpy.float64(value)
+            return Integer(value), numpy.float64(value)
+        if kind == "name":
+            if value == "x":
+                return x, identity
+            if value in supported_constants:
+                expression, number = supported_constants[value]
+                return expression, numpy.float64(number)
+            if value in supported_functions:
+                sympy_function, numpy_function = supported_functions[value]
+                self.expect("(")
+                argument_expression, argument_closure = self.parse_sum()
+                self.expect(")")
+                return sympy_function(argument_expression), apply(numpy_function, argument_closure)
+            raise self.error(f"unknown name {value!r}", token)
+        if value == "(":
+            result = self.parse_sum()
+            self.expect(")")
+            return result
+        if kind == "end":
+            raise self.error("unexpected end of input", token)
+        raise self.error(f"unexpected {value!r}", token)
+
+def compile_function(text):
+    """
+    Parses a function of x in the supported grammar (x, numbers, + - * / ^ **, parentheses, pi, E and
+    sin, cos, tan, exp, ln/log, sqrt)
+    Returns (sympy expression, numpy_function), where numpy_function evaluates the function on numpy arrays
+    - raises ExpressionSyntaxError (a ValueError) with the column of the problem for anything else
+    """
+    expression, closure = Parser(text).parse()
+    if not callable(closure):
+        constant = closure
+        def numpy_function(x_values):
+            return constant   #constant functions return a single value, like lambdify's
+        return expression, numpy_function
+    return expression, closure
@@ -0,0 +1,138 @@
+#This file records how long each stage of the pipeline takes and how often it runs, when settings.instrumentation is on
+#stages are recorded into the Recording active on the current thread, so GUI jobs and experiment runs stay separate
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+import settings
+
+#the Recording each thread is currently recording into
+active = threading.local()
+
+class Recording:
+    """
+    Wall time and call counts of every stage, plus named counters, for one run or GUI job
+    - stages maps name -> [total seconds, calls]
+    - events keeps one (name, start, seconds, thread) entry per stage call for the trace file
+    """
+    def __init__(self, label):
+        self.label = label
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.events = []
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, start, seconds):
+        """Adds one call of a stage that started at start (perf_counter) and took seconds"""
+        with self.lock:
+            totals = self.stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+            self.events.append((name, start, seconds, threading.current_thread().name))
+
+    def add_count(self, name, amount=1):
+        """Adds amount to a named counter, e.g. cache misses"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def elapsed(self):
+        """Returns the wall time in seconds since the recording started"""
+        return time.perf_counter() - self.start
+
+    def summary(self):
+        """Returns (name, total seconds, calls) for every stage, slowest first"""
+        with self.lock:
+            return sorted(((name, seconds, calls) for name, (seconds, calls) in self.stages.items()), key=lambda stage: -stage[1])
+
+    def summary_table(self):
+        """Returns the stages and counters as a printable table"""
+        lines = [f"Timings for {self.label} ({self.elapsed():.3f} s wall time):",
+                 f"{'stage':>24} {'seconds':>10} {'calls':>7} {'ms/call':>9}"]
+        for name, seconds, calls in self.summary():
+            lines.append(f"{name:>24} {seconds:>10.4f} {calls:>7} {1000 * seconds / calls:>9.3f}")
+        for name, amount in sorted(self.counters.items()):
+            lines.append(f"{name:>24} {'':>10} {amount:>7}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """
+        Writes every recorded stage call to a JSON trace file in the Chrome trace event format
+        (open it in chrome://tracing or https://ui.perfetto.dev), with the counters in "otherData"
+        """
+        with self.lock:
+            events = [{
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.start) * 1e6,
+                "dur": seconds * 1e6,
+                "pid": os.getpid(),
+                "tid": thread
+            } for name, start, seconds, thread in self.events]
+            counters = dict(self.counters)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "otherData": {"label": self.label, "counters": counters}}, trace_file)
+        return path
+
+@contextmanager
+def recording(label):
+    """
+    Makes a new Recording the active one on this thread for the duration of the with block
+    - yields None when settings.instrumentation is off, so callers can skip reporting
+    """
+    if not settings.instrumentation:
+        yield None
+        return
+    previous = getattr(active, "recording", None)
+    active.recording = Recording(label)
+    try:
+        yield active.recording
+    finally:
+        active.recording = previous
+
+class Stage:
+    """Context manager timing one call of a stage into the active Recording"""
+    def __init__(self, name, current):
+        self.name = name
+        self.current = current
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.current.add_stage(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+class NoStage:
+    """Does nothing, used when there is no active Recording so instrumented code pays almost nothing"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+no_stage = NoStage()
+
+def stage(name):
+    """
+    Returns a context manager that times the with block as one call of the named stage, e.g.
+    with instrumentation.stage("lambdify"): ...
+    """
+    current = getattr(active, "recording", None)
+    if current is None:
+        return no_stage
+    return Stage(name, current)
+
+def count(name, amount=1):
+    """Adds amount to a counter of the active Recording, if there is one"""
+    current = getattr(active, "recording", None)
+    if current is not None:
+        current.add_count(name, amount)
+
+def trace_path(label):
+    """Returns where the trace file of a run with this label is written"""
+    safe_label = "".join(c if c.isalnum() or c in "._-" else "_" for c in label)
+    return os.path.join(settings.data_directory, settings.instrumentation_trace_directory, f"{safe_label}_trace.json")
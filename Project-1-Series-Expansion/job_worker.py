@@ -0,0 +1,92 @@
+#This file runs slow GUI jobs (series expansion, plotting, saving PNGs) on a background thread
+#so the pygame event loop keeps drawing while they compute
+import threading
+
+class JobCancelled(Exception):
+    """Raised inside a job when a newer job has replaced it"""
+
+class Job:
+    """
+    One unit of background work
+    - function is called as function(job, *args) so it can report progress and check for cancellation
+    """
+    def __init__(self, name, function, args):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.progress = "queued"
+        self.cancelled = False
+
+    def report(self, progress):
+        """Sets the progress text shown by the GUI, e.g. "plotting" """
+        self.progress = progress
+
+    def check_cancelled(self):
+        """Stops the job by raising JobCancelled if a newer job was submitted since it started"""
+        if self.cancelled:
+            raise JobCancelled()
+
+class JobWorker:
+    """
+    Background thread that runs at most one job at a time
+    - only the newest submitted job is kept waiting, so repeated clicks coalesce into one job
+    - submitting a job cancels the running one, whose result is then thrown away
+    - the main loop calls poll() every frame to pick up the newest finished result
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = None
+        self.running = None
+        self.finished = None     #(job, result, error) of the newest job that completed
+        self.thread = threading.Thread(target=self.run, name="job-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, name, function, *args):
+        """Queues a job, replacing any job still waiting and cancelling the one running"""
+        job = Job(name, function, args)
+        with self.condition:
+            if self.pending is not None:
+                self.pending.cancelled = True
+            if self.running is not None:
+                self.running.cancelled = True
+            self.pending = job
+            self.condition.notify()
+        return job
+
+    def run(self):
+        """Thread loop: waits for a job, runs it and stores its result unless it was cancelled"""
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                job = self.pending
+                self.pending = None
+                self.running = job
+
+            job.report("computing")
+            result, error = None, None
+            try:
+                result = job.function(job, *job.args)
+            except JobCancelled:
+                pass
+            except Exception as exception:     #surface the error to the GUI instead of killing the thread
+                error = exception
+
+            with self.condition:
+                self.running = None
+                if not job.cancelled:
+                    self.finished = (job, result, error)
+
+    def poll(self):
+        """
+        Returns (job, result, error) for the newest finished job once, or None if nothing new has finished
+        """
+        with self.condition:
+            finished = self.finished
+            self.finished = None
+        return finished
+
+    def current_job(self):
+        """Returns the job being computed or waiting to be computed, or None when idle"""
+        with self.condition:
+            return self.pending or self.running
@@ -0,0 +1,176 @@
+#This file draws the true function and both approximations natively with pygame from cached numpy arrays,
+#so the number of terms and the centre can be scrubbed every frame without re-rendering with matplotlib
+import numpy
+import pygame
+import settings
+from parser_function import parse_function_to_numpy_callable
+from series import series_coefficients, partial_sum_matrix
+from metrics import error_metrics_rows, as_float_array
+
+class LivePlot:
+    """
+    Holds everything needed to redraw one function at any number of terms and centre instantly
+    - the partial sums of every order 0..settings.max_num_terms are computed once per centre and kept
+    - centres snap to multiples of settings.live_centre_step, so the cache of centres stays small
+    - moving to a centre not expanded yet keeps showing the last expanded one (shown_centre) until
+      the series about it is added with add_series_data: the GUI computes it with compute_series_data on its
+      background JobWorker and adds it on the main thread, the only thread that touches the cache after __init__
+    """
+    def __init__(self, function_string, centre=0.0, num_terms=settings.default_num_terms, backend=None):
+        self.function_string = function_string
+        self.backend = backend or settings.live_plot_backend
+        self.expression, numpy_function = parse_function_to_numpy_callable(function_string)
+
+        #evaluate the true function once
+        self.x = numpy.linspace(settings.min_x, settings.max_x, settings.num_x_points)
+        with numpy.errstate(all="ignore"):
+            self.y_true = numpy.broadcast_to(as_float_array(numpy_function(self.x)), self.x.shape)
+
+        #vertical range from the finite values of the true function, with a margin
+        finite = self.y_true[numpy.isfinite(self.y_true)]
+        y_low, y_high = (float(finite.min()), float(finite.max())) if finite.size else (-1.0, 1.0)
+        margin = 0.1 * (y_high - y_low) or 1.0
+        self.y_limits = (y_low - margin, y_high + margin)
+
+        self.series_cache = {}      #centre -> (partial sum matrix, max errors, mean squared errors)
+        self.num_terms = 1
+        self.centre = self.shown_centre = 0.0
+        self.maclaurin = self.series_data(0.0)
+        self.set_num_terms(num_terms)
+        self.set_centre(centre)
+        self.series_data(self.centre)
+
+    def compute_series_data(self, centre):
+        """
+        Returns (matrix, max_errors, mses) for the expansion about the centre, where row k is the partial sum up to order k
+        - only reads the function's grid and values, so it can run on another thread while the main thread draws
+        """
+        coefficients = series_coefficients(self.expression, centre, settings.max_num_terms, self.backend)
+        matrix = partial_sum_matrix(coefficients, centre, self.x)
+        errors = error_metrics_rows(self.y_true, matrix)
+        return matrix, errors["max_absolute_error"], errors["mean_squared_error"]
+
+    def add_series_data(self, centre, data):
+        """Caches the compute_series_data result for a centre, and shows it if it is still the current centre"""
+        self.series_cache[centre] = data
+        if centre == self.centre:
+            self.shown_centre = centre
+
+    def series_data(self, centre):
+        """Returns the cached series data about the centre, computing and adding it first if needed"""
+        if centre not in self.series_cache:
+            self.add_series_data(centre, self.compute_series_data(centre))
+        return self.series_cache[centre]
+
+    def set_num_terms(self, num_terms):
+        """Sets the number of terms, clamped to 1..settings.max_num_terms"""
+        self.num_terms = max(1, min(settings.max_num_terms, int(num_terms)))
+
+    def set_centre(self, centre):
+        """
+        Sets the taylor centre, snapped to the centre step and clamped to the plotted x range
+        - only switches the plot straight away if the series about it is cached, see needs_expansion
+        """
+        step = settings.live_centre_step
+        centre = min(max(centre, settings.min_x), settings.max_x)
+        self.centre = round(round(centre / step) * step, 10)
+        if self.centre in self.series_cache:
+            self.shown_centre = self.centre
+
+    def needs_expansion(self):
+        """Returns True if the series about the current centre has not been computed yet"""
+        return self.centre not in self.series_cache
+
+    def curves(self):
+        """Returns (y_true, y_maclaurin, y_taylor) for the current number of terms and the shown centre"""
+        return self.y_true, self.maclaurin[0][self.num_terms], self.series_cache[self.shown_centre][0][self.num_terms]
+
+    def stats(self):
+        """Returns the error stats of the current view, with the same keys as display_window.experiment_stats"""
+        _, maclaurin_max_errors, maclaurin_mses = self.maclaurin
+        _, taylor_max_errors, taylor_mses = self.series_cache[self.shown_centre]
+        return {
+            "maclaurin_max_error": float(maclaurin_max_errors[self.num_terms]),
+            "maclaurin_mse": float(maclaurin_mses[self.num_terms]),
+            "taylor_max_error": float(taylor_max_errors[self.num_terms]),
+            "taylor_mse": float(taylor_mses[self.num_terms]),
+            "centre_used": self.shown_centre,
+            "num_terms_used": self.num_terms
+        }
+
+    def handle_key(self, key):
+        """
+        Up/Down change the number of terms and Left/Right move the centre
+        Returns True if the key was used
+        """
+        if key == pygame.K_UP:
+            self.set_num_terms(self.num_terms + 1)
+        elif key == pygame.K_DOWN:
+            self.set_num_terms(self.num_terms - 1)
+        elif key == pygame.K_RIGHT:
+            self.set_centre(self.centre + settings.live_centre_step)
+        elif key == pygame.K_LEFT:
+            self.set_centre(self.centre - settings.live_centre_step)
+        else:
+            return False
+        return True
+
+def hex_to_rgb(colour):
+    """Converts a "#rrggbb" colour from settings.graph_colours to an (r, g, b) tuple"""
+    return tuple(int(colour[i:i + 2], 16) for i in (1, 3, 5))
+
+def draw_curve(surface, colour, x_pixels, y_pixels, width):
+    """Draws a curve as connected line segments, breaking it wherever the values are not finite"""
+    finite = numpy.isfinite(y_pixels)
+    breaks = numpy.flatnonzero(numpy.diff(finite.astype(int)))
+    starts = numpy.concatenate(([0], breaks + 1))
+    ends = numpy.concatenate((breaks + 1, [len(y_pixels)]))
+    for start, end in zip(starts, ends):
+        if finite[start] and end - start >= 2:
+            points = numpy.column_stack((x_pixels[start:end], y_pixels[start:end]))
+            pygame.draw.lines(surface, colour, False, points.tolist(), width)
+
+def draw_live_plot(surface, rect, live_plot, font, text_colour=(50, 50, 50)):
+    """
+    Draws the true function and both approximations of live_plot inside rect
+    - values outside the vertical range are clipped to the rect, so diverging series do not rescale the plot
+    """
+    inner = rect.inflate(-40, -60)
+    y_low, y_high = live_plot.y_limits
+    x_scale = inner.width / (settings.max_x - settings.min_x)
+    y_scale = inner.height / (y_high - y_low)
+
+    def to_y_pixels(y):
+        with numpy.errstate(all="ignore"):
+            clipped = numpy.clip(y, y_low - (y_high - y_low), y_high + (y_high - y_low))
+            return inner.bottom - (clipped - y_low) * y_scale
+
+    x_pixels = inner.left + (live_plot.x - settings.min_x) * x_scale
+    grid_colour = hex_to_rgb(settings.graph_colours["grid"])
+
+    #axes through the origin if they are in view
+    if settings.min_x <= 0.0 <= settings.max_x:
+        axis_x = inner.left + (0.0 - settings.min_x) * x_scale
+        pygame.draw.line(surface, grid_colour, (axis_x, inner.top), (axis_x, inner.bottom))
+    if y_low <= 0.0 <= y_high:
+        axis_y = float(to_y_pixels(0.0))
+        pygame.draw.line(surface, grid_colour, (inner.left, axis_y), (inner.right, axis_y))
+
+    #centre marker for the taylor expansion
+    centre_x = inner.left + (live_plot.shown_centre - settings.min_x) * x_scale
+    pygame.draw.line(surface, hex_to_rgb(settings.graph_colours["taylor"]), (centre_x, inner.bottom - 8), (centre_x, inner.bottom + 8), 2)
+
+    y_true, y_maclaurin, y_taylor = live_plot.curves()
+    previous_clip = surface.get_clip()
+    surface.set_clip(inner)
+    draw_curve(surface, hex_to_rgb(settings.graph_colours["actual"]), x_pixels, to_y_pixels(y_true), 3)
+    draw_curve(surface, hex_to_rgb(settings.graph_colours["maclaurin"]), x_pixels, to_y_pixels(y_maclaurin), 2)
+    draw_curve(surface, hex_to_rgb(settings.graph_colours["taylor"]), x_pixels, to_y_pixels(y_taylor), 2)
+    surface.set_clip(previous_clip)
+
+    title = f"{live_plot.function_string}   terms = {live_plot.num_terms}   centre = {live_plot.shown_centre:g}"
+    if live_plot.centre != live_plot.shown_centre:
+        title += f" (expanding at {live_plot.centre:g})"
+    surface.blit(font.render(title, True, text_colour), (rect.x + 10, rect.y + 8))
+    help_text = "Up/Down: terms   Left/Right: centre   (True blue, Maclaurin red, Taylor green)"
+    surface.blit(font.render(help_text, True, text_colour), (rect.x + 10, rect.bottom - 24))
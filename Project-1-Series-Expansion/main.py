@@ -4,8 +4,12 @@ import display_window
 
 # Main application loop moved here (fixed indentation / event handling)
 running = True  # continue running while True
+warm_up_started = False  # sympy and matplotlib are loaded in the background after the first frame is shown
 
 while running:
+    # apply the result of any background job that finished since the last frame
+    display_window.poll_jobs()
+
     # event handling
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -16,8 +20,10 @@ while running:
         display_window.input_box.handle_event(event)
         display_window.centre_input.handle_event(event)
         display_window.num_terms_input.handle_event(event)
-        for button in display_window.buttons:
+        for button in display_window.buttons + display_window.preview_buttons:
             button.handle_event(event)
+        # arrow keys scrub terms/centre while live mode is on
+        display_window.handle_live_event(event)
 
     # --- Drawing UI background and left panel ---
     display_window.screen.fill(display_window.white)  # fill full window background
@@ -77,6 +83,11 @@ while running:
         display_window.dark_grey,
     )
 
+    # background job progress or the last error
+    status_text = display_window.job_status_text()
+    if status_text is not None:
+        display_window.draw_text(display_window.screen, status_text, display_window.small_font, 16, 434, display_window.dark_grey)
+
     # right-side display rectangle (preview area)
     display_rect = pygame.Rect(
         display_window.panel_width + 10,
@@ -87,8 +98,10 @@ while running:
     pygame.draw.rect(display_window.screen, (250, 250, 250), display_rect)  # preview background
     pygame.draw.rect(display_window.screen, display_window.dark_grey, display_rect, 1)  # border
 
-    # blit the plot preview if available, otherwise placeholder text
-    if display_window.last_plot_surface is not None:
+    # draw the live plot, or blit the plot preview if available, otherwise placeholder text
+    if display_window.live_plot is not None:
+        display_window.draw_live_preview(display_window.screen, display_rect)
+    elif display_window.last_plot_surface is not None:
         display_window.screen.blit(display_window.last_plot_surface, (display_window.panel_width + 20, 20))
     else:
         display_window.draw_text(
@@ -100,6 +113,15 @@ while running:
             display_window.dark_grey,
         )
 
+    # per-stage timings of the last job, when settings.instrumentation is on, in the strip under the preview plot
+    if display_window.live_plot is None:
+        for i, line in enumerate(display_window.job_timing_lines()):
+            display_window.draw_text(display_window.screen, line, display_window.small_font, display_window.panel_width + 20, display_window.screen_height - 56 + 18 * i, display_window.dark_grey)
+
+    # buttons drawn on top of the preview area
+    for button in display_window.preview_buttons:
+        button.draw(surface=display_window.screen)
+
     # draw experiment stats if present
     stats_y = 460
     stats = display_window.experiment_stats
@@ -121,6 +143,9 @@ while running:
 
     # update the display and cap FPS
     pygame.display.flip()
+    if not warm_up_started:
+        display_window.start_warm_up()
+        warm_up_started = True
     display_window.clock.tick(30)
 
 # cleanup on exit
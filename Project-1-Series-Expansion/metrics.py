@@ -0,0 +1,90 @@
+#This file computes every error metric of an approximation from a single difference array,
+#reusing preallocated buffers so each metric does not build its own full-size temporaries
+import numpy
+
+#the metrics returned by error_metrics, in display order
+metric_names = ("max_absolute_error", "mean_squared_error", "root_mean_squared_error", "max_relative_error", "nan_count")
+
+def as_float_array(values):
+    """
+    Returns values as a float64 numpy array, without copying when it already is one (e.g. most lambdify results)
+    """
+    return numpy.asarray(values, dtype=float)
+
+def reduce_difference(difference, nan_mask, y_true=None, relative_buffer=None):
+    """
+    Reduces a difference array (approximation - true) in place, in one sweep of buffer operations:
+    - difference becomes |difference| and then its square, nan_mask marks the nan points
+    - nan points are skipped like numpy.nanmax/nanmean do
+    - if y_true and relative_buffer are given, the largest |difference| / |y_true| is found as well
+    Returns (max absolute error, sum of squares, number of non-nan points, max relative error)
+    """
+    max_relative = float("nan")
+    with numpy.errstate(all="ignore"):
+        numpy.abs(difference, out=difference)
+        numpy.isnan(difference, out=nan_mask)
+        all_nan = bool(nan_mask.all())
+        max_absolute = float("nan") if all_nan else float(numpy.fmax.reduce(difference, axis=None))     #fmax skips nan
+        if y_true is not None and relative_buffer is not None and not all_nan:
+            numpy.abs(y_true, out=relative_buffer)
+            numpy.divide(difference, relative_buffer, out=relative_buffer)
+            max_relative = float(numpy.fmax.reduce(relative_buffer, axis=None))
+        difference *= difference
+    numpy.copyto(difference, 0.0, where=nan_mask)
+    count = difference.size - int(numpy.count_nonzero(nan_mask))
+    return max_absolute, float(difference.sum()), count, max_relative
+
+class MetricBuffers:
+    """
+    Scratch arrays reused across error_metrics calls on grids of the same size
+    """
+    def __init__(self, size):
+        self.difference = numpy.empty(size)
+        self.relative = numpy.empty(size)
+        self.nan_mask = numpy.empty(size, dtype=bool)
+
+    def fit(self, size):
+        """Returns views of the buffers for size points, growing them if they are too small"""
+        if len(self.difference) < size:
+            self.__init__(size)
+        return self.difference[:size], self.relative[:size], self.nan_mask[:size]
+
+def error_metrics(y_true, y_approx, buffers=None):
+    """
+    Computes every error metric of y_approx against y_true from one difference array
+    - buffers is an optional MetricBuffers to reuse between calls
+    - the errors ignore nan points, like numpy.nanmax and numpy.nanmean
+    Returns a dictionary with max_absolute_error, mean_squared_error, root_mean_squared_error,
+    max_relative_error (largest |error| / |true value|) and nan_count (points where the error is nan)
+    """
+    y_approx = as_float_array(y_approx)
+    y_true = numpy.broadcast_to(as_float_array(y_true), y_approx.shape)
+    size = y_approx.size
+    if buffers is None:
+        buffers = MetricBuffers(size)
+    difference, relative, nan_mask = buffers.fit(size)
+    difference = difference.reshape(y_approx.shape)
+    relative = relative.reshape(y_approx.shape)
+    nan_mask = nan_mask.reshape(y_approx.shape)
+
+    with numpy.errstate(all="ignore"):
+        numpy.subtract(y_approx, y_true, out=difference)
+    max_absolute, squared_sum, count, max_relative = reduce_difference(difference, nan_mask, y_true, relative)
+    mean_squared = squared_sum / count if count else float("nan")
+    return {
+        "max_absolute_error": max_absolute,
+        "mean_squared_error": mean_squared,
+        "root_mean_squared_error": float(numpy.sqrt(mean_squared)),
+        "max_relative_error": max_relative,
+        "nan_count": size - count
+    }
+
+def error_metrics_rows(y_true, y_matrix):
+    """
+    Computes error_metrics for every row of y_matrix (e.g. from series.partial_sum_matrix), sharing one set of buffers
+    Returns a dictionary of numpy arrays with one value per row, with the same keys as error_metrics
+    """
+    y_matrix = as_float_array(y_matrix)
+    buffers = MetricBuffers(y_matrix.shape[-1])
+    rows = [error_metrics(y_true, y_row, buffers) for y_row in y_matrix]
+    return {name: numpy.array([row[name] for row in rows], dtype=int if name == "nan_count" else float) for name in metric_names}
@@ -0,0 +1,232 @@
+#This file compiles a sympy expression of x into a numeric kernel: common subexpressions are evaluated once
+#(sympy.cse), and every step writes in place into a small pool of reused buffers, so e.g. sin(x)^2 + sin(x)*exp(sin(x))
+#computes sin(x) once over the grid and allocates only the result array, where lambdify makes a temporary per operation
+import threading
+import numpy
+import sympy
+from sympy import Symbol
+
+x = Symbol("x")
+
+#sympy functions a kernel can evaluate, with the numpy ufunc used for each
+kernel_functions = {
+    sympy.sin: numpy.sin,
+    sympy.cos: numpy.cos,
+    sympy.tan: numpy.tan,
+    sympy.exp: numpy.exp,
+    sympy.log: numpy.log,
+    sympy.sinh: numpy.sinh,
+    sympy.cosh: numpy.cosh,
+    sympy.tanh: numpy.tanh,
+    sympy.asin: numpy.arcsin,
+    sympy.acos: numpy.arccos,
+    sympy.atan: numpy.arctan,
+    sympy.Abs: numpy.abs
+}
+
+#scratch buffers shared by every kernel on this thread: {dtype: [buffer, ...]}, replaced when the grid size changes
+buffer_pool = threading.local()
+
+class UnsupportedExpression(ValueError):
+    """Raised for expressions a kernel cannot evaluate (unknown functions, other symbols, complex constants)"""
+
+def pooled_buffers(count, shape, dtype):
+    """
+    Returns count scratch arrays of this shape and dtype from the thread's pool
+    - the same arrays are handed to every kernel on the thread, so their contents only live for one call
+    """
+    pools = getattr(buffer_pool, "pools", None)
+    if pools is None:
+        pools = buffer_pool.pools = {}
+    buffers = pools.get(dtype, [])
+    if buffers and buffers[0].shape != shape:
+        buffers = []
+    while len(buffers) < count:
+        buffers.append(numpy.empty(shape, dtype=dtype))
+    pools[dtype] = buffers
+    return buffers[:count]
+
+def real_constant(node):
+    """Returns a constant subexpression as a float, raising UnsupportedExpression if it is not real (e.g. sqrt(-1))"""
+    try:
+        return float(node)
+    except TypeError:
+        raise UnsupportedExpression(f"{node} is not a real number") from None
+
+class KernelCompiler:
+    """
+    Turns an expression into a list of ufunc steps (function, operands, value), each producing a new value
+    - operands are ("x", None), ("constant", float) or ("value", index of the step that produced it)
+    - identical subtrees are emitted once, whether or not sympy.cse pulled them out
+    """
+    def __init__(self):
+        self.steps = []
+        self.emitted = {}
+
+    def step(self, function, *operands):
+        """Appends a step and returns its value as an operand"""
+        self.steps.append((function, operands, len(self.steps)))
+        return ("value", len(self.steps) - 1)
+
+    def emit(self, node):
+        """Returns the operand holding the value of node, emitting the steps that compute it"""
+        if node in self.emitted:
+            return self.emitted[node]
+        if node == x:
+            return ("x", None)
+        if not node.free_symbols:
+            operand = ("constant", real_constant(node))
+        elif node.is_Add:
+            operand = self.emit_sum(node)
+        elif node.is_Mul:
+            operand = self.emit_product(node)
+        elif node.is_Pow:
+            operand = self.emit_power(node.base, node.exp)
+        elif node.func in kernel_functions and len(node.args) == 1:
+            operand = self.step(kernel_functions[node.func], self.emit(node.args[0]))
+        else:
+            raise UnsupportedExpression(f"cannot evaluate {node}")
+        self.emitted[node] = operand
+        return operand
+
+    def emit_sum(self, node):
+        """Adds the terms left to right, subtracting terms with a negative coefficient like lambdify's x - sin(x)"""
+        constant = real_constant(sum((term for term in node.args if not term.free_symbols), sympy.S.Zero))
+        positive, negative = [], []
+        for term in node.args:
+            if term.free_symbols:
+                coefficient, _ = term.as_coeff_Mul()
+                if coefficient.is_negative:
+                    negative.append(self.emit(-term))
+                else:
+                    positive.append(self.emit(term))
+        if positive:
+            total = positive[0]
+        else:
+            total = self.step(numpy.negative, negative.pop(0))
+        for operand in positive[1:]:
+            total = self.step(numpy.add, total, operand)
+        for operand in negative:
+            total = self.step(numpy.subtract, total, operand)
+        if constant:
+            total = self.step(numpy.add, total, ("constant", constant))
+        return total
+
+    def emit_product(self, node):
+        """Multiplies the factors, folding constant factors into one coefficient and dividing by factors with negative exponents"""
+        coefficient = real_constant(sympy.Mul(*(factor for factor in node.args if not factor.free_symbols)))
+        numerator, denominator = [], []
+        for factor in node.args:
+            if not factor.free_symbols:
+                continue
+            if factor.is_Pow and factor.exp.is_Number and factor.exp.is_negative:
+                denominator.append(self.emit_power(factor.base, -factor.exp))
+            else:
+                numerator.append(self.emit(factor))
+
+        if numerator:
+            total = numerator[0]
+            for operand in numerator[1:]:
+                total = self.step(numpy.multiply, total, operand)
+            if coefficient == -1.0:
+                total = self.step(numpy.negative, total)
+            elif coefficient != 1.0:
+                total = self.step(numpy.multiply, ("constant", coefficient), total)
+        else:
+            total = ("constant", coefficient)
+        for operand in denominator:
+            total = self.step(numpy.divide, total, operand)
+        return total
+
+    def emit_power(self, base, exponent):
+        """Picks the cheapest ufunc for base^exponent: square, sqrt and 1/ for the common exponents, power otherwise"""
+        if exponent == 1:
+            return self.emit(base)
+        if exponent == 2:
+            return self.step(numpy.square, self.emit(base))
+        if exponent == sympy.Rational(1, 2):
+            return self.step(numpy.sqrt, self.emit(base))
+        if exponent.is_Number and exponent.is_negative:
+            return self.step(numpy.divide, ("constant", 1.0), self.emit_power(base, -exponent))
+        return self.step(numpy.power, self.emit(base), self.emit(exponent))
+
+class NumericKernel:
+    """
+    Numeric evaluation of an expression of x with common subexpressions computed once and no temporaries
+    - call it like a lambdified function: kernel(x_values) returns a new array of the values
+    - float32 input is evaluated in float32 throughout (about half the memory traffic, for previews),
+      anything else in float64
+    - constant expressions return a single value, like lambdify
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        if expression.free_symbols - {x}:
+            raise UnsupportedExpression(f"{expression} depends on {expression.free_symbols - {x}}")
+        compiler = KernelCompiler()
+        replacements, (reduced,) = sympy.cse(expression)
+        for symbol, subexpression in replacements:
+            compiler.emitted[symbol] = compiler.emit(subexpression)     #later replacements refer to earlier ones by symbol
+        self.result = compiler.emit(reduced)
+        self.steps, self.buffer_count = allocate_buffers(compiler.steps, self.result)
+
+    def __call__(self, x_values):
+        x_values = numpy.asarray(x_values)
+        dtype = numpy.float32 if x_values.dtype == numpy.float32 else numpy.float64
+        kind, value = self.result
+        if kind == "constant":
+            return dtype(value)
+        x_values = numpy.asarray(x_values, dtype=dtype)
+        if kind == "x":
+            return x_values.copy()
+
+        buffers = pooled_buffers(self.buffer_count, x_values.shape, dtype)
+        out = numpy.empty(x_values.shape, dtype=dtype)
+        for function, operands, slot in self.steps:
+            arguments = [x_values if kind == "x" else buffers[value] if kind == "slot" else value for kind, value in operands]
+            function(*arguments, out=out if slot is None else buffers[slot])
+        return out
+
+def allocate_buffers(steps, result):
+    """
+    Assigns every step's value a buffer slot, reusing the slot of a value as soon as its last reader has run
+    (a step may write into the slot of one of its own operands, ufuncs allow that)
+    - the step producing the result writes into the output array instead (slot None)
+    Returns (steps as (function, operands with ("slot", index), slot), number of slots)
+    """
+    last_read = {}
+    for index, (_, operands, _) in enumerate(steps):
+        for kind, value in operands:
+            if kind == "value":
+                last_read[value] = index
+
+    slots, free, slot_count, allocated = {}, [], 0, []
+    for index, (function, operands, value) in enumerate(steps):
+        resolved = []
+        for kind, operand in operands:
+            if kind == "value":
+                resolved.append(("slot", slots[operand]))
+            else:
+                resolved.append((kind, operand))
+        for kind, operand in operands:
+            if kind == "value" and last_read[operand] == index and slots[operand] not in free:
+                free.append(slots[operand])
+        if ("value", value) == result:
+            slot = None
+        elif free:
+            slot = free.pop()
+        else:
+            slot, slot_count = slot_count, slot_count + 1
+        slots[value] = slot
+        allocated.append((function, tuple(resolved), slot))
+    return allocated, slot_count
+
+def compile_kernel(expression):
+    """
+    Returns a NumericKernel evaluating a sympy expression of x
+    - only takes sympy expressions (e.g. from expression_parser), strings are never sympified here
+    - raises UnsupportedExpression for anything it cannot evaluate (other symbols, unknown functions,
+      complex constants such as sqrt(-1)), use the parser's closure or lambdify for those
+    """
+    if not isinstance(expression, sympy.Expr):
+        raise TypeError(f"compile_kernel needs a sympy expression, got {type(expression).__name__}")
+    return NumericKernel(expression)
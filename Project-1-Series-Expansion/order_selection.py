@@ -0,0 +1,119 @@
+#This file finds the smallest number of terms that meets a target maximum error, raising the order one term at a time
+#and stopping as soon as the target is met or the series stops improving (e.g. outside its radius of convergence)
+import time
+import numpy
+import settings
+from parser_function import parse_function_to_numpy_callable
+from series import series_coefficients
+from metrics import as_float_array
+
+def select_order(function_string, centre, target_error, x_min=None, x_max=None, num_x_points=None, max_num_terms=None, backend=None):
+    """
+    Raises the order of the expansion about the centre until its maximum absolute error on the grid is at most target_error
+    - coefficients are requested in blocks that double in size, so each expansion is reused by the following orders
+    - each new order adds one term to the running partial sum instead of re-evaluating the whole polynomial
+    - stops as diverged once settings.order_selection_patience orders in a row fail to improve on the best error
+      while the terms being added are not shrinking either (x range outside the radius of convergence)
+    - stops straight away as unreachable if the function itself is not finite on the grid (e.g. ln(1 + x) at -1)
+    - max_num_terms defaults to settings.max_num_terms
+    Returns a dictionary with:
+    - "status": "converged", "diverged", "unreachable" or "max_order"
+    - "num_terms": the minimal order meeting the target (None unless converged)
+    - "best_num_terms" and "best_error": the order with the smallest error seen and that error
+    - "orders_evaluated", "coefficient_requests", "coefficient_order" and "seconds": the cost spent
+    """
+    if x_min is None: x_min = settings.min_x
+    if x_max is None: x_max = settings.max_x
+    if num_x_points is None: num_x_points = settings.num_x_points
+    if max_num_terms is None: max_num_terms = settings.max_num_terms
+
+    start = time.perf_counter()
+    expression, numpy_function = parse_function_to_numpy_callable(function_string)
+    x_grid = numpy.linspace(x_min, x_max, num_x_points)
+    with numpy.errstate(all="ignore"):
+        y_true = as_float_array(numpy_function(x_grid))
+
+    result = {
+        "function": function_string,
+        "centre": centre,
+        "target_error": target_error,
+        "status": "max_order",
+        "num_terms": None,
+        "best_num_terms": None,
+        "best_error": numpy.inf,
+        "orders_evaluated": 0,
+        "coefficient_requests": 0,
+        "coefficient_order": -1
+    }
+    if not numpy.isfinite(y_true).all():
+        result["status"] = "unreachable"
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    offset = x_grid - centre
+    power = numpy.ones_like(offset)
+    running_sum = numpy.zeros_like(offset)
+    term = numpy.empty_like(offset)
+    difference = numpy.empty_like(offset)
+
+    coefficients = numpy.empty(0)
+    term_sizes = []     #largest absolute value of each term added so far
+    stalled_orders = 0
+    for num_terms in range(max_num_terms + 1):
+        #fetch twice as many coefficients as before when they run out
+        if num_terms >= len(coefficients):
+            block = min(max_num_terms, max(settings.order_selection_initial_terms, 2 * len(coefficients) - 1))
+            coefficients = series_coefficients(expression, centre, block, backend)
+            result["coefficient_requests"] += 1
+            result["coefficient_order"] = len(coefficients) - 1
+
+        #add the next term and measure the error of this partial sum
+        with numpy.errstate(all="ignore"):
+            numpy.multiply(power, coefficients[num_terms], out=term)
+            running_sum += term
+            power *= offset
+            numpy.subtract(running_sum, y_true, out=difference)
+            numpy.abs(difference, out=difference)
+            term_sizes.append(float(numpy.max(numpy.abs(term))) if term.size else 0.0)
+        error = float(numpy.max(difference)) if difference.size else float("nan")
+        result["orders_evaluated"] = num_terms + 1
+
+        if error < result["best_error"]:
+            result["best_num_terms"], result["best_error"] = num_terms, error
+            stalled_orders = 0
+        else:
+            stalled_orders += 1
+
+        if error <= target_error:
+            result["status"] = "converged"
+            result["num_terms"] = num_terms
+            break
+
+        #no recent improvement and the recent terms are no smaller than the ones before them
+        patience = settings.order_selection_patience
+        if stalled_orders >= patience and len(term_sizes) >= 2 * patience:
+            if not max(term_sizes[-patience:]) < max(term_sizes[-2 * patience:-patience]):
+                result["status"] = "diverged"
+                break
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def select_orders(functions, centres, target_error, x_min=None, x_max=None, num_x_points=None, max_num_terms=None, backend=None):
+    """
+    Runs select_order for every (function, centre) pair and prints one line per pair
+    Returns the list of result dictionaries
+    """
+    results = []
+    for function_string in functions:
+        for centre in centres:
+            result = select_order(function_string, centre, target_error, x_min, x_max, num_x_points, max_num_terms, backend)
+            order_text = result["num_terms"] if result["status"] == "converged" else f"- (best {result['best_num_terms']})" if result["best_num_terms"] is not None else "-"
+            print(f"{function_string:>12} centre {centre:<5} {result['status']:>9}  terms {order_text:<10}  error {result['best_error']:.3e}  "
+                  f"cost: {result['orders_evaluated']} orders, {result['coefficient_requests']} expansions up to order {result['coefficient_order']}, {result['seconds'] * 1000:.1f} ms")
+            results.append(result)
+    return results
+
+#to test this script directly
+if __name__ == "__main__":
+    select_orders(["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)", "1/(2 - x)", "1/(1.5 - x)"], [0.0, 0.5, 1.0], target_error=1e-6)
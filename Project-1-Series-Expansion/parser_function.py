@@ -1,46 +1,75 @@
-from sympy import sympify, symbols, lambdify    #import the symplify parser and other sympy functions
+from sympy import symbols, lambdify    #import sympy functions
 import numpy  #import numpy for numeric arrays
-import re     #import regular expressions to help sanitize input functions
+from expression_cache import LRUCache   #memoizes parsing and lambdify across calls
+import instrumentation      #optional per-stage timings
+from expression_parser import compile_function     #restricted parser for user input
+from numeric_kernel import compile_kernel, UnsupportedExpression     #common-subexpression kernels replacing lambdify
+import settings
 
 x = symbols("x")
 
-def sanitize_input_function(function_string):
+#(sympy expression, numpy-callable) pairs keyed by the function string as typed, and numpy-callables keyed by sympy expression
+parse_cache = LRUCache("parse", settings.parse_cache_size)
+lambdify_cache = LRUCache("lambdify", settings.lambdify_cache_size)
+
+def compile_input_function(function_string):
     """
-    Sanitizes the input function string to ensure it only contains allowed characters:
-    - strips any whitespace
-    - replace exponential symbol from ^ to **
-    This is not a full-proof sanitization, but helps reduce common input errors.
+    Parses the input function string with expression_parser, which only accepts the supported grammar
+    (x, numbers, + - * / ^, parentheses, pi, E, sin, cos, tan, exp, ln/log, sqrt) and never evaluates the text.
+    Returns (expression, numpy_function), the sympy expression and a numpy-callable function of it:
+    - a numeric_kernel kernel if settings.numeric_kernels is on, else the closure the parser built alongside the expression
+    - raises expression_parser.ExpressionSyntaxError (a ValueError) giving the column of anything outside the grammar
+    The text is parsed exactly as typed (the tokenizer itself skips whitespace and reads ^ as **), so the column
+    points into what the user sees. Results are cached by that text, so repeated calls skip parsing.
     """
-    string = function_string.strip() 
-    string = string.replace("^", "**")
-    return string
+    def parse():
+        with instrumentation.stage("expression_parse"):
+            expression, numpy_function = compile_function(function_string)
+        if settings.numeric_kernels:
+            try:
+                with instrumentation.stage("kernel_compile"):
+                    numpy_function = compile_kernel(expression)
+            except UnsupportedExpression:
+                pass    #keep the parser's closure
+        return expression, numpy_function
+    return parse_cache.get_or_compute(function_string, parse)
 
 def parser_to_sympy(function_string):
     """
-    Parses the sanitized input function string to a sympy expression.
+    Parses the input function string to a sympy expression.
     Returns a sympy expression object.
+    Results are cached by the string as typed, see compile_input_function.
     """
-    string = sanitize_input_function(function_string)
-    expression = sympify(string)
+    expression, _ = compile_input_function(function_string)
     return expression
     
 def make_function_numpy_callable(expression):
     """
     Converts a sympy expression into a numpy-callable function.
-    Lambdify produces a function that accepts numpy arrays as input for efficient computation.
+    With settings.numeric_kernels on this is a numeric_kernel kernel (common subexpressions evaluated once, no temporaries),
+    expressions it cannot evaluate fall back to lambdify, which produces a function that accepts numpy arrays.
     Returns this numpy-callable function.
+    Results are cached by expression, so repeated calls skip compiling.
     """
-    numpy_function = lambdify(x, expression, "numpy")
+    def make_callable():
+        if settings.numeric_kernels:
+            try:
+                with instrumentation.stage("kernel_compile"):
+                    return compile_kernel(expression)
+            except UnsupportedExpression:
+                pass
+        with instrumentation.stage("lambdify"):
+            return lambdify(x, expression, "numpy")
+    numpy_function = lambdify_cache.get_or_compute(expression, make_callable)
     return numpy_function
     
 def parse_function_to_numpy_callable(function_string):
     """
     Combines parsing and conversion to produce a numpy-callable function from an input string.
     Returns (expression, numpy_function) where expression is the sympy expression and numpy_function is the numpy-callable function.
+    - the numpy function is a numeric_kernel kernel (or the closure built by the parser), so input strings never go through lambdify
     """
-    expression = parser_to_sympy(function_string)
-    numpy_function = make_function_numpy_callable(expression)
-    return expression, numpy_function
+    return compile_input_function(function_string)
 
 def is_function_valid(function_string, x_values):
     """
@@ -0,0 +1,164 @@
+#This file keeps every rendered plot in a content-addressed store inside plots_directory, keyed by a hash
+#of the plotted data and styling, so a plot whose data, labels and colours have not changed is never drawn again
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy
+import settings
+
+def store_directory():
+    """Returns the folder holding the cached PNGs and their index, inside settings.plots_directory"""
+    return os.path.join(settings.plots_directory, settings.plot_cache_directory)
+
+def index_path():
+    """Returns the JSON index of the store"""
+    return os.path.join(store_directory(), "index.json")
+
+def stored_path(key):
+    """Returns where the PNG of a key is kept in the store"""
+    return os.path.join(store_directory(), f"{key}.png")
+
+def plot_key(kind, arrays, meta, figure_size, dpi):
+    """
+    Returns a hash of everything that decides how a plot looks:
+    - kind names the drawing code, e.g. "series" or "error_vs_centre"
+    - arrays are the plotted values (dtype, shape and bytes are hashed), meta the titles/labels/legend entries
+    - the figure size, dpi, settings.graph_colours, settings.plot_cache_version and the matplotlib version
+    """
+    import matplotlib
+    digest = hashlib.sha256()
+    header = {
+        "kind": kind,
+        "meta": meta,
+        "figure_size": list(figure_size),
+        "dpi": dpi,
+        "colours": settings.graph_colours,
+        "version": settings.plot_cache_version,
+        "matplotlib": matplotlib.__version__
+    }
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+    for array in arrays:
+        array = numpy.ascontiguousarray(array)
+        digest.update(f"|{array.dtype.str}{array.shape}|".encode("utf-8"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def read_index():
+    """
+    Returns the index {"entries": {key: {"bytes", "used"}}, "files": {output path: {"key", "modified"}}}, empty if there is none
+    - files remembers which key each output file was last written from and its modification time,
+      so an output file nobody has touched since is not even copied
+    """
+    try:
+        with open(index_path()) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {"entries": {}, "files": {}}     #missing, or partly written by an old version
+    if not isinstance(index, dict):
+        return {"entries": {}, "files": {}}
+    index.setdefault("entries", {})
+    index.setdefault("files", {})
+    return index
+
+def write_index(index):
+    """
+    Writes the index through a temporary file so readers never see a partial file
+    - the cache is only an optimisation, so a failed write is ignored
+    """
+    temporary_path = f"{index_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(store_directory(), exist_ok=True)
+        with open(temporary_path, "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary_path, index_path())
+    except OSError:
+        pass
+
+def modified_time(path):
+    """Returns the modification time of a file in nanoseconds, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def restore_plot(index, key, out_filename):
+    """
+    Makes out_filename hold the stored plot of this key, if there is one
+    - an output file last written from the same key and untouched since is left as it is, otherwise the stored PNG is copied
+    - the index is updated in memory, write it with write_index
+    Returns True if the plot was restored, False if it has to be drawn
+    """
+    entry = index["entries"].get(key)
+    if entry is None or not os.path.exists(stored_path(key)):
+        return False
+    file_key = os.path.abspath(out_filename)
+    try:
+        if index["files"].get(file_key) != {"key": key, "modified": modified_time(out_filename)}:
+            shutil.copyfile(stored_path(key), out_filename)
+    except OSError:
+        return False
+    entry["used"] = time.time()     #mark as recently used for eviction
+    index["files"][file_key] = {"key": key, "modified": modified_time(out_filename)}
+    return True
+
+def store_plot(index, key, out_filename):
+    """
+    Keeps a copy of a freshly drawn plot in the store under its key
+    - the index is updated in memory, write it with write_index
+    """
+    try:
+        os.makedirs(store_directory(), exist_ok=True)
+        temporary_path = f"{stored_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(out_filename, temporary_path)
+        os.replace(temporary_path, stored_path(key))
+    except OSError:
+        return      #the plot is written, it just is not cached
+    index["entries"][key] = {"bytes": os.path.getsize(stored_path(key)), "used": time.time()}
+    index["files"][os.path.abspath(out_filename)] = {"key": key, "modified": modified_time(out_filename)}
+
+def cached_plot(key, out_filename, render):
+    """
+    Makes sure out_filename holds the plot with this key, calling render(out_filename) only when it is not stored
+    - if out_filename was last written from the same key and is untouched since, nothing is done
+    - if another file (or an earlier run) already rendered this key, the stored PNG is copied
+    - otherwise the plot is rendered and a copy is kept in the store, evicting the least recently used
+      entries once the store is over settings.plot_cache_max_bytes
+    Returns True when the plot came from the cache, False when it was rendered
+    """
+    if not settings.plot_cache:
+        render(out_filename)
+        return False
+
+    index = read_index()
+    hit = restore_plot(index, key, out_filename)
+    if not hit:
+        render(out_filename)
+        store_plot(index, key, out_filename)
+    evict_plots(index)
+    write_index(index)
+    return hit
+
+def evict_plots(index, max_bytes=None):
+    """
+    Removes the least recently used entries from the store until it fits in max_bytes
+    (default settings.plot_cache_max_bytes), along with index entries whose PNG has gone
+    """
+    if max_bytes is None:
+        max_bytes = settings.plot_cache_max_bytes
+    entries = index["entries"]
+    for key in [key for key in entries if not os.path.exists(stored_path(key))]:
+        del entries[key]
+
+    total_bytes = sum(entry.get("bytes", 0) for entry in entries.values())
+    for key in sorted(entries, key=lambda key: entries[key].get("used", 0.0)):
+        if total_bytes <= max_bytes:
+            break
+        total_bytes -= entries.pop(key).get("bytes", 0)
+        try:
+            os.remove(stored_path(key))
+        except FileNotFoundError:
+            pass
+    index["files"] = {path: written for path, written in index["files"].items() if isinstance(written, dict) and written.get("key") in entries}
@@ -1,16 +1,64 @@
-import matplotlib.pyplot as plt #for plotting
+from matplotlib.figure import Figure    #for drawing without pyplot's global state
+from matplotlib.backends.backend_agg import FigureCanvasAgg    #renders a figure into an in-memory RGBA buffer
 import numpy    
 import os       #for directory management like making the plots folder
+import threading        #each thread reuses its own figures
+from concurrent.futures import ProcessPoolExecutor      #for rendering batches of plots in parallel
 import settings #for the colours of each graph 
+import instrumentation      #optional per-stage timings
+import plot_cache       #skips redrawing plots whose data and styling have not changed
 
-def plot_series_graphs(x, y_true, y_maclaurin, y_taylor, meta, out_filename=None):
+#size (inches) and resolution of the saved series plots and of the experiment summary plots
+series_figure_size = (7, 3)
+series_dpi = 150
+summary_figure_size = (8, 4)
+summary_dpi = 150
+
+#the FigureRenderer of each figure size, per thread (matplotlib figures must not be shared between threads)
+renderers = threading.local()
+
+class FigureRenderer:
+    """
+    One Agg figure with a single axes that is cleared and redrawn for every plot of the same size,
+    instead of building a new figure each time
+    - uses the object-oriented API, so there is no pyplot global state and it is safe off the main thread
+    """
+    def __init__(self, figure_size, dpi):
+        self.dpi = dpi
+        self.figure = Figure(figsize=figure_size)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.subplot_parameters = {name: getattr(self.figure.subplotpars, name) for name in ("left", "right", "bottom", "top", "wspace", "hspace")}
+
+    def clear(self):
+        """Returns the axes, cleared and back in its default position"""
+        self.axes.clear()
+        self.figure.subplots_adjust(**self.subplot_parameters)
+        return self.axes
+
+    def save(self, path):
+        """Tidies the layout so labels don't overlap, then writes the figure as a PNG"""
+        self.figure.tight_layout()
+        self.figure.savefig(path, dpi=self.dpi)
+
+def figure_renderer(figure_size, dpi):
+    """Returns this thread's FigureRenderer for the figure size and dpi, creating it on first use"""
+    key = (tuple(figure_size), dpi)
+    cache = renderers.__dict__.setdefault("by_size", {})
+    if key not in cache:
+        cache[key] = FigureRenderer(figure_size, dpi)
+    return cache[key]
+
+def plot_series_graphs(x, y_true, y_maclaurin, y_taylor, meta, out_filename=None, use_cache=None):
     """
     Plots the actual function and 2 approximation graphs on a single plot
     - x is the numpy array of x values
     - y_true, y_maclaurin, y_taylor are the corresponding y values for each function
     - meta is a dictionary with keys needed for titles and labels
     - out_filename is the path to save the plot, if None the plot is not saved
+    - use_cache (default settings.plot_cache) skips drawing when the same data and meta were plotted before, see plot_cache
     """
+    if use_cache is None: use_cache = settings.plot_cache
     #makes sure the plots directory exists
     os.makedirs(settings.plots_directory, exist_ok=True)
 
@@ -19,28 +67,167 @@ def plot_series_graphs(x, y_true, y_maclaurin, y_taylor, meta, out_filename=None
         safe_function_str = meta.get("function_string", "function").replace('/', '_').replace('(', '_').replace(')', '')
         out_filename = os.path.join(settings.plots_directory, f"{safe_function_str}_plot.png")
 
-    #create a matplotlib figure
-    plt.figure(figsize=(7, 3))
+    def render(path):
+        #draw onto this thread's reused figure
+        renderer = figure_renderer(series_figure_size, series_dpi)
+        with instrumentation.stage("plot_draw"):
+            draw_series_axes(renderer.clear(), x, y_true, y_maclaurin, y_taylor, meta, series_figure_size[0] * series_dpi)
+
+        #save the plot to file
+        with instrumentation.stage("plot_save"):
+            renderer.save(path)
+
+    if use_cache:
+        key = plot_cache.plot_key("series", (x, y_true, y_maclaurin, y_taylor), meta, series_figure_size, series_dpi)
+        with instrumentation.stage("plot_cache_lookup"):
+            hit = plot_cache.cached_plot(key, out_filename, render)
+        instrumentation.count("plot_cache_hits" if hit else "plot_cache_misses")
+    else:
+        render(out_filename)
+
+    #return the saved filename
+    return out_filename
+
+def min_max_downsample(x, y, num_buckets):
+    """
+    Shrinks a curve to at most 4 points per bucket while keeping its shape on screen (min/max per pixel column)
+    - the x range is split into num_buckets equal buckets, normally one per pixel of the plot width
+    - each bucket keeps its first and last point and the points where y is smallest and largest,
+      so spikes and the lines joining neighbouring buckets are drawn exactly as with every point
+    - nan and infinite values are kept where they are first or last in a bucket, so gaps in the curve stay gaps
+    - x must be sorted, curves with no more than 4 * num_buckets points are returned unchanged
+    Returns (x values, y values) of the kept points
+    """
+    x = numpy.asarray(x)
+    y = numpy.broadcast_to(numpy.asarray(y), x.shape)   #constant functions may come as a single value
+    if len(x) <= 4 * num_buckets or num_buckets < 1:
+        return x, y
+
+    #start index of every non-empty bucket along x
+    bucket_edges = numpy.linspace(x[0], x[-1], num_buckets + 1)[:-1]
+    starts = numpy.unique(numpy.searchsorted(x, bucket_edges, side="left"))
+    starts = starts[starts < len(x)]
+    ends = numpy.append(starts[1:], len(x)) - 1
+    bucket = numpy.repeat(numpy.arange(len(starts)), numpy.diff(numpy.append(starts, len(x))))
 
+    kept = [starts, ends]
+    with numpy.errstate(invalid="ignore"):
+        for reduce in (numpy.fmin, numpy.fmax):     #fmin/fmax skip nan
+            extreme = reduce.reduceat(y, starts)
+            hits = numpy.flatnonzero(y == extreme[bucket])
+            _, first_hit = numpy.unique(bucket[hits], return_index=True)     #the first point reaching it in each bucket
+            kept.append(hits[first_hit])
+    kept = numpy.unique(numpy.concatenate(kept))
+    return x[kept], y[kept]
+
+def draw_series_axes(axes, x, y_true, y_maclaurin, y_taylor, meta, pixel_width=None):
+    """
+    Draws the actual function and the 2 approximation graphs with grid, labels and title onto the given axes
+    - with pixel_width (the width of the saved image in pixels) each curve is first reduced with min_max_downsample
+      to a few points per pixel column, so drawing costs the same however many points the grid has
+    """
+    curves = [
+        (y_true, dict(label="True", color=settings.graph_colours["actual"], linewidth=1.7)),
+        (y_maclaurin, dict(label="Maclaurin", color=settings.graph_colours["maclaurin"], linestyle='--')),
+        (y_taylor, dict(label="Taylor", color=settings.graph_colours["taylor"], linestyle='--'))
+    ]
     #plot each of the functions
-    plt.plot(x, y_true, label="True", color=settings.graph_colours["actual"], linewidth=1.7)
-    plt.plot(x, y_maclaurin, label="Maclaurin", color=settings.graph_colours["maclaurin"], linestyle='--')
-    plt.plot(x, y_taylor, label="Taylor", color=settings.graph_colours["taylor"], linestyle='--')
+    for y, style in curves:
+        if pixel_width is not None and settings.plot_downsampling:
+            with instrumentation.stage("plot_downsample"):
+                x_plot, y = min_max_downsample(x, y, int(pixel_width))
+        else:
+            x_plot = x
+        axes.plot(x_plot, y, **style)
 
     #add the grid, labels and titles
-    plt.grid(color=settings.graph_colours["grid"], linestyle=':', linewidth=0.7)
-    plt.xlabel(meta.get("x_label", "x"))
-    plt.ylabel(meta.get("y_label", "y"))
-    plt.title(meta.get("title", "Function Plot"))
+    axes.grid(color=settings.graph_colours["grid"], linestyle=':', linewidth=0.7)
+    axes.set_xlabel(meta.get("x_label", "x"))
+    axes.set_ylabel(meta.get("y_label", "y"))
+    axes.set_title(meta.get("title", "Function Plot"))
+
+def render_series_graphs(x, y_true, y_maclaurin, y_taylor, meta, width, height, dpi=100):
+    """
+    Draws the same plot as plot_series_graphs straight into memory, without writing a PNG
+    - the figure is sized to exactly width x height pixels so it never needs rescaling
+    - the curves are reduced to a few points per pixel column first, see min_max_downsample
+    - uses the object-oriented Agg API, so it is safe to call off the main thread
+    Returns the FigureCanvasAgg, whose buffer_rgba() holds the pixels (keep the canvas alive while they are used)
+    """
+    with instrumentation.stage("plot_render"):
+        figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(figure)
+        draw_series_axes(figure.add_subplot(), x, y_true, y_maclaurin, y_taylor, meta, width)
+        figure.tight_layout()
+        canvas.draw()
+    return canvas
+
+def draw_summary_axes(axes, lines, labels):
+    """
+    Draws an experiment summary plot onto the given axes, with a log scale for the errors
+    - lines is a list of (x values, y values, marker, linestyle, legend label)
+    - labels holds "title", "x_label" and "y_label"
+    """
+    for x_values, y_values, marker, linestyle, label in lines:
+        axes.plot(x_values, y_values, marker=marker, linestyle=linestyle, label=label)
+    axes.set_yscale('log')   #log scale for y-axis to better see error trends
+    axes.set_xlabel(labels["x_label"])
+    axes.set_ylabel(labels["y_label"])
+    axes.set_title(labels["title"])
+    axes.grid(True, linestyle=':', linewidth=0.7)
+    axes.legend(loc='upper right', fontsize='small')
+
+def render_summary_plots(plots):
+    """
+    Draws and saves a list of summary plots, given as (output path, kind, lines, labels), on one reused figure
+    Returns the output paths
+    """
+    renderer = figure_renderer(summary_figure_size, summary_dpi)
+    for out_filename, _, lines, labels in plots:
+        draw_summary_axes(renderer.clear(), lines, labels)
+        renderer.save(out_filename)
+    return [out_filename for out_filename, _, _, _ in plots]
 
-    #tidy the layout so labels don't overlap
-    plt.tight_layout()
+def summary_plot_key(kind, lines, labels):
+    """Returns the plot_cache key of a summary plot: the values are hashed as arrays, the styling of every line as meta"""
+    meta = dict(labels, lines=[(marker, linestyle, label) for _, _, marker, linestyle, label in lines])
+    arrays = [numpy.asarray(values, dtype=float) for x_values, y_values, _, _, _ in lines for values in (x_values, y_values)]
+    return plot_cache.plot_key(kind, arrays, meta, summary_figure_size, summary_dpi)
 
-    #save the plot to file
-    plt.savefig(out_filename, dpi=150)
+def save_summary_plots(plots, workers=1, use_cache=None):
+    """
+    Saves a batch of independent summary plots, given as (output path, kind, lines, labels)
+    - with use_cache (default settings.plot_cache) plots that are unchanged are restored from the plot cache first,
+      and only the rest are drawn
+    - with workers > 1 the plots left to draw are split into one chunk per process, each drawn on a reused figure
+    - the plot cache index is only read and written here, never in the worker processes
+    Returns (number of plots drawn, number restored from the cache)
+    """
+    if use_cache is None: use_cache = settings.plot_cache
+    os.makedirs(settings.plots_directory, exist_ok=True)
+    index = plot_cache.read_index() if use_cache else None
+    keys = {}
+    to_draw = []
+    for plot in plots:
+        if use_cache:
+            keys[plot[0]] = summary_plot_key(*plot[1:])
+            if plot_cache.restore_plot(index, keys[plot[0]], plot[0]):
+                continue
+        to_draw.append(plot)
 
-    #close the plot to free memory
-    plt.close()
+    with instrumentation.stage("summary_plot_render"):
+        if workers > 1 and len(to_draw) > 1:
+            chunks = [to_draw[i::workers] for i in range(min(workers, len(to_draw)))]
+            with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+                list(pool.map(render_summary_plots, chunks))
+        else:
+            render_summary_plots(to_draw)
 
-    #return the saved filename
-    return out_filename
\ No newline at end of file
+    if use_cache:
+        for out_filename, _, _, _ in to_draw:
+            plot_cache.store_plot(index, keys[out_filename], out_filename)
+        plot_cache.evict_plots(index)
+        plot_cache.write_index(index)
+    instrumentation.count("plot_cache_hits", len(plots) - len(to_draw))
+    instrumentation.count("plot_cache_misses", len(to_draw))
+    return len(to_draw), len(plots) - len(to_draw)
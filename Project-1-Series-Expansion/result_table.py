@@ -0,0 +1,82 @@
+#This file stores experiment result rows column by column with an index on
+#(function, approximation, centre, num_terms), so plots and writers never have to scan every row
+import numpy
+
+#the columns of every result row, in CSV order
+result_columns = ("function", "approximation", "centre", "num_terms", "max_absolute_error", "mean_squared_error")
+
+class ResultTable:
+    """
+    In-memory table of experiment results
+    - each column is a list, a row is one position across all columns
+    - index maps (function, approximation, centre, num_terms) to the row position
+    - groups maps (function, approximation, centre) to its row positions, kept sorted by num_terms
+    """
+    def __init__(self, rows=None):
+        self.columns = {column: [] for column in result_columns}
+        self.index = {}
+        self.groups = {}
+        self.unsorted_groups = set()    #groups that had rows added since they were last sorted
+        if rows is not None:
+            self.extend(rows)
+
+    def __len__(self):
+        return len(self.columns["function"])
+
+    def __iter__(self):
+        """Yields each row as a dictionary, in the order they were added"""
+        for position in range(len(self)):
+            yield self.row(position)
+
+    def append(self, row):
+        """Adds a row dictionary with a value for every result column"""
+        position = len(self)
+        for column in result_columns:
+            self.columns[column].append(row[column])
+        self.index.setdefault((row["function"], row["approximation"], row["centre"], row["num_terms"]), position)   #first row wins, like a scan
+        group_key = (row["function"], row["approximation"], row["centre"])
+        self.groups.setdefault(group_key, []).append(position)
+        self.unsorted_groups.add(group_key)
+
+    def extend(self, rows):
+        """Adds every row dictionary in rows"""
+        for row in rows:
+            self.append(row)
+
+    def row(self, position):
+        """Returns the row at the given position as a dictionary"""
+        return {column: self.columns[column][position] for column in result_columns}
+
+    def lookup(self, function_string, approximation, centre, num_terms):
+        """Returns the row for this exact combination, or None if it was not run"""
+        position = self.index.get((function_string, approximation, centre, num_terms))
+        return None if position is None else self.row(position)
+
+    def series_rows(self, function_string, approximation, centre):
+        """Returns the rows of one approximation at one centre, sorted by num_terms"""
+        group_key = (function_string, approximation, centre)
+        positions = self.groups.get(group_key, [])
+        if group_key in self.unsorted_groups:
+            positions.sort(key=lambda position: self.columns["num_terms"][position])
+            self.unsorted_groups.discard(group_key)
+        return [self.row(position) for position in positions]
+
+    def to_arrays(self):
+        """
+        Returns the table as a dictionary of numpy arrays, one per column
+        - text columns become unicode arrays, centre and errors float64 and num_terms int64
+        """
+        return {
+            "function": numpy.array(self.columns["function"], dtype=str),
+            "approximation": numpy.array(self.columns["approximation"], dtype=str),
+            "centre": numpy.array(self.columns["centre"], dtype=float),
+            "num_terms": numpy.array(self.columns["num_terms"], dtype=numpy.int64),
+            "max_absolute_error": numpy.array(self.columns["max_absolute_error"], dtype=float),
+            "mean_squared_error": numpy.array(self.columns["mean_squared_error"], dtype=float)
+        }
+
+def as_result_table(rows):
+    """Returns rows unchanged if it is already a ResultTable, otherwise a new table holding them"""
+    if isinstance(rows, ResultTable):
+        return rows
+    return ResultTable(rows)
@@ -1,16 +1,35 @@
-import matplotlib.pyplot as plt #for plotting
 import numpy
-import math
 import os       #for directory management like making the data folder
 import csv      #for saving data to csv files
-from series import evaluate_series_function     #returns x_grid, y_actual, y_maclaurin, y_taylor, meta
-from plot_helper import plot_series_graphs      #for plotting the 3 graphs
+import json     #for sweep specs and unit checkpoints
+import hashlib  #for naming the checkpoint folder of a sweep
+import argparse #for the command line interface
+from concurrent.futures import ProcessPoolExecutor, as_completed     #for running independent units in parallel
+from plot_helper import save_summary_plots      #draws batches of summary plots, reusing cached ones
+from result_table import ResultTable, as_result_table     #indexed store of the result rows
+from order_selection import select_order       #smallest order meeting a target error
+from experiment_planner import ExperimentPlan     #runs each distinct piece of work once
+from metrics import error_metrics, error_metrics_rows     #fused single-pass error metrics
+import instrumentation      #optional per-stage timings
 import settings
 
 #make sure the data and plots directories exist
 os.makedirs(settings.data_directory, exist_ok=True)
 os.makedirs(settings.plots_directory, exist_ok=True)
 
+def current_settings():
+    """
+    Returns the values of settings.py as they are in this process, e.g. after a benchmark or test changed some,
+    so worker processes can be given the same settings whatever way they are started
+    """
+    plain_types = (bool, int, float, str, list, tuple, dict, type(None))
+    return {name: value for name, value in vars(settings).items() if not name.startswith("_") and isinstance(value, plain_types)}
+
+def apply_settings(values):
+    """Process pool initializer: gives a worker process the settings of the process that started it"""
+    for name, value in values.items():
+        setattr(settings, name, value)
+
 def safe_filename(function_string, centre=None, num_terms=None, prefix="series"):
     """
     Creates a safe filename for saving plots and data files
@@ -33,26 +52,36 @@ def safe_filename(function_string, centre=None, num_terms=None, prefix="series")
 def max_absolute_error(y_true, y_approx):
     """
     Finds the maximum absolute error between the true y values and approximate y values
+    - nan if there are no values (to indicate it is undefined), see metrics.error_metrics for every metric at once
     """
-    difference = numpy.abs(y_true - y_approx)
-    if difference.size == 0:
-        return float('nan')     #to indicate if undefined
-    return float(numpy.nanmax(difference))  #return the max absolute error as a float value
+    return error_metrics(y_true, y_approx)["max_absolute_error"]
 
 def mean_squared_error(y_true, y_approx):
     """
     Finds the mean squared error between the true y values and approximate y values
     """
-    difference = y_true - y_approx
-    mse = numpy.nanmean(difference**2)  #mean of squared differences
-    if difference.size == 0:
-        return float('nan')     #to indicate if undefined
-    return float(mse)
+    return error_metrics(y_true, y_approx)["mean_squared_error"]
+
+def max_absolute_errors(y_true, y_matrix):
+    """
+    Finds the maximum absolute error of every row of y_matrix against the true y values
+    - y_matrix has one row of approximate y values per order, e.g. from series.partial_sum_matrix
+    Returns a numpy array with one error per row
+    """
+    return error_metrics_rows(y_true, y_matrix)["max_absolute_error"]
+
+def mean_squared_errors(y_true, y_matrix):
+    """
+    Finds the mean squared error of every row of y_matrix against the true y values
+    Returns a numpy array with one error per row
+    """
+    return error_metrics_rows(y_true, y_matrix)["mean_squared_error"]
 
 def write_data_to_csv(rows, csv_path):
     """
     Writes the x values and corresponding y values to a CSV file
     along with meta information as header comments
+    - rows can be a ResultTable or a list of row dictionaries
     """
     header_lines = ["function", "approximation", "centre", "num_terms", "max_absolute_error", "mean_squared_error"]
     with open(csv_path, "w", newline='') as csvfile:            #open the file for writing
@@ -61,145 +90,377 @@ def write_data_to_csv(rows, csv_path):
         for row in rows:    
             writer.writerow(row)    #write each dictionary as a csv row
 
-def generate_plot_for_function(function_string, rows, num_terms, centres):
+def write_data_to_npz(rows, npz_path):
+    """
+    Writes the results as one numpy array per column to a binary .npz file, which loads much faster than the CSV
+    - rows can be a ResultTable or a list of row dictionaries
+    """
+    numpy.savez(npz_path, **as_result_table(rows).to_arrays())
+
+def summary_plots(function_string, rows, num_terms, centres):
     """
-    Generate 2 summary plots for the given function string using 2 rows:
+    Gathers the data of the 2 summary plots of a function from the rows:
     - how error varies with num_terms in the polynomial approximation
     - how error varies with the expansion centre with a fixed num_terms
+    rows can be a ResultTable or a list of row dictionaries, every lookup goes through the table index
+    Returns a list of (output path, kind, lines, labels) with one entry per plot, where lines is a list of
+    (x values, y values, marker, linestyle, legend label) and labels holds the title and axis labels
     """
     safe_function = safe_filename(function_string)
-    function_rows = [row for row in rows if row["function"] == function_string] #filter the rows for this specific function
+    table = as_result_table(rows)   #indexed by (function, approximation, centre, num_terms)
 
     #-----Plot 1: Error varying with num_terms-----#
-    plt.figure(figsize=(8, 4))
+    lines = []
     for centre in centres:
         #select the rows for each approximation with this centre and sort by num_terms
-        maclaurin = sorted([row for row in function_rows if row["approximation"] == "maclaurin" and row["centre"] == centre], key=lambda x: x["num_terms"])
-        taylor = sorted([row for row in function_rows if row["approximation"] == "taylor" and row["centre"] == centre], key=lambda x: x["num_terms"])
+        maclaurin = table.series_rows(function_string, "maclaurin", centre)
+        taylor = table.series_rows(function_string, "taylor", centre)
 
         #if list is not empty then plot a graph of num_terms vs error for MACLAURIN SERIES
-        if maclaurin:   
+        if maclaurin:
             num_terms_maclaurin = [int(row["num_terms"]) for row in maclaurin]
             num_errors_maclaurin = [float(row["max_absolute_error"]) for row in maclaurin]
-            plt.plot(num_terms_maclaurin, num_errors_maclaurin, marker='o', linestyle='--', label=f"Maclaurin (centre={centre})")
+            lines.append((num_terms_maclaurin, num_errors_maclaurin, 'o', '--', f"Maclaurin (centre={centre})"))
         #if list is not empty then plot a graph of num_terms vs error for TAYLOR SERIES
-        if taylor:  
+        if taylor:
             num_terms_taylor = [int(row["num_terms"]) for row in taylor]
             num_errors_taylor = [float(row["max_absolute_error"]) for row in taylor]
-            plt.plot(num_terms_taylor, num_errors_taylor, marker='x', linestyle='-.', label=f"Taylor (centre={centre})")
-
-    plt.yscale('log')   #log scale for y-axis to better see error trends
-    plt.xlabel("Number of Terms in Polynomial Approximation")
-    plt.ylabel("Maximum Absolute Error (log scale)")
-    plt.title(f"Error vs Number of Terms for {function_string}")
-    plt.grid(True, linestyle=':', linewidth=0.7)
-    plt.legend(loc='upper right', fontsize='small')
-    plt.tight_layout()
+            lines.append((num_terms_taylor, num_errors_taylor, 'x', '-.', f"Taylor (centre={centre})"))
+    labels = {
+        "x_label": "Number of Terms in Polynomial Approximation",
+        "y_label": "Maximum Absolute Error (log scale)",
+        "title": f"Error vs Number of Terms for {function_string}"
+    }
     out1 = os.path.join(settings.plots_directory, f"{safe_function}_error_vs_num_terms.png") #output filename
-    plt.savefig(out1, dpi=150)
-    plt.close()
-
+    plots = [(out1, "error_vs_num_terms", lines, labels)]
 
     #-----Plot 2: Error varying with different expansion centres-----#
     #pick the maximum num_terms tested as reference
     chosen_num_terms = max(num_terms)
-    plt.figure(figsize=(8, 4))  #create a new figure
     sorted_centres = sorted(centres)
     maclaurin_errors = []
     taylor_errors = []
     for centre in sorted_centres:
         #find the rows for this centre and chosen num_terms for each series approximation
-        maclaurin_row = next((row for row in function_rows if row["approximation"] == "maclaurin" and row["centre"] == centre and row["num_terms"] == chosen_num_terms), None)
-        taylor_row = next((row for row in function_rows if row["approximation"] == "taylor" and row["centre"] == centre and row["num_terms"] == chosen_num_terms), None)
+        maclaurin_row = table.lookup(function_string, "maclaurin", centre, chosen_num_terms)
+        taylor_row = table.lookup(function_string, "taylor", centre, chosen_num_terms)
         #append the errors if the rows exist
         maclaurin_errors.append(float(maclaurin_row["max_absolute_error"]) if maclaurin_row else float('nan'))
         taylor_errors.append(float(taylor_row["max_absolute_error"]) if taylor_row else float('nan'))
 
     #plot the error vs centres for the 2 series
-    plt.plot(sorted_centres, maclaurin_errors, marker='o', linestyle='--', label=f"Maclaurin (terms={chosen_num_terms})")
-    plt.plot(sorted_centres, taylor_errors, marker='x', linestyle='-.', label=f"Taylor (terms={chosen_num_terms})")
-
-    plt.yscale('log')   #log scale for y-axis to better see error trends
-    plt.xlabel("Expansion Centre")
-    plt.ylabel("Maximum Absolute Error (log scale)")
-    plt.title(f"Error vs Expansion Centre for {function_string} (Terms={chosen_num_terms})")
-    plt.grid(True, linestyle=':', linewidth=0.7)
-    plt.legend(loc='upper right', fontsize='small')
-    plt.tight_layout()
+    lines = [
+        (sorted_centres, maclaurin_errors, 'o', '--', f"Maclaurin (terms={chosen_num_terms})"),
+        (sorted_centres, taylor_errors, 'x', '-.', f"Taylor (terms={chosen_num_terms})")
+    ]
+    labels = {
+        "x_label": "Expansion Centre",
+        "y_label": "Maximum Absolute Error (log scale)",
+        "title": f"Error vs Expansion Centre for {function_string} (Terms={chosen_num_terms})"
+    }
     out2 = os.path.join(settings.plots_directory, f"{safe_function}_error_vs_centre.png") #output filename
-    plt.savefig(out2, dpi=150)
-    plt.close()
+    plots.append((out2, "error_vs_centre", lines, labels))
+    return plots
+
+def useful_num_terms(function_string, centre, num_terms_list, target_error, x_min, x_max, num_x_points, backend=None):
+    """
+    Cuts num_terms_list down to the orders worth evaluating for a target maximum error
+    - both series are run through order_selection.select_order, which stops at the first order meeting the target
+    - keeps every order up to the first listed one at or past the later of the two minimal orders
+    - if either series never meets the target (unreachable, diverged or out of orders) every listed order is kept,
+      so the sweep still has a row for each of them
+    """
+    stop_orders = []
+    for series_centre in (0.0, centre):
+        result = select_order(function_string, series_centre, target_error, x_min, x_max, num_x_points, max(num_terms_list), backend)
+        if result["status"] != "converged":
+            return list(num_terms_list)
+        stop_orders.append(result["num_terms"])
+    last_order = min([num_terms for num_terms in num_terms_list if num_terms >= max(stop_orders)], default=max(num_terms_list))
+    return [num_terms for num_terms in num_terms_list if num_terms <= last_order]
+
+def run_work_unit(function_string, centre, num_terms_list, x_min, x_max, num_x_points, backend=None, adaptive_max_error=None, target_error=None):
+    """
+    Runs one independent unit of the experiment: a single function at a single expansion centre
+    - each series is expanded once at max(num_terms_list), every order is then evaluated in one pass
+    - with adaptive_max_error (default settings.adaptive_max_error) the maximum errors come from
+      adaptive_error.adaptive_max_absolute_error instead of the grid, and each row also gets
+      the number of evaluations used as "max_error_evaluations"
+    - with a target_error, orders past the point where both series meet it are skipped, see useful_num_terms
+    - grids larger than settings.stream_threshold_points are walked in chunks (see streaming_evaluation),
+      so memory stays constant whatever num_x_points is
+    - the work is run through an experiment_planner.ExperimentPlan, so a centre of 0 reuses the maclaurin series
+    Returns the data rows for this unit, a maclaurin and a taylor row for each order evaluated
+    """
+    if target_error is not None:
+        num_terms_list = useful_num_terms(function_string, centre, num_terms_list, target_error, x_min, x_max, num_x_points, backend)
+    plan = ExperimentPlan([function_string], [centre], num_terms_list, x_min, x_max, num_x_points, backend, adaptive_max_error)
+    return plan.unit_rows(function_string, centre)
 
-def run_experiment(functions, centres, num_terms_list, x_min=None, x_max=None, num_x_points=None):
+def print_unit_rows(rows):
+    """
+    Prints one progress line per number of terms from the (maclaurin, taylor) row pairs of a work unit
+    """
+    for maclaurin_row, taylor_row in zip(rows[0::2], rows[1::2]):
+        line = f"  Centre: {maclaurin_row['centre']}, Terms: {maclaurin_row['num_terms']} -> Maclaurin Max Error: {maclaurin_row['max_absolute_error']:.3e}, Taylor Max Error: {taylor_row['max_absolute_error']:.3e}"
+        if "max_error_evaluations" in maclaurin_row:
+            line += f" (adaptive: {maclaurin_row['max_error_evaluations']} + {taylor_row['max_error_evaluations']} evaluations)"
+        print(line)
+
+def run_experiment(functions, centres, num_terms_list, x_min=None, x_max=None, num_x_points=None, backend=None, workers=None, adaptive_max_error=None, target_error=None):
     """
     Runs the series expansion experiment for the given functions, centres and number of terms.
+    - backend picks how the series coefficients are computed ("sympy" or "taylor_ad"), defaults to settings.series_backend
+    - workers is the number of processes the (function, centre) units, and then the summary plots, are spread over,
+      defaults to settings.experiment_workers
+    - adaptive_max_error estimates the maximum errors adaptively instead of on the grid, see run_work_unit
+    - target_error skips the orders past the point where both series meet it, see run_work_unit
+    - when run serially without a target_error, the whole sweep is one experiment_planner.ExperimentPlan, so the grid,
+      true function values and maclaurin series are computed once per function rather than once per centre,
+      and a table of the work reused is printed at the end
+    - with settings.instrumentation on, prints the time spent in each stage and writes a trace file
+      (stages run inside worker processes are not recorded when workers > 1)
+    Rows, plots and the CSV come out in the same order whatever the number of workers
     """
     if x_min is None: x_min = settings.min_x
     if x_max is None: x_max = settings.max_x
     if num_x_points is None: num_x_points = settings.num_x_points
+    if workers is None: workers = settings.experiment_workers
+
+    with instrumentation.recording("run_experiment") as run_recording:
+        data_rows = ResultTable()   #to store all the data rows for CSV output
+
+        #every (function, centre) pair is independent, so they can run in any process
+        units = [(function_string, centre) for function_string in functions for centre in centres]
+        unit_arguments = [
+            [function_string for function_string, _ in units],
+            [centre for _, centre in units],
+            [num_terms_list] * len(units),
+            [x_min] * len(units),
+            [x_max] * len(units),
+            [num_x_points] * len(units),
+            [backend] * len(units),
+            [adaptive_max_error] * len(units),
+            [target_error] * len(units)
+        ]
+
+        pool = None
+        plan = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=apply_settings, initargs=(current_settings(),))
+            unit_results = pool.map(run_work_unit, *unit_arguments)    #results are yielded in submission order
+        elif target_error is None:
+            #one plan for the whole sweep, so work shared between units runs once
+            plan = ExperimentPlan(functions, centres, num_terms_list, x_min, x_max, num_x_points, backend, adaptive_max_error)
+            unit_results = (plan.unit_rows(function_string, centre) for function_string, centre in units)
+        else:
+            unit_results = map(run_work_unit, *unit_arguments)
+
+        try:
+            for function_string in functions:
+                print(f"Running experiment for function: {function_string}")
+                for centre in centres:
+                    rows = next(unit_results)
+                    print_unit_rows(rows)
+                    data_rows.extend(rows)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        #draw the summary plots of every function in one batch once all the data is in
+        with instrumentation.stage("summary_plots"):
+            plots = [plot for function_string in functions for plot in summary_plots(function_string, data_rows, num_terms_list, centres)]
+            drawn, cached = save_summary_plots(plots, workers)
+        print(f"Summary plots: {drawn} drawn, {cached} unchanged")
+
+        #write the csv results file after every function has been processed
+        csv_path = os.path.join(settings.data_directory, "series_experiment_results.csv")
+        with instrumentation.stage("csv_write"):
+            write_data_to_csv(data_rows, csv_path)
+        write_data_to_npz(data_rows, os.path.splitext(csv_path)[0] + ".npz")
+        print(f"Experiment data saved to: {csv_path}")
+        if plan is not None:
+            print(plan.reuse_table())
+
+    if run_recording is not None:
+        print(run_recording.summary_table())
+        print(f"Trace saved to: {run_recording.write_trace(instrumentation.trace_path('run_experiment'))}")
+
+
 
-    data_rows = []   #to store all the data rows for CSV output
-
-    for function_string in functions:
-        print(f"Running experiment for function: {function_string}")
-        for centre in centres:
-            for num_terms in num_terms_list:
-                #evaluate the actual function and series approximations using series module function
-                x_grid, y_true, y_maclaurin, y_taylor, meta = evaluate_series_function(
-                    function_string,
-                    centre=centre,
-                    maclaurin_num_terms=num_terms,
-                    taylor_num_terms=num_terms,
-                    x_min=x_min,
-                    x_max=x_max,
-                    num_x_points=num_x_points
-                )
-                #compute the errors for maclaurin and taylor series
-                maclaurin_max_error = max_absolute_error(y_true, y_maclaurin)
-                maclaurin_mse = mean_squared_error(y_true, y_maclaurin)
-                taylor_max_error = max_absolute_error(y_true, y_taylor)
-                taylor_mse = mean_squared_error(y_true, y_taylor)
-
-                #store the data rows for maclaurin series
-                data_rows.append({
-                    "function": function_string,
-                    "approximation": "maclaurin",
-                    "centre": centre,
-                    "num_terms": num_terms,
-                    "max_absolute_error": maclaurin_max_error,
-                    "mean_squared_error": maclaurin_mse
-                })
-
-                #store the data rows for taylor series
-                data_rows.append({
-                    "function": function_string,
-                    "approximation": "taylor",
-                    "centre": centre,
-                    "num_terms": num_terms,
-                    "max_absolute_error": taylor_max_error,
-                    "mean_squared_error": taylor_mse
-                })
-
-                print(f"  Centre: {centre}, Terms: {num_terms} -> Maclaurin Max Error: {maclaurin_max_error:.3e}, Taylor Max Error: {taylor_max_error:.3e}")
-
-        #generate summary plots for this function
-        generate_plot_for_function(function_string, [row for row in data_rows if row["function"] == function_string], num_terms_list, centres)
-
-    #write the csv results file after every function has been processed
-    csv_path = os.path.join(settings.data_directory, "series_experiment_results.csv")
+
+
+def load_sweep_spec(spec_path=None):
+    """
+    Reads a sweep spec JSON file and fills in any missing settings from settings.py, e.g.
+    {"functions": ["sin(x)", "exp(x)"], "centres": [0.0, 0.5], "num_terms": [1, 5, 10], "num_x_points": 1000}
+    - optional keys are x_min, x_max, num_x_points, backend, adaptive_max_error, target_error and csv_name
+    - with no path the default sweep of this script is used
+    """
+    if spec_path is None:
+        spec = dict(default_sweep)
+    else:
+        with open(spec_path) as spec_file:
+            spec = json.load(spec_file)
+    for key in ("functions", "centres", "num_terms"):
+        if not spec.get(key):
+            raise ValueError(f"sweep spec needs a non-empty list for {key!r}")
+
+    spec.setdefault("x_min", settings.min_x)
+    spec.setdefault("x_max", settings.max_x)
+    spec.setdefault("num_x_points", settings.num_x_points)
+    spec.setdefault("backend", settings.series_backend)
+    spec.setdefault("adaptive_max_error", settings.adaptive_max_error)
+    spec.setdefault("target_error", None)
+    spec.setdefault("csv_name", "series_experiment_results.csv")
+    return spec
+
+def sweep_units(spec):
+    """
+    Returns the (function, centre) work units of a sweep in the order their rows appear in the CSV
+    """
+    return [(function_string, centre) for function_string in spec["functions"] for centre in spec["centres"]]
+
+def checkpoint_directory(spec):
+    """
+    Returns the folder finished work units of this sweep are checkpointed to
+    - the folder name is a hash of the spec, so changing the sweep never reuses stale units
+    """
+    canonical = json.dumps({key: spec[key] for key in sorted(spec) if key != "csv_name"}, sort_keys=True)
+    sweep_id = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(settings.data_directory, "checkpoints", sweep_id)
+
+def unit_checkpoint_path(spec, unit_index):
+    """Returns the checkpoint file of one work unit"""
+    return os.path.join(checkpoint_directory(spec), f"unit_{unit_index:05d}.json")
+
+def parse_shard(shard_text):
+    """
+    Parses a shard given as "i/n" (1 <= i <= n) into (i, n)
+    - raises argparse.ArgumentTypeError, so argparse reports a malformed --shard as a usage error
+    """
+    try:
+        shard_index, shard_count = (int(part) for part in shard_text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/n, got {shard_text!r}") from None
+    if not 1 <= shard_index <= shard_count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {shard_count}, got {shard_index}")
+    return shard_index, shard_count
+
+def run_sweep_shard(spec, shard_index=1, shard_count=1, workers=None):
+    """
+    Runs the work units of one shard of the sweep, checkpointing each unit to disk as soon as it finishes
+    - shard i of n takes every unit whose index is i - 1 modulo n, so shards never overlap
+    - units that already have a checkpoint are skipped, so a crashed run can simply be restarted
+    Returns (number of units run, number skipped)
+    """
+    if workers is None: workers = settings.experiment_workers
+    os.makedirs(checkpoint_directory(spec), exist_ok=True)
+
+    pending = []
+    skipped = 0
+    for unit_index, unit in enumerate(sweep_units(spec)):
+        if unit_index % shard_count != shard_index - 1:
+            continue
+        if os.path.exists(unit_checkpoint_path(spec, unit_index)):
+            skipped += 1
+        else:
+            pending.append((unit_index, unit))
+    print(f"Shard {shard_index}/{shard_count}: {len(pending)} units to run, {skipped} already done")
+
+    def unit_arguments(unit):
+        function_string, centre = unit
+        return (function_string, centre, spec["num_terms"], spec["x_min"], spec["x_max"], spec["num_x_points"], spec["backend"], spec["adaptive_max_error"], spec["target_error"])
+
+    def save_unit(unit_index, unit, rows):
+        path = unit_checkpoint_path(spec, unit_index)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as unit_file:
+            json.dump({"function": unit[0], "centre": unit[1], "rows": rows}, unit_file)
+        os.replace(temporary_path, path)   #a unit is only marked done once its file is complete
+        print(f"  Finished unit {unit_index}: {unit[0]} at centre {unit[1]}")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_settings, initargs=(current_settings(),)) as pool:
+            futures = {pool.submit(run_work_unit, *unit_arguments(unit)): (unit_index, unit) for unit_index, unit in pending}
+            for future in as_completed(futures):
+                unit_index, unit = futures[future]
+                save_unit(unit_index, unit, future.result())
+    else:
+        for unit_index, unit in pending:
+            save_unit(unit_index, unit, run_work_unit(*unit_arguments(unit)))
+    return len(pending), skipped
+
+def merge_sweep(spec, workers=None):
+    """
+    Gathers the checkpointed units of every shard into the final CSV and summary plots
+    - raises RuntimeError if any unit has not been run yet
+    - the summary plots are drawn in one batch spread over workers processes (default settings.experiment_workers)
+    Returns the path of the CSV written
+    """
+    if workers is None: workers = settings.experiment_workers
+    units = sweep_units(spec)
+    missing = [unit_index for unit_index in range(len(units)) if not os.path.exists(unit_checkpoint_path(spec, unit_index))]
+    if missing:
+        raise RuntimeError(f"{len(missing)} of {len(units)} units have not been run yet, e.g. unit {missing[0]}")
+
+    #group the unit indices by function once, so the rows come out function by function without rescanning the units
+    function_units = {}
+    for unit_index, (function_string, _) in enumerate(units):
+        function_units.setdefault(function_string, []).append(unit_index)
+
+    data_rows = ResultTable()
+    for function_string in spec["functions"]:
+        for unit_index in function_units.get(function_string, []):
+            with open(unit_checkpoint_path(spec, unit_index)) as unit_file:
+                data_rows.extend(json.load(unit_file)["rows"])
+    plots = [plot for function_string in spec["functions"] for plot in summary_plots(function_string, data_rows, spec["num_terms"], spec["centres"])]
+    save_summary_plots(plots, workers)
+
+    csv_path = os.path.join(settings.data_directory, spec["csv_name"])
     write_data_to_csv(data_rows, csv_path)
-    print(f"Experiment data saved to: {csv_path}")
+    write_data_to_npz(data_rows, os.path.splitext(csv_path)[0] + ".npz")
+    print(f"Merged {len(units)} units, experiment data saved to: {csv_path}")
+    return csv_path
 
+def main(argv=None):
+    """
+    Command line entry point:
+    - no arguments runs the default sweep in one go
+    - "run [--spec FILE] [--shard i/n] [--workers N]" runs (part of) a sweep with checkpoints,
+      merging straight away when it is not sharded
+    - "merge [--spec FILE]" combines the checkpoints of every shard into the CSV and plots
+    """
+    parser = argparse.ArgumentParser(description="Run the series expansion error experiment")
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="run the work units of a sweep, checkpointing each one")
+    run_parser.add_argument("--spec", help="sweep spec JSON file (defaults to the built-in sweep)")
+    run_parser.add_argument("--shard", type=parse_shard, default=(1, 1), help="only run shard i of n, written as i/n")
+    run_parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    merge_parser = commands.add_parser("merge", help="write the CSV and plots from the checkpointed units")
+    merge_parser.add_argument("--spec", help="sweep spec JSON file (defaults to the built-in sweep)")
+    arguments = parser.parse_args(argv)
 
+    if arguments.command is None:
+        run_experiment(default_sweep["functions"], default_sweep["centres"], default_sweep["num_terms"], x_min=settings.min_x, x_max=settings.max_x, num_x_points=settings.num_x_points)
+        return
 
+    spec = load_sweep_spec(arguments.spec)
+    if arguments.command == "run":
+        shard_index, shard_count = arguments.shard
+        run_sweep_shard(spec, shard_index, shard_count, arguments.workers)
+        if shard_count == 1:
+            merge_sweep(spec, arguments.workers)
+    else:
+        merge_sweep(spec)
 
+#the functions, centres and number of terms tested when no sweep spec is given
+default_sweep = {
+    "functions": ["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)"],
+    "centres": [0.0, 0.5, 1.0],
+    "num_terms": [1, 2, 3, 5, 10, 15]
+}
 
-#to test this script directly
+#to run this script directly
 if __name__ == "__main__":
-    #define the functions, centres and number of terms to test
-    test_functions = ["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)"]
-    test_centres = [0.0, 0.5, 1.0]
-    test_num_terms_list = [1, 2, 3, 5, 10, 15]
-
-    #run the experiment
-    run_experiment(test_functions, test_centres, test_num_terms_list, x_min=settings.min_x, x_max=settings.max_x, num_x_points=settings.num_x_points)
+    main()
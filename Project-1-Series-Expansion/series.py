@@ -1,65 +1,186 @@
-from sympy import sympify, symbols, series, lambdify   
+from sympy import symbols, series, expand, Dummy, Add, nan
 import numpy
-from parser_function import sanitize_input_function     #import the sanitization function
+from parser_function import parse_function_to_numpy_callable     #cached parse + numeric kernel of the input string
+from expression_cache import LRUCache   #bounded caches for coefficient vectors
+import taylor_arithmetic      #numeric backend that bypasses sympy.series
+import coefficient_store        #coefficient vectors saved on disk between runs
+import instrumentation      #optional per-stage timings
+from metrics import as_float_array      #float64 view of lambdify output without a copy
 import settings     #import settings for configuration values
 
 x = symbols("x")
+t = Dummy("t")      #offset from the centre, x = centre + t
+
+#coefficient vectors already computed, keyed by (expression, centre)
+#each entry holds the exact coefficients up to the highest order expanded so far
+coefficient_cache = LRUCache("series_coefficients", settings.series_cache_size)
+
+#float64 coefficient vectors returned by series_coefficients, keyed by (expression, centre, backend)
+numeric_coefficient_cache = LRUCache("series_coefficients_numeric", settings.series_cache_size)
+
+#backends that can compute the coefficients of an expansion
+series_backends = ("sympy", "taylor_ad")
+
+def expand_coefficients(expression, centre, num_terms):
+    """
+    Expands the expression about the centre up to order num_terms with a single sympy.series call
+    Returns a tuple of the exact coefficients (c_0, c_1, ..., c_num_terms) of (x - centre)^k
+    - if the expansion has terms that are not integer powers of (x - centre), e.g. log(x) or sqrt(x) at 0,
+      there is no Taylor polynomial and every coefficient is nan, so the series evaluates to nan like a complex coefficient
+    """
+    shifted = expression.subs(x, t + centre)
+    polynomial = expand(series(shifted, t, 0, num_terms + 1).removeO())
+    coefficients = tuple(polynomial.coeff(t, k) for k in range(num_terms + 1))
+
+    #check nothing was left over after collecting the integer powers
+    remainder = expand(polynomial - Add(*[c * t**k for k, c in enumerate(coefficients)]))
+    if remainder != 0:
+        return (nan,) * (num_terms + 1)
+    return coefficients
+
+def exact_series_coefficients(expression, centre, num_terms):
+    """
+    Returns the exact coefficients (c_0, ..., c_num_terms) of the expansion about the centre
+    - the expansion is only computed when a higher order than any cached one is asked for
+    - lower orders are served by truncating the cached coefficient vector
+    """
+    key = (expression, centre)
+    cached = coefficient_cache.get(key)
+    if cached is None or len(cached) <= num_terms:
+        cached = expand_coefficients(expression, centre, num_terms)
+        coefficient_cache.put(key, cached)
+    return cached[:num_terms + 1]
+
+def series_coefficients(expression, centre, num_terms, backend=None):
+    """
+    Returns the coefficients of the expansion about the centre as a float64 numpy array
+    - backend "sympy" expands symbolically with sympy.series, coefficients that are not finite real numbers (e.g. log(0)) become nan
+    - backend "taylor_ad" propagates truncated coefficient arrays numerically through the expression tree
+    - backend defaults to settings.series_backend
+    Vectors are cached in memory and, if settings.coefficient_disk_cache is on, on disk across runs
+    """
+    if backend is None:
+        backend = settings.series_backend
+    if backend not in series_backends:
+        raise ValueError(f"unknown series backend {backend!r}, expected one of {series_backends}")
+
+    key = (expression, centre, backend)
+    cached = numeric_coefficient_cache.get(key)
+    if cached is None or len(cached) <= num_terms:
+        #a warm disk store lets repeat runs skip the expansion entirely
+        cached = None
+        if settings.coefficient_disk_cache:
+            with instrumentation.stage("coefficient_disk_load"):
+                cached = coefficient_store.load_coefficients(expression, centre, num_terms, backend)
+        if cached is None:
+            with instrumentation.stage(f"series_expansion_{backend}"):
+                cached = compute_series_coefficients(expression, centre, num_terms, backend)
+            if settings.coefficient_disk_cache:
+                with instrumentation.stage("coefficient_disk_save"):
+                    coefficient_store.save_coefficients(expression, centre, cached, backend)
+        else:
+            instrumentation.count("coefficient_disk_hits")
+        numeric_coefficient_cache.put(key, cached)
+    else:
+        instrumentation.count("coefficient_memory_hits")
+    return cached[:num_terms + 1].copy()
+
+def compute_series_coefficients(expression, centre, num_terms, backend):
+    """
+    Computes the float64 coefficient vector of the expansion with the given backend, without any caching of its own
+    """
+    if backend == "taylor_ad":
+        return taylor_arithmetic.taylor_coefficients(expression, centre, num_terms, variable=x)
+
+    values = []
+    for coefficient in exact_series_coefficients(expression, centre, num_terms):
+        try:
+            values.append(float(coefficient))
+        except TypeError:
+            values.append(float("nan"))     #complex or undefined coefficient
+    return numpy.array(values, dtype=float)
 
 def series_expression(expression, centre, num_terms):
     """
     Given a symbolic expression, centre and order (num_terms)
     Returns a symbolic taylor/maclaurin polynomial approximation
-    - uses sympy.series to compute the series expansion
-    - removes the big O notation using removeO() method
-    - sympy.series uses n = num_terms + 1 to include the right number of terms up to x^num_terms
+    - the coefficients come from the cached expansion, so only one sympy.series call is made per centre
+    - the polynomial includes the terms up to (x - centre)^num_terms
     """
-    series_expr = series(expression, x, centre, num_terms + 1).removeO()
+    coefficients = exact_series_coefficients(expression, centre, num_terms)
+    series_expr = Add(*[c * (x - centre)**k for k, c in enumerate(coefficients)])
     return series_expr
 
-def series_expression_numpy_callable(expression, centre, num_terms):
+def partial_sum_matrix(coefficients, centre, x_grid, orders=None):
     """
-    Given the series polynomial expression, centre and order (num_terms)
-    Return a numpy-callable function for the series expansion
+    Evaluates every truncation of a series on the grid in a single numpy pass
+    - coefficients is the vector (c_0, ..., c_n) of (x - centre)^k, e.g. from series_coefficients
+    - orders is the list of num_terms values wanted, defaults to every order 0..n
+    Returns a (len(orders), len(x_grid)) array where row i is the partial sum up to (x - centre)^orders[i]
+    - the powers of (x - centre) are built cumulatively so each term costs one multiply and one add
     """
-    series_expr = series_expression(expression, centre, num_terms)
-    numpy_expr = lambdify(x, series_expr, "numpy")
-    return numpy_expr
+    coefficients = numpy.asarray(coefficients, dtype=float)
+    x_grid = numpy.asarray(x_grid, dtype=float)
+    if orders is None:
+        orders = range(len(coefficients))
+    orders = list(orders)
+    if orders and max(orders) >= len(coefficients):
+        raise ValueError(f"need {max(orders) + 1} coefficients for order {max(orders)}, got {len(coefficients)}")
+
+    #rows that take a copy of the running sum once each order is reached
+    rows_for_order = {}
+    for row, order in enumerate(orders):
+        rows_for_order.setdefault(order, []).append(row)
 
-def evaluate_series_function(function_string, centre=0.0, maclaurin_num_terms=settings.default_num_terms, taylor_num_terms=settings.default_num_terms, x_min=settings.min_x, x_max=settings.max_x, num_x_points=settings.num_x_points):
+    matrix = numpy.empty((len(orders), x_grid.size), dtype=float)
+    offset = x_grid - centre
+    power = numpy.ones_like(offset)
+    running_sum = numpy.zeros_like(offset)
+    term = numpy.empty_like(offset)
+    with numpy.errstate(all="ignore"):
+        for k in range(max(orders, default=-1) + 1):
+            numpy.multiply(power, coefficients[k], out=term)
+            running_sum += term
+            for row in rows_for_order.get(k, []):
+                matrix[row] = running_sum
+            power *= offset
+    return matrix
+
+def evaluate_series_function(function_string, centre=0.0, maclaurin_num_terms=settings.default_num_terms, taylor_num_terms=settings.default_num_terms, x_min=settings.min_x, x_max=settings.max_x, num_x_points=settings.num_x_points, backend=None, dtype=None):
     """
     This function does the following:
     - parses the input function string to a sympy expression
     - creates a numpy-callable function from the sympy expression
-    - creates numpy-callable functions for the maclaurin and taylor series expansions
-    - evaluates each of these on a numeric x-grid defined by x_min, x_max, num_x_points
+    - evaluates it and the maclaurin and taylor partial sums on a numeric x-grid defined by x_min, x_max, num_x_points
     Returns: 
     - (x_grid, y_true, y_maclaurin, y_taylor, meta)
     - meta is a dictionary with information useful for reporting and plotting labels
     If configurations like num_terms are not input, default values from settings.py are used
+    - backend picks how the series coefficients are computed, see series_coefficients
+    - dtype, e.g. numpy.float32 for previews, evaluates the true function in that precision and returns y_true in it
+      (the grid and series stay float64)
     """
-    #parse the function string to sympy expression and numpy-callable function
-    sanitized_string = sanitize_input_function(function_string)
-    expression = sympify(sanitized_string)
-    numpy_function = lambdify(x, expression, "numpy")
+    #parse the function string to sympy expression and numpy-callable function (cached across calls)
+    with instrumentation.stage("parse"):
+        expression, numpy_function = parse_function_to_numpy_callable(function_string)
 
     #prepare grid for evaluating functions
     x_grid = numpy.linspace(x_min, x_max, num_x_points)
 
-    #create numpy-callable functions for maclaurin and taylor series
-    maclaurin_function = series_expression_numpy_callable(expression, 0.0, maclaurin_num_terms) #maclaurin is always centred at 0
-    taylor_function = series_expression_numpy_callable(expression, centre, taylor_num_terms)
-
     #evaluate the true function on the grid
-    with numpy.errstate(all="ignore"):
-        y_actual = numpy.array(numpy_function(x_grid), dtype=float)
+    with instrumentation.stage("true_evaluation"), numpy.errstate(all="ignore"):
+        if dtype is None:
+            y_actual = as_float_array(numpy_function(x_grid))
+        else:
+            y_actual = numpy.asarray(numpy_function(x_grid.astype(dtype)), dtype=dtype)
 
-    #evaluate the maclaurin series on the grid
-    with numpy.errstate(all="ignore"):
-        y_maclaurin = numpy.array(maclaurin_function(x_grid), dtype=float)
-
-    #evaluate the taylor series on the grid
-    with numpy.errstate(all="ignore"):
-        y_taylor = numpy.array(taylor_function(x_grid), dtype=float)
+    #evaluate the maclaurin (always centred at 0) and taylor series on the grid from their coefficients
+    with instrumentation.stage("series_coefficients"):
+        maclaurin_coefficients = series_coefficients(expression, 0.0, maclaurin_num_terms, backend)
+        taylor_coefficients = series_coefficients(expression, centre, taylor_num_terms, backend)
+    with instrumentation.stage("partial_sums"):
+        y_maclaurin = partial_sum_matrix(maclaurin_coefficients, 0.0, x_grid, [maclaurin_num_terms])[0]
+        y_taylor = partial_sum_matrix(taylor_coefficients, centre, x_grid, [taylor_num_terms])[0]
 
     #create meta information as dictionary
     meta = {
@@ -70,7 +191,8 @@ def evaluate_series_function(function_string, centre=0.0, maclaurin_num_terms=se
         "taylor_num_terms": taylor_num_terms,
         "x_min": x_min,
         "x_max": x_max,
-        "num_x_points": num_x_points
+        "num_x_points": num_x_points,
+        "backend": backend or settings.series_backend
     }
 
     return x_grid, y_actual, y_maclaurin, y_taylor, meta
\ No newline at end of file
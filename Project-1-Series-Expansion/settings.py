@@ -10,9 +10,73 @@ num_x_points = 500
 plots_directory = "plots"
 data_directory = "data"
 
+#Whether the GUI also saves a PNG of each preview plot (done in the background after the preview is shown)
+save_preview_plots = True
+
 #Maximum number of terms the series expansion can go up to
 max_num_terms = 20
 
+#How series coefficients are computed: "sympy" (symbolic sympy.series) or "taylor_ad" (numeric taylor arithmetic)
+series_backend = "sympy"
+
+#Maximum number of entries kept in the in-memory caches of parsed expressions, lambdified functions
+#and series coefficient vectors (0 disables a cache)
+parse_cache_size = 128
+lambdify_cache_size = 128
+series_cache_size = 256
+
+#On-disk store of series coefficient vectors inside data_directory, reused between runs
+#bump the version to invalidate every stored entry, e.g. after changing how coefficients are computed
+coefficient_disk_cache = True
+coefficient_cache_directory = "coefficient_cache"
+coefficient_cache_max_bytes = 16 * 1024 * 1024
+coefficient_cache_version = 1
+
+#Whether true function values are evaluated by compiled kernels (numeric_kernel.py) that compute common subexpressions
+#once into reused buffers instead of lambdify, and whether GUI preview plots (no error stats) evaluate them in float32
+numeric_kernels = True
+preview_float32 = True
+
+#Streaming evaluation of large grids: points per chunk, most points kept for plotting,
+#and the grid size above which run_experiment switches to streaming the error reductions
+stream_chunk_size = 65536
+stream_plot_points = 4000
+stream_threshold_points = 1000000
+
+#Whether plotted curves are reduced to the smallest and largest value per pixel column before drawing,
+#so plots of very large grids draw as fast as small ones (the error metrics always use every point)
+plot_downsampling = True
+
+#Content-addressed cache of rendered plots inside plots_directory: a plot whose data and styling are unchanged
+#is copied from the cache instead of being drawn again, the least recently used plots are evicted past the size limit
+#bump the version after changing how plots are drawn
+plot_cache = True
+plot_cache_directory = "plot_cache"
+plot_cache_max_bytes = 64 * 1024 * 1024
+plot_cache_version = 1
+
+#Number of processes run_experiment spreads the (function, centre) units over (1 runs them serially)
+experiment_workers = 1
+
+#Live mode in the GUI: backend used to precompute every order, and how far Left/Right moves the centre
+live_plot_backend = "taylor_ad"
+live_centre_step = 0.1
+
+#Adaptive maximum error estimation: whether run_experiment uses it, relative tolerance, starting grid size and evaluation budget
+adaptive_max_error = False
+adaptive_error_rtol = 1e-6
+adaptive_error_initial_points = 33
+adaptive_error_max_evaluations = 2000
+
+#Automatic order selection: first block of coefficients fetched, and how many orders in a row may fail
+#to improve on the best error before the series is treated as diverging
+order_selection_initial_terms = 4
+order_selection_patience = 3
+
+#Per-stage timing of the pipeline (see instrumentation.py): off by default, trace files go to this folder inside data_directory
+instrumentation = False
+instrumentation_trace_directory = "traces"
+
 #Normal number of terms to use in default calculations
 default_num_terms = 5
 
@@ -0,0 +1,182 @@
+#This file evaluates series on very large x grids a fixed-size chunk at a time, so memory stays constant
+#whatever num_x_points is: the error reductions are accumulated chunk by chunk in preallocated buffers
+#and only a downsampled copy of the curves is kept for plotting
+import numpy
+import settings
+from parser_function import parse_function_to_numpy_callable
+from series import series_coefficients
+from metrics import reduce_difference, as_float_array
+
+class ErrorAccumulator:
+    """
+    Running maximum absolute error and mean squared error of one approximation, ignoring nan like nanmax/nanmean
+    """
+    def __init__(self):
+        self.max_error = float("nan")
+        self.squared_sum = 0.0
+        self.count = 0
+
+    def add(self, difference, nan_mask):
+        """
+        Adds the differences (approximation - true) of one chunk
+        - difference and nan_mask are preallocated scratch buffers of the caller and are overwritten
+        """
+        max_error, squared_sum, count, _ = reduce_difference(difference, nan_mask)
+        self.max_error = float(numpy.fmax(max_error, self.max_error))    #fmax skips nan
+        self.squared_sum += squared_sum
+        self.count += count
+
+    def mean_squared_error(self):
+        """Returns the mean squared error over every non-nan point added so far"""
+        return self.squared_sum / self.count if self.count else float("nan")
+
+class SeriesChunkEvaluator:
+    """
+    Preallocated buffers for evaluating partial sums of one series on chunks of up to chunk_size points
+    """
+    def __init__(self, coefficients, centre, chunk_size):
+        self.coefficients = numpy.asarray(coefficients, dtype=float)
+        self.centre = centre
+        self.offset = numpy.empty(chunk_size)
+        self.power = numpy.empty(chunk_size)
+        self.term = numpy.empty(chunk_size)
+        self.running_sum = numpy.empty(chunk_size)
+
+    def partial_sums(self, x_chunk, orders):
+        """
+        Yields (order, partial sum view) for every order in sorted(set(orders)) on this chunk
+        - the views share one buffer, so use each partial sum before asking for the next
+        """
+        size = len(x_chunk)
+        offset, power, term, running_sum = self.offset[:size], self.power[:size], self.term[:size], self.running_sum[:size]
+        numpy.subtract(x_chunk, self.centre, out=offset)
+        power.fill(1.0)
+        running_sum.fill(0.0)
+        wanted = set(orders)
+        with numpy.errstate(all="ignore"):
+            for k in range(max(wanted, default=-1) + 1):
+                numpy.multiply(power, self.coefficients[k], out=term)
+                running_sum += term
+                if k in wanted:
+                    yield k, running_sum
+                power *= offset
+
+def grid_chunks(x_min, x_max, num_x_points, chunk_size, buffer):
+    """
+    Yields (start, x_chunk) walking numpy.linspace(x_min, x_max, num_x_points) chunk_size points at a time
+    - every chunk is written into the same preallocated buffer, so use each chunk before asking for the next
+    - uses the same arithmetic as numpy.linspace (index * step + x_min, ending exactly on x_max)
+    """
+    step = (x_max - x_min) / (num_x_points - 1) if num_x_points > 1 else 0.0
+    indices = numpy.arange(chunk_size, dtype=float)
+    for start in range(0, num_x_points, chunk_size):
+        size = min(chunk_size, num_x_points - start)
+        x_chunk = buffer[:size]
+        numpy.add(indices[:size], start, out=x_chunk)
+        x_chunk *= step
+        x_chunk += x_min
+        if start + size == num_x_points and num_x_points > 1:
+            x_chunk[-1] = x_max
+        yield start, x_chunk
+
+def evaluate_true_chunk(numpy_function, x_chunk):
+    """
+    Evaluates the true function on one chunk as float64
+    - no copy is made when lambdify already returns a float64 array, constant functions are broadcast
+    """
+    with numpy.errstate(all="ignore"):
+        y = as_float_array(numpy_function(x_chunk))
+    return numpy.broadcast_to(y, x_chunk.shape)
+
+def streaming_series_errors(numpy_function, coefficients, centre, orders, x_min, x_max, num_x_points, chunk_size=None):
+    """
+    Computes the maximum absolute error and mean squared error of every partial sum in orders, one chunk at a time
+    - coefficients is the vector (c_0, ..., c_n) of (x - centre)^k and must reach max(orders)
+    - memory use depends on chunk_size (default settings.stream_chunk_size), not on num_x_points
+    Returns (max_errors, mses) as numpy arrays with one value per entry of orders
+    """
+    if chunk_size is None: chunk_size = settings.stream_chunk_size
+    chunk_size = max(1, min(chunk_size, num_x_points))
+    orders = list(orders)
+    accumulators = {order: ErrorAccumulator() for order in orders}
+
+    evaluator = SeriesChunkEvaluator(coefficients, centre, chunk_size)
+    x_buffer = numpy.empty(chunk_size)
+    difference = numpy.empty(chunk_size)
+    nan_mask = numpy.empty(chunk_size, dtype=bool)
+    for _, x_chunk in grid_chunks(x_min, x_max, num_x_points, chunk_size, x_buffer):
+        size = len(x_chunk)
+        y_true = evaluate_true_chunk(numpy_function, x_chunk)
+        for order, partial_sum in evaluator.partial_sums(x_chunk, orders):
+            with numpy.errstate(all="ignore"):
+                numpy.subtract(partial_sum, y_true, out=difference[:size])
+            accumulators[order].add(difference[:size], nan_mask[:size])
+
+    max_errors = numpy.array([accumulators[order].max_error for order in orders])
+    mses = numpy.array([accumulators[order].mean_squared_error() for order in orders])
+    return max_errors, mses
+
+def evaluate_series_streaming(function_string, centre=0.0, maclaurin_num_terms=settings.default_num_terms, taylor_num_terms=settings.default_num_terms, x_min=settings.min_x, x_max=settings.max_x, num_x_points=settings.num_x_points, backend=None, chunk_size=None, plot_points=None):
+    """
+    Streaming version of series.evaluate_series_function for grids too large to hold in memory
+    - walks the grid chunk_size points at a time (default settings.stream_chunk_size), accumulating the errors
+    - keeps every stride-th point for plotting so that at most plot_points (default settings.stream_plot_points) are kept
+    Returns (x_plot, y_true_plot, y_maclaurin_plot, y_taylor_plot, meta, stats)
+    - meta is the same dictionary as evaluate_series_function's, plus "plot_points"
+    - stats has the same keys as display_window.experiment_stats
+    """
+    if chunk_size is None: chunk_size = settings.stream_chunk_size
+    if plot_points is None: plot_points = settings.stream_plot_points
+    chunk_size = max(1, min(chunk_size, num_x_points))
+
+    expression, numpy_function = parse_function_to_numpy_callable(function_string)
+    maclaurin = SeriesChunkEvaluator(series_coefficients(expression, 0.0, maclaurin_num_terms, backend), 0.0, chunk_size)
+    taylor = SeriesChunkEvaluator(series_coefficients(expression, centre, taylor_num_terms, backend), centre, chunk_size)
+    maclaurin_errors, taylor_errors = ErrorAccumulator(), ErrorAccumulator()
+
+    #the downsampled copy for plotting: every stride-th grid point
+    stride = max(1, -(-num_x_points // max(plot_points, 1)))
+    num_plot_points = -(-num_x_points // stride)
+    x_plot, y_true_plot, y_maclaurin_plot, y_taylor_plot = (numpy.empty(num_plot_points) for _ in range(4))
+
+    x_buffer = numpy.empty(chunk_size)
+    difference = numpy.empty(chunk_size)
+    nan_mask = numpy.empty(chunk_size, dtype=bool)
+    for start, x_chunk in grid_chunks(x_min, x_max, num_x_points, chunk_size, x_buffer):
+        size = len(x_chunk)
+        #positions in this chunk that land on the plotting stride, and where they go in the plot arrays
+        first = (-start) % stride
+        kept = slice(first, size, stride)
+        plot_slice = slice((start + first) // stride, (start + first) // stride + len(range(first, size, stride)))
+
+        y_true = evaluate_true_chunk(numpy_function, x_chunk)
+        x_plot[plot_slice] = x_chunk[kept]
+        y_true_plot[plot_slice] = y_true[kept]
+        for evaluator, num_terms, errors, y_plot in ((maclaurin, maclaurin_num_terms, maclaurin_errors, y_maclaurin_plot), (taylor, taylor_num_terms, taylor_errors, y_taylor_plot)):
+            for _, partial_sum in evaluator.partial_sums(x_chunk, [num_terms]):
+                y_plot[plot_slice] = partial_sum[kept]
+                with numpy.errstate(all="ignore"):
+                    numpy.subtract(partial_sum, y_true, out=difference[:size])
+                errors.add(difference[:size], nan_mask[:size])
+
+    meta = {
+        "function_string": function_string,
+        "expression": str(expression),
+        "centre": centre,
+        "maclaurin_num_terms": maclaurin_num_terms,
+        "taylor_num_terms": taylor_num_terms,
+        "x_min": x_min,
+        "x_max": x_max,
+        "num_x_points": num_x_points,
+        "backend": backend or settings.series_backend,
+        "plot_points": num_plot_points
+    }
+    stats = {
+        "maclaurin_max_error": maclaurin_errors.max_error,
+        "maclaurin_mse": maclaurin_errors.mean_squared_error(),
+        "taylor_max_error": taylor_errors.max_error,
+        "taylor_mse": taylor_errors.mean_squared_error(),
+        "centre_used": centre,
+        "num_terms_used": taylor_num_terms
+    }
+    return x_plot, y_true_plot, y_maclaurin_plot, y_taylor_plot, meta, stats
@@ -0,0 +1,173 @@
+#This file computes taylor coefficients numerically by propagating truncated coefficient arrays
+#through the expression tree, so no sympy.series call is needed (taylor-mode automatic differentiation)
+from sympy import Symbol, Add, Mul, Pow, exp, log, sin, cos, tan
+import numpy
+
+def taylor_variable(centre, num_terms):
+    """
+    Returns the coefficient array of x itself about the centre: (centre, 1, 0, ..., 0)
+    - centre can be a float or a numpy array of centres, the extra axes follow the order axis
+    """
+    centre = numpy.asarray(centre, dtype=float)
+    coefficients = numpy.zeros((num_terms + 1,) + centre.shape)
+    coefficients[0] = centre
+    if num_terms >= 1:
+        coefficients[1] = 1.0
+    return coefficients
+
+def taylor_constant(value, shape):
+    """
+    Returns the coefficient array of a constant: (value, 0, ..., 0)
+    """
+    coefficients = numpy.zeros(shape)
+    coefficients[0] = value
+    return coefficients
+
+def taylor_mul(a, b):
+    """
+    Multiplies two truncated series: c_k = sum_{j=0..k} a_j * b_{k-j}
+    """
+    c = numpy.empty_like(a)
+    for k in range(len(a)):
+        c[k] = numpy.sum(a[:k + 1] * b[k::-1], axis=0)
+    return c
+
+def taylor_div(a, b):
+    """
+    Divides two truncated series: c_k = (a_k - sum_{j=1..k} b_j * c_{k-j}) / b_0
+    """
+    c = numpy.empty_like(a)
+    for k in range(len(a)):
+        c[k] = (a[k] - numpy.sum(b[1:k + 1] * c[k - 1::-1][:k], axis=0)) / b[0]
+    return c
+
+def taylor_exp(a):
+    """
+    Exponential of a truncated series: e_k = (1/k) * sum_{j=1..k} j * a_j * e_{k-j}
+    """
+    e = numpy.empty_like(a)
+    e[0] = numpy.exp(a[0])
+    for k in range(1, len(a)):
+        j = numpy.arange(1, k + 1).reshape((-1,) + (1,) * (a.ndim - 1))
+        e[k] = numpy.sum(j * a[1:k + 1] * e[k - 1::-1][:k], axis=0) / k
+    return e
+
+def taylor_log(a):
+    """
+    Natural log of a truncated series: l_k = (a_k - (1/k) * sum_{j=1..k-1} j * l_j * a_{k-j}) / a_0
+    """
+    l = numpy.empty_like(a)
+    l[0] = numpy.log(a[0])
+    for k in range(1, len(a)):
+        j = numpy.arange(1, k).reshape((-1,) + (1,) * (a.ndim - 1))
+        l[k] = (a[k] - numpy.sum(j * l[1:k] * a[k - 1:0:-1], axis=0) / k) / a[0]
+    return l
+
+def taylor_sin_cos(a):
+    """
+    Sine and cosine of a truncated series, which are computed together since each recurrence uses the other:
+    - s_k = (1/k) * sum_{j=1..k} j * a_j * c_{k-j}
+    - c_k = -(1/k) * sum_{j=1..k} j * a_j * s_{k-j}
+    Returns (s, c)
+    """
+    s = numpy.empty_like(a)
+    c = numpy.empty_like(a)
+    s[0] = numpy.sin(a[0])
+    c[0] = numpy.cos(a[0])
+    for k in range(1, len(a)):
+        j = numpy.arange(1, k + 1).reshape((-1,) + (1,) * (a.ndim - 1))
+        weighted = j * a[1:k + 1]
+        s[k] = numpy.sum(weighted * c[k - 1::-1][:k], axis=0) / k
+        c[k] = -numpy.sum(weighted * s[k - 1::-1][:k], axis=0) / k
+    return s, c
+
+def taylor_pow(a, p):
+    """
+    Raises a truncated series to a constant power p
+    - non-negative integer powers use repeated squaring so they also work when a_0 = 0
+    - other powers use b_k = (1/(k * a_0)) * sum_{j=1..k} ((p + 1) * j - k) * a_j * b_{k-j}
+    """
+    if float(p).is_integer() and p >= 0:
+        result = taylor_constant(1.0, a.shape)
+        base = a
+        power = int(p)
+        while power:
+            if power & 1:
+                result = taylor_mul(result, base)
+            power >>= 1
+            if power:
+                base = taylor_mul(base, base)
+        return result
+    if p == -1:
+        return taylor_div(taylor_constant(1.0, a.shape), a)
+
+    b = numpy.empty_like(a)
+    b[0] = numpy.power(a[0], p)
+    for k in range(1, len(a)):
+        j = numpy.arange(1, k + 1).reshape((-1,) + (1,) * (a.ndim - 1))
+        b[k] = numpy.sum(((p + 1) * j - k) * a[1:k + 1] * b[k - 1::-1][:k], axis=0) / (k * a[0])
+    return b
+
+def taylor_coefficients(expression, centre, num_terms, variable=Symbol("x")):
+    """
+    Computes the taylor coefficients (c_0, ..., c_num_terms) of a sympy expression about the centre in float64
+    - supports numbers, x, +, *, /, powers and the functions exp, log, sin, cos, tan (sqrt is a power in sympy)
+    - centre can be a numpy array, in which case the result has shape (num_terms + 1, *centre.shape)
+    - undefined coefficients (e.g. log at 0) come out as nan or inf instead of raising
+    Raises ValueError for anything outside the supported operations
+    """
+    shape = (num_terms + 1,) + numpy.shape(centre)
+    computed = {}   #repeated subexpressions are only propagated once
+
+    def propagate(node):
+        if node in computed:
+            return computed[node]
+
+        if node == variable:
+            result = taylor_variable(centre, num_terms)
+        elif node.is_number:
+            try:
+                result = taylor_constant(float(node), shape)
+            except TypeError:
+                result = taylor_constant(float("nan"), shape)   #complex or undefined constant
+        elif isinstance(node, Add):
+            result = sum(propagate(arg) for arg in node.args)
+        elif isinstance(node, Mul):
+            #scale by the numeric factor directly and only convolve the non-constant factors
+            factor, terms = node.as_coeff_mul()
+            result = None
+            for term in terms:
+                if isinstance(term, Pow) and term.exp.is_number and term.exp.is_negative:
+                    #divide rather than multiplying by a reciprocal series
+                    denominator = propagate(Pow(term.base, -term.exp))
+                    numerator = result if result is not None else taylor_constant(1.0, shape)
+                    result = taylor_div(numerator, denominator)
+                else:
+                    value = propagate(term)
+                    result = value if result is None else taylor_mul(result, value)
+            result = float(factor) * result
+        elif isinstance(node, Pow):
+            if node.exp.is_number:
+                result = taylor_pow(propagate(node.base), float(node.exp))
+            else:
+                #general power a^b = exp(b * log(a))
+                result = taylor_exp(taylor_mul(propagate(node.exp), taylor_log(propagate(node.base))))
+        elif isinstance(node, exp):
+            result = taylor_exp(propagate(node.args[0]))
+        elif isinstance(node, log) and len(node.args) == 1:
+            result = taylor_log(propagate(node.args[0]))
+        elif isinstance(node, sin):
+            result = taylor_sin_cos(propagate(node.args[0]))[0]
+        elif isinstance(node, cos):
+            result = taylor_sin_cos(propagate(node.args[0]))[1]
+        elif isinstance(node, tan):
+            s, c = taylor_sin_cos(propagate(node.args[0]))
+            result = taylor_div(s, c)
+        else:
+            raise ValueError(f"taylor arithmetic does not support {node.func.__name__} in {expression}")
+
+        computed[node] = result
+        return result
+
+    with numpy.errstate(all="ignore"):
+        return numpy.array(propagate(expression), dtype=float)
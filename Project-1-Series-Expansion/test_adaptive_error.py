@@ -0,0 +1,48 @@
+import math
+import numpy
+from adaptive_error import refine_points, adaptive_max_absolute_error
+
+def series_error(x_values):
+    """Absolute error of the 5-term maclaurin series of exp(x)"""
+    partial_sum = sum(x_values**k / math.factorial(k) for k in range(6))
+    return numpy.abs(numpy.exp(x_values) - partial_sum)
+
+def edge_peak_error(x_values):
+    """Error that is nan below x = 0.2 (outside the function's domain) and largest right at that edge"""
+    with numpy.errstate(all="ignore"):
+        return numpy.where(x_values >= 0.2, 1.0 / (x_values + 0.01), numpy.nan)
+
+def test_refine_points_targets_peaks_and_singularities():
+    """Checks refinement bisects both sides of the largest error and the interval where the error stops being finite"""
+    x = numpy.linspace(0.0, 1.0, 5)
+    errors = numpy.array([1.0, 3.0, 2.0, numpy.nan, numpy.nan])
+    new_x = refine_points(x, errors, num_worst=1)
+    for midpoint in (0.125, 0.375, 0.625):
+        assert numpy.isclose(new_x, midpoint).any(), midpoint
+    assert not numpy.isclose(new_x, 0.875).any()    #both ends nan, nothing to refine there
+
+def test_adaptive_matches_dense_grid():
+    """Checks the adaptive estimate matches a dense grid with far fewer evaluations"""
+    dense = float(series_error(numpy.linspace(-1.0, 1.0, 10**6)).max())
+    estimate, evaluations = adaptive_max_absolute_error(series_error, -1.0, 1.0, rtol=1e-6, initial_points=33, max_evaluations=2000)
+    assert abs(estimate - dense) <= 1e-6 * dense
+    assert evaluations < 200
+
+def test_adaptive_singular_intervals():
+    """
+    Checks a peak at the edge of a nan region is found by bisecting towards it,
+    and an infinite error is returned straight away
+    """
+    estimate, evaluations = adaptive_max_absolute_error(edge_peak_error, -1.0, 1.0, rtol=1e-6, initial_points=33, max_evaluations=2000)
+    assert abs(estimate - 1.0 / 0.21) <= 1e-6 / 0.21
+    assert evaluations < 2000
+
+    with numpy.errstate(all="ignore"):
+        estimate, evaluations = adaptive_max_absolute_error(lambda x_values: numpy.abs(numpy.log(1.0 + x_values)), -1.0, 1.0, initial_points=33)
+    assert estimate == numpy.inf and evaluations == 33
+
+if __name__ == "__main__":
+    test_refine_points_targets_peaks_and_singularities()
+    test_adaptive_matches_dense_grid()
+    test_adaptive_singular_intervals()
+    print("adaptive error estimates match")
@@ -0,0 +1,36 @@
+import numpy
+from parser_function import parse_function_to_numpy_callable
+from series import series_coefficients, partial_sum_matrix
+from centre_sweep import centre_coefficient_matrix, centre_sweep, optimal_centre
+
+#functions and centres checked against expanding at each centre separately
+test_functions = ["sin(x)", "exp(x)", "ln(1 + x)", "1/(2 - x)"]
+test_centres = [-0.5, 0.0, 0.3, 0.7]
+test_num_terms = 6
+
+def test_batched_centres_match_series_coefficients():
+    """
+    Checks the batched expansion at every centre matches series_coefficients at each centre,
+    and the scanned errors match evaluating each of those series on the grid
+    """
+    x_grid = numpy.linspace(-0.9, 0.9, 201)
+    for function_string in test_functions:
+        expression, numpy_function = parse_function_to_numpy_callable(function_string)
+        y_true = numpy.broadcast_to(numpy_function(x_grid), x_grid.shape)
+        coefficient_matrix = centre_coefficient_matrix(expression, test_centres, test_num_terms)
+        max_errors, _ = centre_sweep(function_string, test_centres, test_num_terms, -0.9, 0.9, 201)
+        for i, centre in enumerate(test_centres):
+            coefficients = series_coefficients(expression, centre, test_num_terms, "sympy")
+            assert numpy.allclose(coefficient_matrix[i], coefficients, rtol=1e-10, atol=1e-12), (function_string, centre)
+            y_series = partial_sum_matrix(coefficients, centre, x_grid, [test_num_terms])[0]
+            assert numpy.isclose(max_errors[i], numpy.max(numpy.abs(y_series - y_true)), rtol=1e-8), (function_string, centre)
+
+def test_optimal_centre_with_one_centre():
+    """Checks a single-centre scan returns that centre instead of dividing by zero"""
+    centre, error = optimal_centre("exp(x)", 3, -1.0, 1.0, 101, num_centres=1)
+    assert centre == -1.0 and numpy.isfinite(error)
+
+if __name__ == "__main__":
+    test_batched_centres_match_series_coefficients()
+    test_optimal_centre_with_one_centre()
+    print("batched centres match series_coefficients")
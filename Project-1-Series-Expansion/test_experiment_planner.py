@@ -0,0 +1,65 @@
+import numpy
+from experiment_planner import ExperimentPlan
+from run_experiment import run_work_unit
+
+#a small sweep run both as one plan and unit by unit
+test_functions = ["sin(x)", "ln(1 + x)", "exp(x)"]
+test_num_terms_list = [1, 3, 6]
+
+def same_rows(rows, expected_rows, rtol=0.0):
+    """True if two lists of result rows have the same keys and values (nan equal to nan), errors within rtol"""
+    if len(rows) != len(expected_rows):
+        return False
+    for row, expected in zip(rows, expected_rows):
+        if row.keys() != expected.keys():
+            return False
+        for key, value in row.items():
+            if isinstance(value, float):
+                if not numpy.isclose(value, expected[key], rtol=rtol, atol=0.0, equal_nan=True):
+                    return False
+            elif value != expected[key]:
+                return False
+    return True
+
+def test_plan_rows_match_work_units():
+    """Checks the rows of a whole-sweep plan are the rows of running every (function, centre) unit on its own"""
+    for backend, rtol in (("sympy", 0.0), ("taylor_ad", 1e-12)):
+        for centres in ([0.0, 0.5, 1.0], [-0.5, 0.5]):
+            plan = ExperimentPlan(test_functions, centres, test_num_terms_list, num_x_points=201, backend=backend)
+            for function_string in test_functions:
+                for centre in centres:
+                    unit_rows = run_work_unit(function_string, centre, test_num_terms_list, -1.0, 1.0, 201, backend)
+                    assert same_rows(plan.unit_rows(function_string, centre), unit_rows, rtol), (backend, function_string, centre)
+
+def test_requested_and_ran_counts():
+    """
+    Checks requested counts the work of every unit computing its own maclaurin and taylor series,
+    and ran counts each distinct item once
+    """
+    for centres, series_centres in (([0.0, 0.5, 1.0], 3), ([-0.5, 0.5], 3)):
+        plan = ExperimentPlan(test_functions, centres, test_num_terms_list, num_x_points=201)
+        for function_string in test_functions:
+            for centre in centres:
+                plan.unit_rows(function_string, centre)
+        units = len(test_functions) * len(centres)
+        functions = len(test_functions)
+        expected = {
+            "parse": (units, functions),
+            "grid": (units, 1),
+            "true_evaluation": (units, functions),
+            "expansion": (2 * units, functions * series_centres),
+            "partial_sums": (2 * units, functions * series_centres),
+            "metrics": (2 * units, functions * series_centres)
+        }
+        summary = {kind: (requested, ran) for kind, requested, ran, _ in plan.reuse_summary()}
+        assert summary == expected, (centres, summary)
+
+    #a single unit at centre 0 shares its maclaurin and taylor series
+    plan = ExperimentPlan(["exp(x)"], [0.0], test_num_terms_list, num_x_points=201)
+    plan.unit_rows("exp(x)", 0.0)
+    assert {kind: (requested, ran) for kind, requested, ran, _ in plan.reuse_summary()}["expansion"] == (2, 1)
+
+if __name__ == "__main__":
+    test_plan_rows_match_work_units()
+    test_requested_and_ran_counts()
+    print("experiment plan rows and counts match")
@@ -0,0 +1,66 @@
+import numpy
+import time
+from sympy import sympify, srepr, lambdify, Symbol
+from sympy.core.cache import clear_cache
+from expression_parser import compile_function, ExpressionSyntaxError, max_nesting
+from parser_function import compile_input_function
+
+#functions the parser must read exactly like sympify
+test_functions = ["sin(x)", "ln(1 + x)", "sqrt(1 + x)", "exp(-x^2)", "1/(2 - x)", "exp(sin(x))*cos(x)^2", "-x^2 + 2^-1*x", "0.5*x + pi*E", "3"]
+
+#input that must be rejected, with the 0-based position of the problem
+bad_inputs = {"2x": 1, "sin(x": 5, "x + y": 4, "__import__('os')": 11, "log(x, 2)": 5, "": 0}
+
+#input typed into the GUI, with the 0-based position of the problem in the text exactly as typed
+typed_inputs = {"x^2^2 + y": 8, "   x + y": 7, "(" * 2000 + "x" + ")" * 2000: max_nesting, "-" * 5000 + "x": max_nesting}
+
+def test_parser_matches_sympify():
+    """
+    Checks the parser builds the same sympy tree as sympify and its closure evaluates like lambdify
+    """
+    x_values = numpy.linspace(-0.9, 0.9, 101)
+    for function_string in test_functions:
+        expression, numpy_function = compile_function(function_string)
+        reference = sympify(function_string.replace("^", "**"))
+        assert srepr(expression) == srepr(reference), function_string
+        expected = numpy.broadcast_to(lambdify(Symbol("x"), reference, "numpy")(x_values), x_values.shape)
+        actual = numpy.broadcast_to(numpy_function(x_values), x_values.shape)
+        assert numpy.allclose(actual, expected, rtol=1e-14, atol=0), function_string
+
+def test_parser_rejects_unsupported_input():
+    """
+    Checks input outside the grammar raises ExpressionSyntaxError pointing at the problem
+    """
+    for text, position in bad_inputs.items():
+        try:
+            compile_function(text)
+        except ExpressionSyntaxError as error:
+            assert error.position == position, (text, error)
+        else:
+            raise AssertionError(f"{text!r} was accepted")
+
+def test_input_errors_point_into_typed_text():
+    """
+    Checks errors from compile_input_function point at the column the user typed, including around ^ and leading spaces,
+    and deeply nested input is rejected as a syntax error rather than overflowing the stack
+    """
+    for text, position in typed_inputs.items():
+        try:
+            compile_input_function(text)
+        except ExpressionSyntaxError as error:
+            assert error.position == position, (text[:20], error)
+        else:
+            raise AssertionError(f"{text[:20]!r} was accepted")
+
+if __name__ == "__main__":
+    test_parser_matches_sympify()
+    test_parser_rejects_unsupported_input()
+    test_input_errors_point_into_typed_text()
+
+    #time parsing against sympify, with sympy's cache cleared so neither reuses earlier work
+    for name, parse in (("sympify", lambda text: sympify(text.replace("^", "**"))), ("expression_parser", compile_function)):
+        start = time.perf_counter()
+        for function_string in test_functions * 20:
+            clear_cache()
+            parse(function_string)
+        print(f"{name}: {1000 * (time.perf_counter() - start) / (len(test_functions) * 20):.3f} ms per parse")
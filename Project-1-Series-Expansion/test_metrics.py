@@ -0,0 +1,72 @@
+import warnings
+import numpy
+from metrics import error_metrics, error_metrics_rows, reduce_difference
+
+def reference_metrics(y_true, y_approx):
+    """The maximum absolute error and mean squared error as the original run_work_unit computed them"""
+    with numpy.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)     #all-nan inputs
+        difference = y_true - y_approx
+        if difference.size == 0:
+            return float("nan"), float("nan")
+        return float(numpy.nanmax(numpy.abs(difference))), float(numpy.nanmean(difference**2))
+
+def same(a, b):
+    """True if two floats are equal to rounding, or both nan"""
+    return (numpy.isnan(a) and numpy.isnan(b)) or a == b or abs(a - b) <= 1e-12 * abs(b)
+
+#(y_true, y_approx) pairs with nan and infinite values on either side
+rng = numpy.random.default_rng(3)
+y_base = rng.normal(size=50)
+test_cases = [
+    (y_base, y_base + rng.normal(scale=1e-3, size=50)),
+    (numpy.where(numpy.arange(50) < 10, numpy.nan, y_base), y_base),                   #true function undefined at some points
+    (y_base, numpy.where(numpy.arange(50) % 7 == 0, numpy.nan, 2 * y_base)),           #approximation undefined at some points
+    (y_base, numpy.where(numpy.arange(50) == 20, numpy.inf, y_base)),                  #approximation overflowed
+    (numpy.where(numpy.arange(50) == 5, -numpy.inf, y_base), numpy.where(numpy.arange(50) == 5, -numpy.inf, y_base + 1)),     #inf - inf is nan
+    (numpy.full(50, numpy.nan), y_base),                                               #nan everywhere
+    (numpy.array([]), numpy.array([]))                                                 #empty grid
+]
+
+def test_error_metrics_match_numpy():
+    """Checks the fused metrics give what nanmax and nanmean give, including nan, inf and empty grids"""
+    for i, (y_true, y_approx) in enumerate(test_cases):
+        expected_max, expected_mse = reference_metrics(y_true, y_approx)
+        metrics = error_metrics(y_true, y_approx)
+        assert same(metrics["max_absolute_error"], expected_max), i
+        assert same(metrics["mean_squared_error"], expected_mse), i
+        with numpy.errstate(all="ignore"):
+            assert metrics["nan_count"] == int(numpy.count_nonzero(numpy.isnan(y_true - y_approx))), i
+
+    #a constant true function may come as a single value
+    metrics = error_metrics(2.0, y_base)
+    assert same(metrics["max_absolute_error"], reference_metrics(numpy.full(50, 2.0), y_base)[0])
+
+def test_error_metrics_rows_match_error_metrics():
+    """Checks every row of error_metrics_rows matches error_metrics, whatever the rows before it left in the shared buffers"""
+    y_true = test_cases[1][0]
+    y_matrix = numpy.array([y_approx for _, y_approx in test_cases[:6]])
+    rows = error_metrics_rows(y_true, y_matrix)
+    for i, y_approx in enumerate(y_matrix):
+        expected_max, expected_mse = reference_metrics(y_true, y_approx)
+        assert same(rows["max_absolute_error"][i], expected_max), i
+        assert same(rows["mean_squared_error"][i], expected_mse), i
+    assert rows["nan_count"].dtype.kind == "i"
+
+def test_reduce_difference_over_chunks():
+    """Checks reduce_difference totals over chunks combine to the whole-grid metrics, like the streaming evaluation does"""
+    y_true, y_approx = test_cases[3]
+    y_true = numpy.where(numpy.arange(50) < 10, numpy.nan, y_true)
+    max_error, squared_sum, count = float("nan"), 0.0, 0
+    for start in range(0, 50, 16):
+        difference = y_approx[start:start + 16] - y_true[start:start + 16]
+        chunk_max, chunk_sum, chunk_count, _ = reduce_difference(difference, numpy.empty(difference.size, dtype=bool))
+        max_error, squared_sum, count = float(numpy.fmax(max_error, chunk_max)), squared_sum + chunk_sum, count + chunk_count
+    expected_max, expected_mse = reference_metrics(y_true, y_approx)
+    assert same(max_error, expected_max) and same(squared_sum / count, expected_mse)
+
+if __name__ == "__main__":
+    test_error_metrics_match_numpy()
+    test_error_metrics_rows_match_error_metrics()
+    test_reduce_difference_over_chunks()
+    print("fused error metrics match numpy")
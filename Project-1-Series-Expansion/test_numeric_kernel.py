@@ -0,0 +1,59 @@
+import numpy
+from sympy import lambdify, Symbol, gamma, sqrt, log, I
+from expression_parser import compile_function
+from parser_function import compile_input_function
+from numeric_kernel import compile_kernel, UnsupportedExpression
+
+#functions the kernels must evaluate exactly like lambdify, including repeated subexpressions and constants
+test_functions = ["sin(x)^2 + sin(x)*exp(sin(x))", "exp(sin(x))*cos(x)^2", "1/(2 - x)", "-x^2 + 2^-1*x", "x^3/(1 + x^2)", "x - sin(x)", "1/sqrt(1 + x)", "2^x", "0.5*x + pi*E", "3", "x"]
+
+def test_kernel_matches_lambdify():
+    """
+    Checks kernels give lambdify's values, compute a repeated subexpression once and keep float32 input in float32
+    """
+    x_values = numpy.linspace(-0.9, 0.9, 101)
+    for function_string in test_functions:
+        expression, _ = compile_function(function_string)
+        kernel = compile_kernel(expression)
+        expected = numpy.broadcast_to(lambdify(Symbol("x"), expression, "numpy")(x_values), x_values.shape)
+        assert numpy.allclose(numpy.broadcast_to(kernel(x_values), x_values.shape), expected, rtol=1e-15, atol=1e-15), function_string
+        y_float32 = numpy.asarray(kernel(x_values.astype(numpy.float32)))
+        assert y_float32.dtype == numpy.float32, function_string
+        assert numpy.allclose(numpy.broadcast_to(y_float32, x_values.shape), expected, rtol=1e-6, atol=1e-6), function_string
+
+    #sin(x) once, then exp, square, multiply and add
+    kernel = compile_kernel(compile_function(test_functions[0])[0])
+    assert [step[0] for step in kernel.steps].count(numpy.sin) == 1
+    assert len(kernel.steps) == 5
+
+def test_kernel_rejects_unsupported_expressions():
+    """
+    Checks expressions a kernel cannot evaluate raise UnsupportedExpression, so callers can fall back,
+    that input strings with complex constants still evaluate (to nan, through the parser's closure),
+    and that strings are never sympified
+    """
+    x = Symbol("x")
+    for expression in (x + Symbol("y"), gamma(x), sqrt(-1) * x, log(-1) * x, x + sqrt(-1), x**I):
+        try:
+            compile_kernel(expression)
+        except UnsupportedExpression:
+            pass
+        else:
+            raise AssertionError(f"{expression} was compiled")
+
+    for function_string in ("sqrt(-1)*x", "log(-1)*x"):
+        _, numpy_function = compile_input_function(function_string)
+        with numpy.errstate(all="ignore"):
+            assert numpy.isnan(numpy_function(numpy.linspace(-0.5, 0.5, 5))).all(), function_string
+
+    try:
+        compile_kernel("x + 1")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("a string was compiled")
+
+if __name__ == "__main__":
+    test_kernel_matches_lambdify()
+    test_kernel_rejects_unsupported_expressions()
+    print("numeric kernels match lambdify")
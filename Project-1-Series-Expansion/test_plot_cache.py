@@ -0,0 +1,79 @@
+import os
+import tempfile
+import numpy
+import settings
+import plot_cache
+
+def plot_cache_round(function):
+    """Runs function(output folder, render, rendered) with the plots folder moved to a temporary folder and the cache on"""
+    saved = (settings.plots_directory, settings.plot_cache, settings.plot_cache_max_bytes)
+    with tempfile.TemporaryDirectory() as directory:
+        settings.plots_directory, settings.plot_cache, settings.plot_cache_max_bytes = directory, True, 64 * 1024 * 1024
+        rendered = []
+        def render(out_filename):
+            rendered.append(os.path.basename(out_filename))
+            with open(out_filename, "wb") as out_file:
+                out_file.write(f"plot {len(rendered)}".encode("utf-8"))
+        try:
+            function(directory, render, rendered)
+        finally:
+            settings.plots_directory, settings.plot_cache, settings.plot_cache_max_bytes = saved
+
+def read_bytes(path):
+    """Returns the contents of a file"""
+    with open(path, "rb") as plot_file:
+        return plot_file.read()
+
+def test_plot_key():
+    """Checks the key only changes when the plotted data, its dtype or the labels change"""
+    x_values = numpy.linspace(0.0, 1.0, 11)
+    key = plot_cache.plot_key("series", [x_values, x_values**2], {"title": "x^2"}, (8, 6), 100)
+    assert key == plot_cache.plot_key("series", [x_values.copy(), x_values**2], {"title": "x^2"}, (8, 6), 100)
+    for changed in (plot_cache.plot_key("series", [x_values, x_values**3], {"title": "x^2"}, (8, 6), 100),
+                    plot_cache.plot_key("series", [x_values, (x_values**2).astype(numpy.float32)], {"title": "x^2"}, (8, 6), 100),
+                    plot_cache.plot_key("series", [x_values, x_values**2], {"title": "x^3"}, (8, 6), 100),
+                    plot_cache.plot_key("error_vs_centre", [x_values, x_values**2], {"title": "x^2"}, (8, 6), 100)):
+        assert changed != key
+
+def test_hit_miss_and_changed_key():
+    """
+    Checks a new key is rendered, the same key is not rendered again (even for another file or after the file changed),
+    and a changed key is rendered again
+    """
+    def check(directory, render, rendered):
+        first, second = os.path.join(directory, "first.png"), os.path.join(directory, "second.png")
+        assert plot_cache.cached_plot("key_a", first, render) is False
+        assert plot_cache.cached_plot("key_a", first, render) is True
+        assert plot_cache.cached_plot("key_a", second, render) is True
+        assert rendered == ["first.png"] and read_bytes(second) == b"plot 1"
+
+        with open(first, "wb") as out_file:
+            out_file.write(b"edited by hand")
+        assert plot_cache.cached_plot("key_a", first, render) is True
+        assert read_bytes(first) == b"plot 1"
+
+        assert plot_cache.cached_plot("key_b", first, render) is False
+        assert rendered == ["first.png", "first.png"] and read_bytes(first) == b"plot 2"
+        assert plot_cache.cached_plot("key_a", first, render) is True
+        assert read_bytes(first) == b"plot 1"
+    plot_cache_round(check)
+
+def test_eviction():
+    """Checks the least recently used plots are evicted once the store is over its size limit, and are rendered again"""
+    def check(directory, render, rendered):
+        out_filename = os.path.join(directory, "plot.png")
+        settings.plot_cache_max_bytes = 2 * len(b"plot 1")
+        for key in ("key_a", "key_b", "key_c"):
+            plot_cache.cached_plot(key, out_filename, render)
+        assert not os.path.exists(plot_cache.stored_path("key_a"))
+        assert set(plot_cache.read_index()["entries"]) == {"key_b", "key_c"}
+        assert plot_cache.cached_plot("key_c", out_filename, render) is True
+        assert plot_cache.cached_plot("key_a", out_filename, render) is False
+        assert len(rendered) == 4
+    plot_cache_round(check)
+
+if __name__ == "__main__":
+    test_plot_key()
+    test_hit_miss_and_changed_key()
+    test_eviction()
+    print("plot cache hits and misses match")
@@ -0,0 +1,46 @@
+import numpy
+from plot_helper import min_max_downsample
+
+def test_buckets_keep_their_extremes():
+    """
+    Checks every bucket keeps its first and last point and its smallest and largest y, at most 4 points,
+    with the kept points in their original order, including buckets with nan and infinite values
+    """
+    num_points, num_buckets = 10000, 50
+    x = numpy.arange(num_points, dtype=float)
+    y = numpy.random.default_rng(1).normal(size=num_points)
+    y[1234] = 40.0                      #spike
+    y[5000:5600] = numpy.nan            #gap covering whole buckets
+    y[7777] = numpy.inf
+    x_kept, y_kept = min_max_downsample(x, y, num_buckets)
+
+    assert numpy.all(numpy.diff(x_kept) > 0)
+    kept = x_kept.astype(int)
+    assert numpy.array_equal(y_kept, y[kept], equal_nan=True)
+    bucket_of = numpy.minimum((x * num_buckets / (num_points - 1)).astype(int), num_buckets - 1)
+    for bucket in range(num_buckets):
+        points = numpy.flatnonzero(bucket_of == bucket)
+        kept_here = kept[bucket_of[kept] == bucket]
+        assert 2 <= len(kept_here) <= 4, bucket
+        assert kept_here[0] == points[0] and kept_here[-1] == points[-1], bucket
+        finite = y[points][~numpy.isnan(y[points])]
+        if len(finite):
+            assert numpy.nanmax(y[kept_here]) == finite.max(), bucket
+            assert numpy.nanmin(y[kept_here]) == finite.min(), bucket
+    assert 40.0 in y_kept and numpy.inf in y_kept
+
+def test_short_curves_are_unchanged():
+    """Checks curves with at most 4 points per bucket come back unchanged, and a constant y is broadcast to the grid"""
+    x = numpy.linspace(-1.0, 1.0, 200)
+    y = numpy.sin(x)
+    x_kept, y_kept = min_max_downsample(x, y, 50)
+    assert numpy.array_equal(x_kept, x) and numpy.array_equal(y_kept, y)
+    x_kept, y_kept = min_max_downsample(x, 2.0, 10)
+    assert len(x_kept) < len(x) and numpy.all(y_kept == 2.0)
+    x_kept, y_kept = min_max_downsample(x, 2.0, 50)
+    assert len(x_kept) == len(x) and numpy.all(y_kept == 2.0)
+
+if __name__ == "__main__":
+    test_buckets_keep_their_extremes()
+    test_short_curves_are_unchanged()
+    print("downsampled curves keep their extremes")
@@ -0,0 +1,55 @@
+from result_table import ResultTable, as_result_table, result_columns
+
+def result_row(function_string, approximation, centre, num_terms, max_error=1.0):
+    """Returns a result row with the given key and error"""
+    return {
+        "function": function_string,
+        "approximation": approximation,
+        "centre": centre,
+        "num_terms": num_terms,
+        "max_absolute_error": max_error,
+        "mean_squared_error": max_error**2
+    }
+
+def test_lookup():
+    """Checks lookup finds exact combinations, returns None for anything not run, and keeps the first of duplicate rows"""
+    table = ResultTable([result_row("sin(x)", "taylor", 0.5, 3, 0.1), result_row("sin(x)", "maclaurin", 0.5, 3, 0.2)])
+    table.append(result_row("sin(x)", "taylor", 0.5, 3, 0.9))
+    assert table.lookup("sin(x)", "taylor", 0.5, 3)["max_absolute_error"] == 0.1
+    assert table.lookup("sin(x)", "maclaurin", 0.5, 3)["max_absolute_error"] == 0.2
+    for missing in (("cos(x)", "taylor", 0.5, 3), ("sin(x)", "taylor", 1.0, 3), ("sin(x)", "taylor", 0.5, 5)):
+        assert table.lookup(*missing) is None, missing
+    assert len(table) == 3
+
+def test_series_rows():
+    """Checks series_rows returns one approximation at one centre sorted by num_terms, including rows added after a lookup"""
+    table = ResultTable()
+    for num_terms in (10, 1, 5):
+        table.append(result_row("exp(x)", "taylor", 1.0, num_terms))
+        table.append(result_row("exp(x)", "maclaurin", 1.0, num_terms))
+    table.append(result_row("exp(x)", "taylor", 0.0, 2))
+    assert [row["num_terms"] for row in table.series_rows("exp(x)", "taylor", 1.0)] == [1, 5, 10]
+
+    table.append(result_row("exp(x)", "taylor", 1.0, 3))
+    rows = table.series_rows("exp(x)", "taylor", 1.0)
+    assert [row["num_terms"] for row in rows] == [1, 3, 5, 10]
+    assert all(row["approximation"] == "taylor" and row["centre"] == 1.0 for row in rows)
+    assert table.series_rows("exp(x)", "taylor", 0.5) == []
+
+def test_rows_and_arrays_keep_insertion_order():
+    """Checks iterating and to_arrays give the rows in the order they were added, whatever series_rows sorted"""
+    rows = [result_row("ln(1 + x)", "taylor", 0.5, num_terms, 1.0 / num_terms) for num_terms in (15, 2, 7)]
+    table = as_result_table(rows)
+    table.series_rows("ln(1 + x)", "taylor", 0.5)
+    assert list(table) == rows
+    assert as_result_table(table) is table
+    arrays = table.to_arrays()
+    assert set(arrays) == set(result_columns)
+    assert arrays["num_terms"].tolist() == [15, 2, 7]
+    assert arrays["num_terms"].dtype.kind == "i" and arrays["max_absolute_error"].dtype.kind == "f"
+
+if __name__ == "__main__":
+    test_lookup()
+    test_series_rows()
+    test_rows_and_arrays_keep_insertion_order()
+    print("result table lookups match")
@@ -1,6 +1,6 @@
-from series import evaluate_series_function
+import numpy
+from series import evaluate_series_function, series_backends, partial_sum_matrix
 from plot_helper import plot_series_graphs
-from parser_function import sanitize_input_function
 import settings
 
 def run_series_test():
@@ -24,6 +24,41 @@ def run_series_test():
     file2 = plot_series_graphs(x, y_true, y_maclaurin, y_taylor, meta)
     print(f"Taylor series plot saved to: {file2}")
 
+def test_series_without_maclaurin_expansion():
+    """
+    Checks a function with no expansion about 0 (ln(x)) still gives its taylor series at centre 1
+    with either backend, and a nan maclaurin curve instead of an error
+    """
+    for backend in series_backends:
+        x, y_true, y_maclaurin, y_taylor, _ = evaluate_series_function("ln(x)", centre=1.0, maclaurin_num_terms=5, taylor_num_terms=5, x_min=0.5, x_max=1.5, num_x_points=101, backend=backend)
+        assert numpy.isnan(y_maclaurin).all(), backend
+        assert numpy.isfinite(y_taylor).all(), backend
+        assert numpy.max(numpy.abs(y_taylor - y_true)) < 1e-2, backend
+
+def test_partial_sum_matrix_rows():
+    """
+    Checks row k of the partial sum matrix is the direct sum of the first k + 1 terms about a nonzero centre,
+    that orders can be asked for in any order, and that a nan coefficient makes its order and every later one nan
+    """
+    centre = 0.5
+    x_grid = numpy.linspace(-1.0, 2.0, 31)
+    coefficients = numpy.array([1.0, -2.0, 0.5, 3.0, -0.25])
+    matrix = partial_sum_matrix(coefficients, centre, x_grid)
+    assert matrix.shape == (len(coefficients), len(x_grid))
+    for k in range(len(coefficients)):
+        direct = sum(coefficients[j] * (x_grid - centre)**j for j in range(k + 1))
+        assert numpy.allclose(matrix[k], direct, rtol=1e-14, atol=1e-14), k
+
+    orders = [4, 1, 4]
+    assert numpy.array_equal(partial_sum_matrix(coefficients, centre, x_grid, orders), matrix[orders])
+
+    coefficients[2] = numpy.nan
+    matrix = partial_sum_matrix(coefficients, centre, x_grid)
+    assert numpy.isfinite(matrix[:2]).all()
+    assert numpy.isnan(matrix[2:]).all()
+
 if __name__ == "__main__":
     run_series_test()
+    test_series_without_maclaurin_expansion()
+    test_partial_sum_matrix_rows()
    
\ No newline at end of file
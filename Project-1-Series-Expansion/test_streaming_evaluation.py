@@ -0,0 +1,50 @@
+import numpy
+from parser_function import parse_function_to_numpy_callable
+from series import series_coefficients, partial_sum_matrix, evaluate_series_function
+from metrics import error_metrics_rows, error_metrics, as_float_array
+from streaming_evaluation import grid_chunks, streaming_series_errors, evaluate_series_streaming
+
+#functions checked on [-1, 1] (ln(1 + x) is -inf at -1) with a chunk size that does not divide the grid
+test_functions = ["exp(x)", "ln(1 + x)", "1/(2 - x)", "3"]
+test_num_x_points = 1001
+test_chunk_size = 37
+
+def test_grid_chunks_match_linspace():
+    """Checks the chunks put together are exactly numpy.linspace"""
+    x_grid = numpy.linspace(-1.0, 1.0, test_num_x_points)
+    chunks = [x_chunk.copy() for _, x_chunk in grid_chunks(-1.0, 1.0, test_num_x_points, test_chunk_size, numpy.empty(test_chunk_size))]
+    assert numpy.array_equal(numpy.concatenate(chunks), x_grid)
+
+def test_streaming_errors_match_whole_grid():
+    """Checks the chunked errors of every order match evaluating the whole grid at once"""
+    x_grid = numpy.linspace(-1.0, 1.0, test_num_x_points)
+    orders = [0, 1, 3, 8]
+    for function_string in test_functions:
+        expression, numpy_function = parse_function_to_numpy_callable(function_string)
+        with numpy.errstate(all="ignore"):
+            y_true = as_float_array(numpy_function(x_grid))
+        for centre in (0.0, 0.5):
+            coefficients = series_coefficients(expression, centre, max(orders), "taylor_ad")
+            expected = error_metrics_rows(y_true, partial_sum_matrix(coefficients, centre, x_grid, orders))
+            max_errors, mses = streaming_series_errors(numpy_function, coefficients, centre, orders, -1.0, 1.0, test_num_x_points, test_chunk_size)
+            assert numpy.allclose(max_errors, expected["max_absolute_error"], rtol=1e-12, equal_nan=True), (function_string, centre)
+            assert numpy.allclose(mses, expected["mean_squared_error"], rtol=1e-12, equal_nan=True), (function_string, centre)
+
+def test_streaming_series_matches_whole_grid():
+    """Checks evaluate_series_streaming gives the stats of evaluate_series_function and every stride-th point for plotting"""
+    x, y_true, y_maclaurin, y_taylor, _ = evaluate_series_function("ln(1 + x)", centre=0.5, num_x_points=test_num_x_points)
+    x_plot, y_true_plot, y_maclaurin_plot, y_taylor_plot, meta, stats = evaluate_series_streaming("ln(1 + x)", centre=0.5, num_x_points=test_num_x_points, chunk_size=test_chunk_size, plot_points=100)
+    stride = -(-test_num_x_points // 100)
+    assert meta["plot_points"] == len(x[::stride])
+    for plotted, whole in ((x_plot, x), (y_true_plot, y_true), (y_maclaurin_plot, y_maclaurin), (y_taylor_plot, y_taylor)):
+        assert numpy.array_equal(plotted, whole[::stride], equal_nan=True)
+    for approximation, y_approx in (("maclaurin", y_maclaurin), ("taylor", y_taylor)):
+        expected = error_metrics(y_true, y_approx)
+        assert numpy.isclose(stats[f"{approximation}_max_error"], expected["max_absolute_error"], rtol=1e-12), approximation
+        assert numpy.isclose(stats[f"{approximation}_mse"], expected["mean_squared_error"], rtol=1e-12), approximation
+
+if __name__ == "__main__":
+    test_grid_chunks_match_linspace()
+    test_streaming_errors_match_whole_grid()
+    test_streaming_series_matches_whole_grid()
+    print("streaming errors match the whole grid")
@@ -0,0 +1,39 @@
+import numpy
+import time
+from parser_function import parser_to_sympy
+from series import compute_series_coefficients, evaluate_series_function
+
+#functions and centres to cross-check between the sympy and taylor_ad backends
+test_functions = ["sin(x)", "cos(x)", "exp(x)", "ln(1 + x)", "tan(x)", "sqrt(1 + x)", "1/(1 - x)", "exp(sin(x))*cos(x)^2"]
+test_centres = [0.0, 0.5]
+
+def test_backends_agree():
+    """
+    Checks the numeric taylor arithmetic coefficients match the sympy.series coefficients
+    for every test function and centre up to order 8
+    - both backends are computed directly, so no vector from the on-disk store or an earlier run can hide a mismatch
+    """
+    for function_string in test_functions:
+        expression = parser_to_sympy(function_string)
+        for centre in test_centres:
+            sympy_coefficients = compute_series_coefficients(expression, centre, 8, "sympy")
+            numeric_coefficients = compute_series_coefficients(expression, centre, 8, "taylor_ad")
+            assert numpy.allclose(numeric_coefficients, sympy_coefficients, rtol=1e-10, atol=1e-12), function_string
+
+def test_backends_evaluate_the_same():
+    """
+    Checks evaluate_series_function gives the same curves with either backend
+    """
+    _, _, mac_sympy, tay_sympy, _ = evaluate_series_function("exp(x)", centre=0.5, backend="sympy")
+    _, _, mac_numeric, tay_numeric, _ = evaluate_series_function("exp(x)", centre=0.5, backend="taylor_ad")
+    assert numpy.allclose(mac_sympy, mac_numeric)
+    assert numpy.allclose(tay_sympy, tay_numeric)
+
+if __name__ == "__main__":
+    test_backends_agree()
+    test_backends_evaluate_the_same()
+
+    #time an order-100 expansion with the numeric backend
+    start = time.perf_counter()
+    compute_series_coefficients(parser_to_sympy("exp(sin(x))*cos(x)^2"), 0.3, 100, "taylor_ad")
+    print(f"Order-100 taylor_ad expansion took {1000 * (time.perf_counter() - start):.1f} ms")